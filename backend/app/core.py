@@ -0,0 +1,19 @@
+"""
+Configuración general del backend.
+Cada valor puede sobreescribirse con la variable de entorno del mismo nombre.
+"""
+import os
+
+# Caché de parseos de setups (SQLite junto a clasificador.db)
+PARSE_CACHE_FILENAME = os.getenv("PARSE_CACHE_FILENAME", "parse_cache.db")
+PARSE_CACHE_MAX_BYTES = int(os.getenv("PARSE_CACHE_MAX_BYTES", str(64 * 1024 * 1024)))
+
+# Pool de procesos para trabajo pesado (parseo masivo, solvers).
+# 0 = un proceso por CPU
+PROCESS_POOL_WORKERS = int(os.getenv("PROCESS_POOL_WORKERS", "0"))
+
+# Distribuciones en segundo plano (POST /distribucion/trabajos): hilos que
+# resuelven a la vez (los solvers pesados corren en el pool de procesos) y
+# cada cuánto el stream SSE revisa el progreso
+TRABAJOS_WORKERS = int(os.getenv("TRABAJOS_WORKERS", "2"))
+TRABAJOS_INTERVALO_SSE_SEG = float(os.getenv("TRABAJOS_INTERVALO_SSE_SEG", "0.5"))
@@ -1,4 +1,4 @@
-from sqlalchemy import create_engine
+from sqlalchemy import create_engine, inspect, text
 from sqlalchemy.orm import sessionmaker, declarative_base
 
 DATABASE_URL = "sqlite:///./clasificador.db"
@@ -18,9 +18,41 @@ from app.models.package_model import Package
 from app.models.package_part_model import PackagePart
 from app.models.distribucion_storage_model import DistribucionStorage
 from app.models.estilo_manual_model import EstiloManual
+from app.models.setup_model import Setup
+from app.models.setup_manifest_model import SetupManifest
+from app.models.trabajo_distribucion_model import TrabajoDistribucion
+
+
+def _agregar_columnas_faltantes():
+    """
+    create_all no modifica tablas que ya existen: agrega las columnas
+    nuevas (solo nullable) y sus índices en BDs creadas con versiones anteriores.
+    """
+    inspector = inspect(engine)
+    with engine.begin() as conn:
+        for tabla in Base.metadata.sorted_tables:
+            if not inspector.has_table(tabla.name):
+                continue
+            existentes = {c["name"] for c in inspector.get_columns(tabla.name)}
+            nuevas = [c for c in tabla.columns if c.name not in existentes and c.nullable]
+            for columna in nuevas:
+                tipo = columna.type.compile(dialect=engine.dialect)
+                conn.execute(text(f'ALTER TABLE "{tabla.name}" ADD COLUMN "{columna.name}" {tipo}'))
+            if nuevas:
+                for indice in tabla.indexes:
+                    indice.create(conn, checkfirst=True)
+
+
+def inicializar_bd():
+    """
+    Crea las tablas y agrega las columnas nuevas en clasificador.db.
+    Es explícito (main.py al arrancar, scripts que escriben en la BD):
+    importar este módulo no toca el archivo, así los tests y el benchmark
+    no migran la BD del repo.
+    """
+    Base.metadata.create_all(bind=engine)
+    _agregar_columnas_faltantes()
 
-# Crear tablas
-Base.metadata.create_all(bind=engine)
 
 def get_db():
     db = SessionLocal()
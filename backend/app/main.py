@@ -1,12 +1,35 @@
+from contextlib import asynccontextmanager
 from fastapi import FastAPI
 from app.routers.machine_router import router as machine_router
 from app.routers.package_router import router as package_router
 from app.routers.distribucion_router import router as distribucion_router
 from app.routers.estilo_router import router as estilo_router
+from app.routers.setup_router import router as setup_router
+from app.database.db import SessionLocal, inicializar_bd
+from app.services.trabajos_service import cerrar_trabajadores, marcar_interrumpidos
+from app.utils.pool_procesos import cerrar_pool
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # Tablas y columnas nuevas (la BD no se toca al importar los módulos)
+    inicializar_bd()
+    # Trabajos de distribución que quedaron a medias en el proceso anterior
+    db = SessionLocal()
+    try:
+        marcar_interrumpidos(db)
+    finally:
+        db.close()
+    yield
+    # Cerrar el pool de trabajos y el pool de procesos compartido al apagar
+    cerrar_trabajadores()
+    cerrar_pool()
+
 
 app = FastAPI(
     title="CLASIFICADOR STD - Sistema Experto",
-    version="2.0.0"
+    version="2.0.0",
+    lifespan=lifespan
 )
 
 @app.get("/")
@@ -16,4 +39,5 @@ def root():
 app.include_router(machine_router)
 app.include_router(package_router)
 app.include_router(distribucion_router)
-app.include_router(estilo_router)
\ No newline at end of file
+app.include_router(estilo_router)
+app.include_router(setup_router)
\ No newline at end of file
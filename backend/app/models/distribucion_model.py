@@ -1,5 +1,5 @@
-from pydantic import BaseModel
-from typing import List, Dict, Optional
+from pydantic import BaseModel, Field
+from typing import List, Dict, Literal, Optional
 
 class DistribucionRequest(BaseModel):
     """Request para crear una distribución"""
@@ -7,6 +7,30 @@ class DistribucionRequest(BaseModel):
     demanda: int  # Cantidad de productos finales
     horas_objetivo: float  # Tiempo disponible (ej: 24, 36, 12)
     machine_ids: List[int]  # IDs de máquinas disponibles para usar
+    modo_solver: Literal["greedy", "exacto", "portafolio", "maquinas"] = "greedy"  # "exacto": branch-and-bound anytime, "portafolio": multi-start en paralelo, "maquinas": directo sobre las máquinas reales
+    tiempo_limite_seg: float = Field(10.0, gt=0, le=600)  # Presupuesto de tiempo del modo exacto / búsqueda local
+    busqueda_local: bool = False  # Fase de mejora (recocido simulado) después del solver (no aplica a "maquinas")
+    semilla: int = 0  # Semilla de la búsqueda local / portafolio (resultados reproducibles)
+    usar_cache: bool = True  # Si ya hay un resultado vigente para la misma solicitud y estado, se devuelve sin recalcular
+
+class ReplanificarRequest(BaseModel):
+    """Request para re-planificar una distribución guardada"""
+    demanda: Optional[int] = None  # Nueva demanda (None = la de la distribución guardada)
+
+class PrechequeoRequest(BaseModel):
+    """Request para el pre-chequeo rápido de factibilidad"""
+    package_id: int
+    demanda: int
+    horas_objetivo: float
+    machine_ids: List[int]
+
+class BarridoRequest(BaseModel):
+    """Request para el barrido what-if de demanda x horas (no se guarda nada)"""
+    package_id: int
+    demandas: List[int] = Field(..., min_length=1, max_length=50)  # Ej: [100, 200, 500]
+    horas: List[float] = Field(..., min_length=1, max_length=20)  # Ej: [12, 24, 36]
+    machine_ids: List[int]
+    modo_solver: Literal["greedy", "maquinas"] = "greedy"  # "maquinas": capacidad real de cada máquina
 
 class AsignacionPart(BaseModel):
     """Asignación de un part number a una máquina"""
@@ -53,3 +77,14 @@ class DistribucionResponse(BaseModel):
     alertas_generales: List[str]
     errores_generales: List[str]
     resumen: Dict
+
+class TrabajoDistribucionResponse(BaseModel):
+    """Estado de una distribución en segundo plano"""
+    trabajo_id: int
+    estado: Literal["pendiente", "ejecutando", "completado", "error"]
+    fase: Optional[str] = None
+    mejor_maquinas: Optional[int] = None  # Menos máquinas encontradas hasta ahora
+    cota_inferior: Optional[int] = None
+    tiempo_transcurrido_seg: float = 0.0
+    error: Optional[str] = None
+    distribucion_id: Optional[int] = None  # GET /distribucion/{id} cuando está completado
@@ -15,6 +15,8 @@ class DistribucionStorage(Base):
     # Resultado completo
     resultado_json = Column(JSON, nullable=False)
     es_factible = Column(Boolean, default=False)
+    # Huella de la solicitud + estado del package y las máquinas (caché de resultados)
+    huella = Column(String, nullable=True, index=True)
     
     # Fechas
     created_at = Column(DateTime, default=datetime.utcnow)
@@ -12,8 +12,22 @@ class PackagePart(Base):
     part_filename = Column(String, nullable=False)  # "TYEH-1171206_01-SW"
     cantidad = Column(Integer, nullable=False)
     
-    # Snapshot completo del parser (JSON)
-    parsed_data = Column(JSON, nullable=False)
+    # Setup del catálogo (parts nuevos). Los parts antiguos guardan su propio
+    # snapshot en la columna parsed_data y tienen setup_id = NULL.
+    setup_id = Column(Integer, ForeignKey("setups.id"), nullable=True, index=True)
+    parsed_data_json = Column("parsed_data", JSON, nullable=True)
     
-    # Relación
-    package = relationship("Package", back_populates="parts")
\ No newline at end of file
+    # Relaciones
+    package = relationship("Package", back_populates="parts")
+    setup = relationship("Setup")
+
+    @property
+    def parsed_data(self):
+        """Snapshot del parser: el del catálogo si está vinculado, si no el propio"""
+        if self.setup_id is not None and self.setup is not None:
+            return self.setup.parsed_data
+        return self.parsed_data_json
+
+    @parsed_data.setter
+    def parsed_data(self, valor):
+        self.parsed_data_json = valor
@@ -0,0 +1,25 @@
+from sqlalchemy import Column, Integer, BigInteger, String, DateTime, ForeignKey
+from sqlalchemy.orm import relationship
+from datetime import datetime
+from app.database.db import Base
+
+class SetupManifest(Base):
+    """
+    Manifiesto de la ingesta incremental de carpetas de setups.
+    Un registro por archivo: si mtime y tamaño no cambian, no se vuelve a leer;
+    si cambian pero el hash es el mismo, tampoco se vuelve a parsear.
+    """
+    __tablename__ = "setup_manifest"
+
+    id = Column(Integer, primary_key=True, index=True)
+    ruta = Column(String, unique=True, nullable=False, index=True)
+
+    mtime_ns = Column(BigInteger, nullable=False)
+    tamano = Column(Integer, nullable=False)
+    sha256 = Column(String, nullable=False)
+
+    setup_id = Column(Integer, ForeignKey("setups.id", ondelete="SET NULL"), nullable=True)
+    setup = relationship("Setup")
+    error = Column(String, nullable=True)  # Último error de parseo (si hubo)
+
+    actualizado = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
@@ -1,14 +1,20 @@
-from sqlalchemy import Column, Integer, String, Float
+from sqlalchemy import Column, Integer, String, Float, DateTime, JSON
+from datetime import datetime
 from app.database.db import Base
 
 class Setup(Base):
+    """
+    Catálogo de setups parseados: un registro por part number + versión
+    (part_full, ej: "TYEH-1153513_00-SW"). Los PackagePart lo referencian
+    en vez de guardar su propia copia de parsed_data.
+    """
     __tablename__ = "setups"
 
     id = Column(Integer, primary_key=True, index=True)
 
     part_full = Column(String, index=True)
     prefix = Column(String)
-    number = Column(String)
+    number = Column(String, index=True)
     version = Column(String)
     nivel = Column(String)
 
@@ -22,3 +28,8 @@ class Setup(Base):
     sym = Column(Integer)
     run_time_mins = Column(Float)
     uph = Column(Float)
+
+    # Snapshot completo del parser (mismo formato que PackagePart.parsed_data)
+    parsed_data = Column(JSON, nullable=True)
+    content_hash = Column(String, nullable=True, index=True)  # SHA-256 del .stp (si se conoce)
+    actualizado = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow, nullable=True)
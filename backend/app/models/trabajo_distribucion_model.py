@@ -0,0 +1,29 @@
+from sqlalchemy import Column, Integer, String, DateTime, JSON, ForeignKey
+from datetime import datetime
+from app.database.db import Base
+
+class TrabajoDistribucion(Base):
+    """
+    Distribución calculada en segundo plano (POST /distribucion/trabajos).
+    El worker actualiza estado, fase y mejor número de máquinas mientras
+    resuelve; el cliente consulta esta tabla (polling o SSE). El resultado
+    final queda en `distribuciones`.
+    """
+    __tablename__ = "trabajos_distribucion"
+
+    id = Column(Integer, primary_key=True, index=True)
+    parametros = Column(JSON, nullable=False)  # DistribucionRequest
+
+    # pendiente → ejecutando → completado | error
+    estado = Column(String, nullable=False, default="pendiente", index=True)
+    fase = Column(String, nullable=True)  # Fase de crear_distribucion_optimizada
+    mejor_maquinas = Column(Integer, nullable=True)  # Mejor plan encontrado hasta ahora
+    cota_inferior = Column(Integer, nullable=True)  # Cota del pre-chequeo
+    error = Column(String, nullable=True)
+
+    distribucion_id = Column(Integer, ForeignKey("distribuciones.id", ondelete="SET NULL"), nullable=True)
+
+    created_at = Column(DateTime, default=datetime.utcnow)
+    started_at = Column(DateTime, nullable=True)
+    finished_at = Column(DateTime, nullable=True)
+    actualizado = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
@@ -1,10 +1,17 @@
 from fastapi import APIRouter, Depends, HTTPException
 from fastapi.responses import StreamingResponse
-from sqlalchemy.orm import Session
+from sqlalchemy.orm import Session, sessionmaker
 from app.database.db import get_db
-from app.services import distribucion_service
+from app.services import distribucion_service, trabajos_service
 from app.services.excel_service import generar_excel_distribucion, generar_excel_estilo_maquina
-from app.models.distribucion_model import DistribucionRequest, DistribucionResponse
+from app.models.distribucion_model import (
+    BarridoRequest,
+    DistribucionRequest,
+    DistribucionResponse,
+    PrechequeoRequest,
+    ReplanificarRequest,
+    TrabajoDistribucionResponse,
+)
 from app.models.distribucion_storage_model import DistribucionStorage
 from datetime import datetime
 from typing import List
@@ -32,6 +39,14 @@ def crear_distribucion_endpoint(
     - Redistribuye cuando hay sobrecarga sin compatibilidad
     - Minimiza número de máquinas utilizadas
     - Permite sobrecarga si hay alta compatibilidad (≥70 score)
+    
+    modo_solver="exacto" busca con branch-and-bound (máximo tiempo_limite_seg)
+    una distribución con menos máquinas y reporta en el resumen la cota
+    inferior de máquinas y si la solución es óptima probada.
+    busqueda_local=true mejora el resultado con búsqueda local (reproducible
+    con la misma semilla).
+    modo_solver="maquinas" asigna directo a las máquinas seleccionadas según
+    su capacidad real (tipo de máquina, estaciones dañadas, grosor y mesa).
     """
     try:
         distribucion = distribucion_service.crear_distribucion_optimizada(
@@ -39,7 +54,12 @@ def crear_distribucion_endpoint(
             package_id=request.package_id,
             demanda=request.demanda,
             horas_objetivo=request.horas_objetivo,
-            machine_ids=request.machine_ids
+            machine_ids=request.machine_ids,
+            modo_solver=request.modo_solver,
+            tiempo_limite_seg=request.tiempo_limite_seg,
+            busqueda_local=request.busqueda_local,
+            semilla=request.semilla,
+            usar_cache=request.usar_cache
         )
         return distribucion
         
@@ -49,6 +69,145 @@ def crear_distribucion_endpoint(
         raise HTTPException(500, f"Error creando distribución: {str(e)}")
 
 
+@router.post("/trabajos", response_model=TrabajoDistribucionResponse, status_code=202)
+def crear_trabajo_distribucion(
+    request: DistribucionRequest,
+    db: Session = Depends(get_db)
+):
+    """
+    Igual que POST /crear pero en segundo plano: regresa de inmediato con el
+    id del trabajo y el solver corre en el pool de trabajos. Pensado para
+    packages grandes con modo_solver "exacto" o "portafolio".
+    
+    Progreso: GET /trabajos/{id} (polling) o GET /trabajos/{id}/eventos (SSE).
+    Al terminar, distribucion_id apunta al resultado (GET /{distribucion_id}).
+    """
+    trabajo = trabajos_service.crear_trabajo(db, request)
+    return trabajos_service.estado_trabajo(trabajo)
+
+
+@router.get("/trabajos/{trabajo_id}", response_model=TrabajoDistribucionResponse)
+def obtener_trabajo_distribucion(trabajo_id: int, db: Session = Depends(get_db)):
+    """
+    Estado de un trabajo: pendiente, ejecutando, completado o error, con la
+    fase actual, el mejor número de máquinas hasta ahora, la cota inferior y
+    el tiempo transcurrido.
+    """
+    trabajo = trabajos_service.obtener_trabajo(db, trabajo_id)
+    if not trabajo:
+        raise HTTPException(404, "Trabajo no encontrado")
+    return trabajos_service.estado_trabajo(trabajo)
+
+
+@router.get("/trabajos/{trabajo_id}/eventos")
+def eventos_trabajo_distribucion(trabajo_id: int, db: Session = Depends(get_db)):
+    """
+    Progreso del trabajo como Server-Sent Events: un evento "progreso" con el
+    estado (mismo JSON que GET /trabajos/{id}) cada vez que cambia, y el
+    stream se cierra cuando el trabajo termina.
+    """
+    if not trabajos_service.obtener_trabajo(db, trabajo_id):
+        raise HTTPException(404, "Trabajo no encontrado")
+    
+    fabrica = sessionmaker(autocommit=False, autoflush=False, bind=db.get_bind())
+    eventos = (
+        f"event: progreso\ndata: {estado.model_dump_json()}\n\n"
+        for estado in trabajos_service.seguir_trabajo(fabrica, trabajo_id)
+    )
+    return StreamingResponse(
+        eventos,
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache"}
+    )
+
+
+@router.post("/prechequeo")
+def prechequeo_distribucion_endpoint(
+    request: PrechequeoRequest,
+    db: Session = Depends(get_db)
+):
+    """
+    Respuesta rápida (sin correr el solver) a "¿el package con esta demanda
+    cabe en las máquinas seleccionadas?".
+    
+    Retorna la cota inferior de máquinas (por horas, herramientas y parts que
+    no pueden compartir máquina), los parts problemáticos y, si
+    factible_posible=false, los motivos. /crear usa el mismo chequeo para
+    fallar rápido.
+    """
+    try:
+        return distribucion_service.prechequear_distribucion(
+            db=db,
+            package_id=request.package_id,
+            demanda=request.demanda,
+            horas_objetivo=request.horas_objetivo,
+            machine_ids=request.machine_ids
+        )
+    except ValueError as e:
+        raise HTTPException(400, str(e))
+    except Exception as e:
+        raise HTTPException(500, f"Error en pre-chequeo: {str(e)}")
+
+
+@router.post("/barrido")
+def barrido_distribucion_endpoint(
+    request: BarridoRequest,
+    db: Session = Depends(get_db)
+):
+    """
+    Barrido what-if de demanda x horas objetivo, ej. "¿cuántas máquinas para
+    demanda 100/200/500 a 12/24/36 h?" en una sola llamada.
+    
+    Reusa requerimientos y matriz de compatibilidad para todas las
+    combinaciones y corre solo el núcleo de asignación (sin estilos).
+    No se guarda nada en BD.
+    
+    Retorna matrices [demanda][horas] con máquinas necesarias (-1 = error),
+    cota inferior por horas y factibilidad, y los parts sin ninguna máquina
+    compatible (si hay, ninguna combinación es factible, igual que en /crear).
+    """
+    try:
+        return distribucion_service.barrido_distribucion(
+            db=db,
+            package_id=request.package_id,
+            demandas=request.demandas,
+            horas=request.horas,
+            machine_ids=request.machine_ids,
+            modo_solver=request.modo_solver
+        )
+    except ValueError as e:
+        raise HTTPException(400, str(e))
+    except Exception as e:
+        raise HTTPException(500, f"Error en barrido: {str(e)}")
+
+
+@router.post("/{distribucion_id}/replanificar", response_model=DistribucionResponse)
+def replanificar_distribucion_endpoint(
+    distribucion_id: int,
+    request: ReplanificarRequest,
+    db: Session = Depends(get_db)
+):
+    """
+    Re-planifica una distribución guardada después de cambiar la demanda o
+    las cantidades del package (PUT /package/{id}/actualizar_cantidades).
+    
+    Solo se reparan las máquinas afectadas: las demás conservan su estilo
+    (sin cambios de herramienta en piso). El resumen indica qué máquinas
+    quedaron sin cambios, cuáles se repararon y cuáles son nuevas.
+    La re-planificación se guarda como una distribución nueva.
+    """
+    try:
+        return distribucion_service.replanificar_distribucion(
+            db=db,
+            distribucion_id=distribucion_id,
+            demanda=request.demanda
+        )
+    except ValueError as e:
+        raise HTTPException(400, str(e))
+    except Exception as e:
+        raise HTTPException(500, f"Error re-planificando distribución: {str(e)}")
+
+
 @router.post("/exportar-excel")
 def exportar_distribucion_a_excel(
     distribucion: DistribucionResponse
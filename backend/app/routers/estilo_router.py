@@ -8,12 +8,10 @@ from app.models.machine_model import Machine
 from app.services.excel_service import generar_excel_estilo_maquina
 from app.models.distribucion_model import AsignacionMaquina, AsignacionPart, EstiloEstacion
 from app.models.setup_model import Setup
-from app.utils.parser_setups import parse_setup
+from app.utils.parser_cache import parse_setup_cacheado
 from datetime import datetime
 from typing import List, Optional
 import io
-import tempfile
-import os
 
 router = APIRouter(prefix="/estilo", tags=["ESTILOS MANUALES"])
 
@@ -59,22 +57,13 @@ async def crear_estilo_desde_archivos(
         # Leer contenido del archivo
         contenido = await archivo.read()
         
-        # Guardar temporalmente para parsear
-        with tempfile.NamedTemporaryFile(mode='wb', suffix='.stp', delete=False) as temp_file:
-            temp_file.write(contenido)
-            temp_path = temp_file.name
-        
         try:
-            # Parsear el setup
-            setup = parse_setup(temp_path)
+            # Parsear el setup directo de memoria
+            setup = parse_setup_cacheado(contenido, archivo.filename)
             setups_parseados.append(setup)
             part_numbers.append(setup.part_number)
         except Exception as e:
             raise HTTPException(400, f"Error parseando {archivo.filename}: {str(e)}")
-        finally:
-            # Eliminar archivo temporal
-            if os.path.exists(temp_path):
-                os.unlink(temp_path)
     
     # Calcular estilo unificado usando la máquina seleccionada
     from app.services.machine_template_service import calcular_estilo_unificado
@@ -1,11 +1,10 @@
 from fastapi import APIRouter, Depends, HTTPException, UploadFile, File, Form
 from sqlalchemy.orm import Session
 from app.database.db import get_db
-from app.services import package_service
-from app.utils.parser_setups import parse_setup
+from app.services import package_service, setup_catalogo_service
+from app.utils import parser_cache
 from typing import List
-import os
-import shutil
+import hashlib
 
 router = APIRouter(prefix="/package", tags=["PACKAGES"])
 
@@ -171,6 +170,14 @@ def limpiar_packages_expirados(db: Session = Depends(get_db)):
         "message": f"{count} packages expirados eliminados"
     }
 
+@router.post("/admin/parse_cache/limpiar")
+def limpiar_parse_cache():
+    """Vacía el caché de setups parseados (se vuelven a parsear al subirlos)"""
+    count = parser_cache.limpiar()
+    return {
+        "message": f"{count} setups eliminados del caché de parseo"
+    }
+
 @router.post("/{package_id}/agregar_setup")
 async def agregar_setup_a_package(
     package_id: int,
@@ -190,27 +197,23 @@ async def agregar_setup_a_package(
     if not file.filename.endswith(".stp"):
         raise HTTPException(400, "Solo se aceptan archivos .stp")
     
-    # Guardar temporalmente
-    temp_path = f"temp_{file.filename}"
-    with open(temp_path, "wb") as buffer:
-        shutil.copyfileobj(file.file, buffer)
-    
-    # Parsear
+    # Parsear directo del buffer del upload (sin archivo temporal)
     try:
-        parsed_data = parse_setup(temp_path)
+        contenido = await file.read()
+        parsed_data = parser_cache.parse_setup_cacheado(contenido, file.filename)
     except Exception as e:
-        os.remove(temp_path)
         raise HTTPException(500, f"Error parseando: {str(e)}")
     
-    # Limpiar temporal
-    os.remove(temp_path)
-    
-    # Agregar part al package
+    # Registrar en el catálogo y agregar part al package
+    setup = setup_catalogo_service.registrar_setup(
+        db, parsed_data, content_hash=hashlib.sha256(contenido).hexdigest()
+    )
     new_part = PackagePart(
         package_id=package_id,
         part_filename=file.filename.replace("temp_", "").replace(".stp", ""),
         cantidad=cantidad,
-        parsed_data=parsed_data
+        setup=setup,
+        parsed_data_json=None
     )
     db.add(new_part)
     db.commit()
@@ -239,6 +242,8 @@ async def preview_archivos(
     preview_data = []
     errores = []
     
+    # Leer uploads válidos; el parseo se reparte en el pool de procesos
+    validos = []
     for idx, file in enumerate(files):
         # Validar extensión
         if not file.filename.endswith(".stp"):
@@ -248,38 +253,33 @@ async def preview_archivos(
             })
             continue
         
-        # Guardar temporalmente
-        temp_path = f"temp_{file.filename}"
-        try:
-            with open(temp_path, "wb") as buffer:
-                shutil.copyfileobj(file.file, buffer)
-            
-            # Parsear
-            parsed_data = parse_setup(temp_path)
-            
-            # Limpiar temporal
-            os.remove(temp_path)
-            
-            # Agregar a preview
-            preview_data.append({
-                "index": idx,
-                "filename": file.filename,
-                "part_number": parsed_data.get("part_number", "N/A"),
-                "thickness": parsed_data.get("thickness", "N/A"),
-                "sheet_size": parsed_data.get("sheet_size", "N/A"),
-                "total_stations": len(parsed_data.get("stations", [])),
-                "runtime": parsed_data.get("runtime", "N/A"),
-                "uph": parsed_data.get("uph", "N/A"),
-                "parsed_data_complete": parsed_data  # Datos completos para confirmar después
-            })
-            
-        except Exception as e:
-            if os.path.exists(temp_path):
-                os.remove(temp_path)
+        contenido = await file.read()
+        validos.append((idx, file.filename, contenido))
+    
+    resultados = await parser_cache.parse_setups_en_pool(
+        [(contenido, filename) for _, filename, contenido in validos]
+    )
+    
+    for (idx, filename, _), parsed_data in zip(validos, resultados):
+        if isinstance(parsed_data, Exception):
             errores.append({
-                "archivo": file.filename,
-                "error": f"Error al parsear: {str(e)}"
+                "archivo": filename,
+                "error": f"Error al parsear: {str(parsed_data)}"
             })
+            continue
+        
+        # Agregar a preview
+        preview_data.append({
+            "index": idx,
+            "filename": filename,
+            "part_number": parsed_data.get("part_number", "N/A"),
+            "thickness": parsed_data.get("thickness", "N/A"),
+            "sheet_size": parsed_data.get("sheet_size", "N/A"),
+            "total_stations": len(parsed_data.get("stations", [])),
+            "runtime": parsed_data.get("runtime", "N/A"),
+            "uph": parsed_data.get("uph", "N/A"),
+            "parsed_data_complete": parsed_data  # Datos completos para confirmar después
+        })
     
     return {
         "message": "Preview generado. Asigna cantidades y usa /package/confirmar para guardar.",
@@ -344,4 +344,42 @@ async def confirmar_package(
             "total_parts": len(package.parts),
             "expira_en": "24 horas"
         }
-    }
\ No newline at end of file
+    }
+
+@router.post("/desde_catalogo")
+def crear_package_desde_catalogo(
+    db: Session = Depends(get_db),
+    nombre: str = Form(...),
+    descripcion: str = Form(""),
+    items: str = Form(...)  # JSON: [{"part_full": "TYEH-1153513_00-SW", "cantidad": 10}]
+):
+    """
+    Crea un package con setups que ya están en el catálogo (GET /setup/catalogo),
+    sin volver a subir ni parsear los archivos.
+    """
+    import json
+    
+    try:
+        items_list = json.loads(items)
+        if not isinstance(items_list, list) or not items_list:
+            raise ValueError("Debe ser una lista con al menos un setup")
+        for item in items_list:
+            if "part_full" not in item or "cantidad" not in item:
+                raise ValueError("Cada item requiere part_full y cantidad")
+    except (json.JSONDecodeError, ValueError, TypeError) as e:
+        raise HTTPException(400, f'items debe ser JSON válido: [{{"part_full": ..., "cantidad": ...}}] ({str(e)})')
+    
+    try:
+        package = package_service.crear_package_desde_catalogo(db, nombre, descripcion, items_list)
+    except ValueError as e:
+        raise HTTPException(404, str(e))
+    
+    return {
+        "message": "Package creado exitosamente",
+        "data": {
+            "id": package.id,
+            "nombre": package.nombre,
+            "total_parts": len(package.parts),
+            "expira_en": "24 horas"
+        }
+    }
@@ -0,0 +1,52 @@
+from fastapi import APIRouter, Depends, HTTPException
+from sqlalchemy.orm import Session
+from app.database.db import get_db
+from app.services import setup_catalogo_service
+from typing import Optional
+
+router = APIRouter(prefix="/setup", tags=["SETUPS"])
+
+@router.get("/catalogo")
+def listar_catalogo(number: Optional[str] = None, db: Session = Depends(get_db)):
+    """Lista los setups del catálogo (filtro opcional por número de parte)"""
+    setups = setup_catalogo_service.listar_catalogo(db, number)
+    return {
+        "total": len(setups),
+        "data": [
+            {
+                "id": s.id,
+                "part_full": s.part_full,
+                "number": s.number,
+                "version": s.version,
+                "thickness": s.thickness,
+                "sheet_size": [s.sheet_x, s.sheet_y],
+                "total_stations": len(s.stations.split(",")) if s.stations else 0,
+                "uph": s.uph,
+                "actualizado": s.actualizado
+            }
+            for s in setups
+        ]
+    }
+
+@router.get("/catalogo/{part_full}")
+def obtener_setup_catalogo(part_full: str, db: Session = Depends(get_db)):
+    """Detalle de un setup del catálogo (incluye el parsed_data completo)"""
+    setup = setup_catalogo_service.obtener_setup(db, part_full)
+    if not setup:
+        raise HTTPException(404, "Setup no encontrado en el catálogo")
+    
+    return {
+        "id": setup.id,
+        "part_full": setup.part_full,
+        "content_hash": setup.content_hash,
+        "actualizado": setup.actualizado,
+        "info": setup.parsed_data
+    }
+
+@router.post("/admin/vincular_parts")
+def vincular_parts_existentes(db: Session = Depends(get_db)):
+    """Migra los parts que guardan su propio parsed_data al catálogo"""
+    count = setup_catalogo_service.vincular_parts_existentes(db)
+    return {
+        "message": f"{count} parts vinculados al catálogo de setups"
+    }
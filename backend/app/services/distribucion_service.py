@@ -1,15 +1,52 @@
-from sqlalchemy.orm import Session
+from sqlalchemy.orm import Session, joinedload, selectinload
 from app.models.package_model import Package
+from app.models.package_part_model import PackagePart
 from app.models.machine_model import Machine
 from app.models.distribucion_model import *
-from typing import List, Dict, Tuple
-from collections import defaultdict, Counter
+from typing import Callable, List, Dict, Optional, Tuple
+from collections import defaultdict, deque, Counter
+import hashlib
 import json
 from app.utils.algoritmo_asignacion import (
     asignar_optimizado_final,
     generar_reporte_asignacion,
-    calcular_carga_maquina
+    calcular_carga_maquina,
+    es_redondo
 )
+from app.utils.solver_exacto import resolver_exacto_en_pool
+from app.utils.busqueda_local import mejorar_asignacion
+from app.utils.portafolio import resolver_portafolio
+from app.utils.barrido import barrido_asignacion
+from app.utils.prechequeo import prechequeo_factibilidad
+from app.utils.templates_compilados import compilar_maquina, compilar_template
+from app.utils.asignacion_maquinas import (
+    asignar_en_maquinas,
+    capacidad_maquina,
+    emparejar_con_maquinas,
+    parte_elegible,
+    reparar_plan,
+)
+
+
+VERSION_HUELLA = 1  # Subir cuando cambie el solver: los resultados en caché dejan de aplicar
+
+
+def cargar_package(db: Session, package_id: int) -> Package:
+    """
+    Package con sus parts y el setup del catálogo de cada part, con un
+    número fijo de queries (selectinload) sin importar cuántos parts tenga.
+    """
+    return db.query(Package).options(
+        selectinload(Package.parts).selectinload(PackagePart.setup)
+    ).filter(Package.id == package_id).first()
+
+
+def cargar_machines(db: Session, machine_ids: List[int]) -> List[Machine]:
+    """Máquinas activas con su template en una sola query (joinedload)"""
+    return db.query(Machine).options(joinedload(Machine.template)).filter(
+        Machine.id.in_(machine_ids),
+        Machine.activa == 1
+    ).all()
 
 
 def agrupar_parts_por_preferencias(requerimientos: Dict) -> List[Dict]:
@@ -107,7 +144,7 @@ def crear_distribucion(
     """
     
     # 1. Obtener package y validar
-    package = db.query(Package).filter(Package.id == package_id).first()
+    package = cargar_package(db, package_id)
     if not package:
         raise ValueError(f"Package {package_id} no encontrado")
     
@@ -115,10 +152,7 @@ def crear_distribucion(
         raise ValueError(f"Package {package_id} no tiene setups")
     
     # 2. Obtener máquinas y validar
-    machines = db.query(Machine).filter(
-        Machine.id.in_(machine_ids),
-        Machine.activa == 1
-    ).all()
+    machines = cargar_machines(db, machine_ids)
     
     if not machines:
         raise ValueError("No hay máquinas activas disponibles")
@@ -244,18 +278,6 @@ def aplicar_reglas_duras(
     for machine in machines:
         es_compatible = True
         
-        # Obtener template config - ya es dict, no necesita json.loads
-        if hasattr(machine.template, 'estaciones_config'):
-            if isinstance(machine.template.estaciones_config, str):
-                template_config = json.loads(machine.template.estaciones_config)
-            else:
-                template_config = machine.template.estaciones_config
-        else:
-            template_config = {}
-        
-        estaciones_dañadas_str = [str(e) for e in machine.estaciones_dañadas]
-        estaciones_disponibles = [est for est in template_config.keys() if est not in estaciones_dañadas_str]
-        
         for req_data in requerimientos.values():
             # Regla 1: Thickness compatible
             thickness = req_data["thickness"]
@@ -451,9 +473,7 @@ def procesar_herramientas_part(req_data: Dict, machine_data: Dict, machine: Mach
             for st, tn, ang in zip(stations, tool_numbers, angles)
         ]
     
-    template_config = machine.template.estaciones_config
-    if isinstance(template_config, str):
-        template_config = json.loads(template_config)
+    template = compilar_template(machine.template)
     
     for tool_info in tools_data:
         tn = tool_info["tool_number"]
@@ -461,10 +481,7 @@ def procesar_herramientas_part(req_data: Dict, machine_data: Dict, machine: Mach
         angle = tool_info.get("angle", 0.0)
         
         # Determinar si requiere guía (por estación original)
-        station_config = template_config.get(station_orig, {})
-        requiere_guia = station_config.get("tiene_guia", False)
-        es_autoindex = station_config.get("es_autoindex", False)
-        tipo_estacion = station_config.get("tipo", "A")
+        tipo_estacion, requiere_guia, es_autoindex = template.info_estacion(station_orig)
         
         # Si ya está unificada esta herramienta, actualizar info
         if tn in machine_data["herramientas_unificadas"]:
@@ -492,21 +509,27 @@ def procesar_herramientas_part(req_data: Dict, machine_data: Dict, machine: Mach
             }
 
 
+def estaciones_libres_por_tipo(por_tipo: Dict[Tuple, List[str]], ocupadas: set) -> Dict[Tuple, deque]:
+    """
+    Estaciones libres agrupadas por (tipo, tiene_guia), cada grupo en el orden
+    del template (el mismo en que generar_estilo las recorría). `por_tipo`
+    viene compilado por máquina (ya sin las dañadas).
+    """
+    return {
+        llave: deque(est for est in estaciones if est not in ocupadas)
+        for llave, estaciones in por_tipo.items()
+    }
+
+
 def generar_estilo(herramientas_unificadas: Dict, machine: Machine) -> Tuple[List[EstiloEstacion], List[EstiloEstacion]]:
     """
     Genera el estilo de distribución de herramientas por estación.
     Cada TN único va a UNA sola estación (unificación real).
     Retorna (estilo_normal, estilo_overflow)
     """
-    template_config = machine.template.estaciones_config
-    if isinstance(template_config, str):
-        template_config = json.loads(template_config)
-    
-    estaciones_dañadas = [str(e) for e in machine.estaciones_dañadas]
-    estaciones_disponibles = {
-        est: config for est, config in template_config.items()
-        if est not in estaciones_dañadas
-    }
+    # Template compilado y estaciones dañadas de la máquina (caché en proceso)
+    maquina_compilada = compilar_maquina(machine)
+    estaciones_disponibles = maquina_compilada.disponibles
     
     estilo = []
     estilo_overflow = []
@@ -539,47 +562,41 @@ def generar_estilo(herramientas_unificadas: Dict, machine: Machine) -> Tuple[Lis
     # Importar función para detectar redondos
     from app.utils.algoritmo_asignacion import es_redondo
     
-    # Luego asignar resto de herramientas respetando tipo y guía
-    for tool_data in herramientas_unicas:
-        if tool_data["es_autoindex"]:
-            continue  # Ya asignada
-        
+    # Luego buscar estación para el resto respetando tipo y guía.
+    # Primero las NO redondas (tipo y guía exactos) y después los redondos,
+    # que son flexibles: así un redondo nunca ocupa la estación que otra
+    # herramienta necesita (misma regla que usa herramientas_fuera al asignar)
+    # Estaciones libres agrupadas por (tipo, guía) en el orden del template:
+    # tomar estación es un popleft en vez de recorrer todas las estaciones
+    libres = estaciones_libres_por_tipo(maquina_compilada.por_tipo, estaciones_asignadas)
+    no_autoindex = [t for t in herramientas_unicas if not t["es_autoindex"]]
+    estacion_por_tn = {}
+    for tool_data in sorted(no_autoindex, key=lambda t: es_redondo(t["tool_number"])):
         tn = tool_data["tool_number"]
         es_herramienta_redonda = es_redondo(tn)
         
-        # Buscar estación compatible
-        station_asignada = None
-        
         if es_herramienta_redonda:
             # REDONDOS: Flexibles con guía, PRIORIZAR estaciones sin guía
-            # Prioridad 1: Buscar estación SIN guía del tipo correcto
-            for est, config in estaciones_disponibles.items():
-                if est in estaciones_asignadas:
-                    continue
-                if config["tipo"] == tool_data["tipo_estacion"] and config["tiene_guia"] == False:
-                    station_asignada = est
-                    estaciones_asignadas.add(est)
-                    break
-            
-            # Prioridad 2: Si no hay sin guía, usar CON guía
-            if not station_asignada:
-                for est, config in estaciones_disponibles.items():
-                    if est in estaciones_asignadas:
-                        continue
-                    if config["tipo"] == tool_data["tipo_estacion"] and config["tiene_guia"] == True:
-                        station_asignada = est
-                        estaciones_asignadas.add(est)
-                        break
+            # (prioridad 1: sin guía del tipo correcto, 2: con guía)
+            llaves = ((tool_data["tipo_estacion"], False), (tool_data["tipo_estacion"], True))
         else:
             # NO REDONDOS: Debe coincidir tipo Y guía exactamente
-            for est, config in estaciones_disponibles.items():
-                if est in estaciones_asignadas:
-                    continue
-                if (config["tipo"] == tool_data["tipo_estacion"] and
-                    config["tiene_guia"] == tool_data["requiere_guia"]):
-                    station_asignada = est
-                    estaciones_asignadas.add(est)
-                    break
+            llaves = ((tool_data["tipo_estacion"], tool_data["requiere_guia"]),)
+        
+        # Buscar estación compatible
+        station_asignada = None
+        for llave in llaves:
+            if libres.get(llave):
+                station_asignada = libres[llave].popleft()
+                estaciones_asignadas.add(station_asignada)
+                break
+        
+        estacion_por_tn[tn] = station_asignada
+    
+    # Armar el estilo en el orden original de las herramientas
+    for tool_data in no_autoindex:
+        tn = tool_data["tool_number"]
+        station_asignada = estacion_por_tn[tn]
         
         estilo_item = EstiloEstacion(
             estacion=station_asignada if station_asignada else "SIN_ASIGNAR",
@@ -607,6 +624,164 @@ def generar_estilo(herramientas_unificadas: Dict, machine: Machine) -> Tuple[Lis
     return estilo, estilo_overflow
 
 
+def preparar_partes(requerimientos: Dict) -> List[dict]:
+    """Requerimientos → partes en el formato de los algoritmos de asignación"""
+    partes = []
+    for req_id, req_data in requerimientos.items():
+        parte_dict = {
+            'part_id': req_id,
+            'part_number': req_data['part_number'],
+            'filename': req_data['filename'],
+            'quantity': req_data['cantidad_total'],
+            'uph': req_data['uph'],
+            'thickness': req_data['thickness'],
+            'sheet_size': req_data['sheet_size'],
+            'tools': req_data['tool_numbers'],
+            'stations': req_data['stations'],
+            'parsed_data': req_data['parsed_data']
+        }
+        partes.append(parte_dict)
+    return partes
+
+
+def construir_asignacion_maquina(
+    machine: Machine,
+    partes_asignadas: List[dict],
+    requerimientos: Dict,
+    horas_objetivo: float,
+    estilo_previo: Tuple[List[EstiloEstacion], List[EstiloEstacion]] = None
+) -> AsignacionMaquina:
+    """
+    Arma la AsignacionMaquina de una máquina: parts, unificación de
+    herramientas, estilo y validaciones de tiempo/overflow.
+    Con estilo_previo (estilo, overflow) se conserva el estilo anterior en vez
+    de generarlo de nuevo (re-planificación sin cambios de herramienta).
+    """
+    # Crear asignaciones de parts
+    parts_asignados = []
+    herramientas_unificadas = {}
+    tiempo_total = 0.0
+    
+    for parte in partes_asignadas:
+        part_id = parte['part_id']
+        req_data = requerimientos[part_id]
+        
+        # Calcular horas de corrida
+        horas = parte['quantity'] / parte['uph'] if parte['uph'] > 0 else 0
+        tiempo_total += horas
+        
+        # Crear AsignacionPart
+        part_number_str = parte['part_number']
+        if isinstance(part_number_str, dict):
+            part_number_str = part_number_str.get("full", "N/A")
+        
+        asignacion_part = AsignacionPart(
+            part_filename=parte['filename'],
+            part_number=part_number_str,
+            cantidad_requerida=parte['quantity'],
+            cantidad_asignada=parte['quantity'],
+            horas_corrida=round(horas, 2),
+            estaciones_usadas=len(parte['stations']),
+            estaciones_unificadas=0  # Se calculará después
+        )
+        parts_asignados.append(asignacion_part)
+        
+        # Procesar herramientas para unificación
+        machine_data = {
+            "herramientas_unificadas": herramientas_unificadas,
+            "machine": machine,
+            "parts_asignados": parts_asignados,
+            "tiempo_usado": tiempo_total,
+            "alertas": [],
+            "errores": []
+        }
+        procesar_herramientas_part(
+            req_data,
+            machine_data,
+            machine,
+            part_number_str
+        )
+    
+    # Generar estilo (o conservar el anterior, solo con las herramientas que siguen en uso)
+    if estilo_previo is None:
+        estilo, estilo_overflow = generar_estilo(herramientas_unificadas, machine)
+    else:
+        estilo, estilo_overflow = filtrar_estilo(estilo_previo, herramientas_unificadas)
+    
+    # Actualizar conteo de estaciones unificadas
+    for part in parts_asignados:
+        part.estaciones_unificadas = len(estilo)
+    
+    # Validación CRÍTICA de tiempo (REGLA DURA)
+    alertas = []
+    errores = []
+    
+    if tiempo_total > horas_objetivo:
+        errores.append(
+            f"❌ ERROR CRÍTICO: Tiempo asignado ({tiempo_total:.2f}h) excede límite ({horas_objetivo:.2f}h). "
+            f"Esto NO debería ocurrir - Bug en algoritmo."
+        )
+    elif tiempo_total > horas_objetivo * 0.95:
+        alertas.append(f"✅ Utilización óptima: {(tiempo_total/horas_objetivo)*100:.1f}% del tiempo disponible")
+    
+    # Validación de overflow de estaciones (REGLA BLANDA)
+    if len(estilo_overflow) > 10:
+        errores.append(f"⚠️ Overflow: {len(estilo_overflow)} herramientas fuera del estilo (excede tolerancia +10)")
+    elif len(estilo_overflow) > 0:
+        alertas.append(f"⚠️ {len(estilo_overflow)} herramientas en overflow (dentro de tolerancia +10)")
+    
+    return AsignacionMaquina(
+        machine_id=machine.id,
+        machine_nombre=machine.nombre,
+        tipo_maquina=machine.template.tipo_maquina,
+        parts_asignados=parts_asignados,
+        tiempo_total_usado=round(tiempo_total, 2),
+        tiempo_disponible=horas_objetivo,
+        tiempo_sobrante=round(horas_objetivo - tiempo_total, 2),
+        estilo=estilo,
+        estaciones_fuera_estilo=estilo_overflow,
+        alertas=alertas,
+        errores=errores
+    )
+
+
+def filtrar_estilo(
+    estilo_previo: Tuple[List[EstiloEstacion], List[EstiloEstacion]],
+    herramientas_unificadas: Dict
+) -> Tuple[List[EstiloEstacion], List[EstiloEstacion]]:
+    """
+    Conserva las estaciones de un estilo anterior para las herramientas que
+    siguen en uso (sin mover ninguna) y actualiza qué parts las usan.
+    Retorna (estilo_normal, estilo_overflow)
+    """
+    resultado = []
+    for items in estilo_previo:
+        resultado.append([
+            item.model_copy(update={"parts_que_usan": herramientas_unificadas[item.tool_number]["parts"]})
+            for item in items
+            if item.tool_number in herramientas_unificadas
+        ])
+    return resultado[0], resultado[1]
+
+
+def estilo_vigente(estilo: List[EstiloEstacion], machine: Machine) -> bool:
+    """
+    Si un estilo guardado todavía se puede montar en la máquina, con las
+    mismas reglas de generar_estilo: cada estación sigue disponible (existe
+    en el template y no está dañada), es del tipo de la herramienta y, si no
+    es redondo ni autoindex, tiene la misma guía. Si la máquina o su template
+    cambiaron de forma que el estilo ya no cabe, no se conserva.
+    """
+    disponibles = compilar_maquina(machine).disponibles
+    for item in estilo:
+        config = disponibles.get(item.estacion)
+        if config is None or config.get("tipo") != item.tipo:
+            return False
+        if not item.es_autoindex and not es_redondo(item.tool_number) and config.get("tiene_guia") != item.tiene_guia:
+            return False
+    return True
+
+
 def evaluar_factibilidad(
     asignaciones: List[AsignacionMaquina],
     requerimientos: Dict,
@@ -684,10 +859,12 @@ def evaluar_factibilidad(
 def generar_resumen(
     asignaciones: List[AsignacionMaquina],
     demanda: int,
-    horas_objetivo: float
+    horas_objetivo: float,
+    info_solver: Dict = None
 ) -> Dict:
     """
     Genera resumen de la distribución
+    (info_solver: datos del modo de solver usado, se agregan al resumen)
     """
     total_horas_usadas = sum(a.tiempo_total_usado for a in asignaciones)
     total_parts_procesados = sum(len(a.parts_asignados) for a in asignaciones)
@@ -698,24 +875,134 @@ def generar_resumen(
         "horas_objetivo": horas_objetivo,
         "total_horas_productivas": round(total_horas_usadas, 2),
         "eficiencia_promedio": round((total_horas_usadas / (len(asignaciones) * horas_objetivo) * 100) if asignaciones else 0, 1),
-        "total_parts_distintos": total_parts_procesados
+        "total_parts_distintos": total_parts_procesados,
+        **(info_solver or {})
     }
 
 
+def guardar_distribucion(
+    db: Session,
+    distribucion: DistribucionResponse,
+    machine_ids: List[int],
+    huella: Optional[str] = None
+):
+    """Guarda la distribución en BD (tabla distribuciones)"""
+    from app.models.distribucion_storage_model import DistribucionStorage
+    
+    dist_storage = DistribucionStorage(
+        package_id=distribucion.package_id,
+        package_nombre=distribucion.package_nombre,
+        demanda=distribucion.demanda,
+        horas_objetivo=distribucion.horas_objetivo,
+        machine_ids=machine_ids,
+        resultado_json=json.loads(distribucion.model_dump_json()),
+        es_factible=distribucion.es_factible,
+        huella=huella
+    )
+    db.add(dist_storage)
+    db.commit()
+    db.refresh(dist_storage)
+    return dist_storage
+
+
+def huella_distribucion(
+    package: Package,
+    machines: List[Machine],
+    parametros: Dict
+) -> str:
+    """
+    Huella determinista (SHA-256) de una solicitud de distribución:
+    - parámetros de la solicitud (machine_ids sin orden ni repetidos)
+    - package: nombre y, por part, cantidad y parsed_data
+    - máquinas activas: nombre, template (tipo y hash de su config),
+      estaciones dañadas, mesa y grosor
+    Cualquier cambio en el package o en una máquina da otra huella, así un
+    resultado guardado deja de aplicar solo (no hay que invalidarlo a mano).
+    """
+    datos = {
+        "version": VERSION_HUELLA,
+        "parametros": {**parametros, "machine_ids": sorted(set(parametros["machine_ids"]))},
+        "package": [package.id, package.nombre],
+        "parts": [
+            [part.id, part.part_filename, part.cantidad, part.parsed_data]
+            for part in sorted(package.parts, key=lambda p: p.id)
+        ],
+        "machines": [
+            [
+                m.id, m.nombre, m.template_id,
+                m.template.tipo_maquina if m.template else None,
+                compilar_template(m.template).hash,
+                sorted(str(e) for e in (m.estaciones_dañadas or [])),
+                m.mesa_x, m.mesa_y, m.thickness_min, m.thickness_max
+            ]
+            for m in sorted(machines, key=lambda m: m.id)
+        ],
+    }
+    return hashlib.sha256(json.dumps(datos, sort_keys=True, default=str).encode()).hexdigest()
+
+
+def buscar_distribucion_en_cache(db: Session, huella: str):
+    """Distribución vigente (activa y sin expirar) guardada con la misma huella"""
+    from app.models.distribucion_storage_model import DistribucionStorage
+    from datetime import datetime
+    
+    return db.query(DistribucionStorage).filter(
+        DistribucionStorage.huella == huella,
+        DistribucionStorage.activa == True,
+        DistribucionStorage.expires_at > datetime.utcnow()
+    ).order_by(DistribucionStorage.id.desc()).first()
+
+
 def crear_distribucion_optimizada(
     db: Session,
     package_id: int,
     demanda: int,
     horas_objetivo: float,
-    machine_ids: List[int]
+    machine_ids: List[int],
+    modo_solver: str = "greedy",
+    tiempo_limite_seg: float = 10.0,
+    busqueda_local: bool = False,
+    semilla: int = 0,
+    usar_cache: bool = True,
+    progreso: Optional[Callable[..., None]] = None
 ) -> DistribucionResponse:
     """
     Algoritmo optimizado de distribución usando compatibilidad, UPH y minimización de máquinas.
     Esta es la versión mejorada que reemplaza la lógica antigua.
+    
+    modo_solver:
+    - "greedy": asignar_optimizado_final (rápido)
+    - "exacto": branch-and-bound anytime con presupuesto tiempo_limite_seg, en
+      el pool de procesos; el resumen incluye la cota inferior de máquinas y si
+      el óptimo está probado
+    - "portafolio": greedy con varios órdenes y umbrales en el pool de procesos,
+      se queda el mejor plan (determinista para una semilla)
+    - "maquinas": asigna directo a las máquinas reales en una pasada, con la
+      capacidad de cada una (estaciones por tipo/guía sin las dañadas, grosor,
+      mesa y horas); no genera herramientas fuera del estilo
+    
+    En los otros modos cada máquina virtual se empareja con la máquina real
+    libre que cumple grosor/mesa para sus partes y donde quedan menos
+    herramientas fuera del estilo.
+    
+    busqueda_local=True agrega una fase de mejora (mover/swap/dividir con
+    recocido simulado) y reporta en el resumen cuánto mejoró.
+    
+    Con usar_cache=True, si ya hay una distribución vigente guardada con la
+    misma huella (huella_distribucion: solicitud + estado del package y de
+    las máquinas) se devuelve esa sin correr el solver; el resumen lo indica
+    con "desde_cache" y el id de la distribución guardada.
+    
+    progreso(fase, **datos) se llama al entrar a cada fase ("cargando",
+    "prechequeo", "resolviendo", "busqueda_local", "construyendo",
+    "guardando") y con mejor_maquinas cada vez que el solver encuentra un
+    plan con menos máquinas (trabajos en segundo plano).
     """
+    avisar = progreso or (lambda fase, **datos: None)
     
     # 1. Obtener package y validar
-    package = db.query(Package).filter(Package.id == package_id).first()
+    avisar("cargando")
+    package = cargar_package(db, package_id)
     if not package:
         raise ValueError(f"Package {package_id} no encontrado")
     
@@ -723,21 +1010,47 @@ def crear_distribucion_optimizada(
         raise ValueError(f"Package {package_id} no tiene parts")
     
     # 2. Obtener máquinas y validar
-    machines = db.query(Machine).filter(
-        Machine.id.in_(machine_ids),
-        Machine.activa == 1
-    ).all()
+    machines = cargar_machines(db, machine_ids)
     
     if not machines:
         raise ValueError("No hay máquinas activas disponibles")
     
+    # Caché de resultados: misma solicitud sobre el mismo package y máquinas
+    huella = huella_distribucion(package, machines, {
+        "demanda": demanda,
+        "horas_objetivo": horas_objetivo,
+        "machine_ids": machine_ids,
+        "modo_solver": modo_solver,
+        "tiempo_limite_seg": tiempo_limite_seg,
+        "busqueda_local": busqueda_local,
+        "semilla": semilla,
+    })
+    if usar_cache:
+        guardada = buscar_distribucion_en_cache(db, huella)
+        if guardada is not None:
+            distribucion = DistribucionResponse(**guardada.resultado_json)
+            distribucion.resumen = {**distribucion.resumen, "desde_cache": True, "distribucion_id": guardada.id}
+            return distribucion
+    
     # 3. Calcular requerimientos totales
     requerimientos = calcular_requerimientos(package, demanda)
     
-    # 4. Aplicar reglas duras (filtrar máquinas incompatibles)
-    machines_compatibles = aplicar_reglas_duras(package, machines, requerimientos)
-    
-    if not machines_compatibles:
+    # 4. Aplicar reglas duras por part (grosor y mesa): una máquina queda si
+    #    puede correr al menos un part; qué part va en cuál lo decide la asignación
+    capacidades = {m.id: capacidad_maquina(m) for m in machines}
+    machines_compatibles = [
+        m for m in machines
+        if any(parte_elegible(req_data, capacidades[m.id]) for req_data in requerimientos.values())
+    ]
+    parts_sin_maquina = [
+        req_data["part_number"] for req_data in requerimientos.values()
+        if not any(parte_elegible(req_data, capacidades[m.id]) for m in machines)
+    ]
+    
+    if not machines_compatibles or parts_sin_maquina:
+        errores = ["No hay máquinas compatibles con las especificaciones del package"]
+        if parts_sin_maquina:
+            errores.append(f"Parts sin máquina compatible (grosor/mesa): {', '.join(parts_sin_maquina)}")
         return DistribucionResponse(
             package_id=package_id,
             package_nombre=package.nombre,
@@ -746,40 +1059,86 @@ def crear_distribucion_optimizada(
             asignaciones=[],
             es_factible=False,
             alertas_generales=[],
-            errores_generales=["No hay máquinas compatibles con las especificaciones del package"],
+            errores_generales=errores,
             resumen={}
         )
+    capacidades_compatibles = [capacidades[m.id] for m in machines_compatibles]
     
     # 5. Preparar datos para el algoritmo optimizado
-    partes_para_algoritmo = []
-    for req_id, req_data in requerimientos.items():
-        parte_dict = {
-            'part_id': req_id,
-            'part_number': req_data['part_number'],
-            'filename': req_data['filename'],
-            'quantity': req_data['cantidad_total'],
-            'uph': req_data['uph'],
-            'thickness': req_data['thickness'],
-            'sheet_size': req_data['sheet_size'],
-            'tools': req_data['tool_numbers'],
-            'stations': req_data['stations'],
-            'parsed_data': req_data['parsed_data']
-        }
-        partes_para_algoritmo.append(parte_dict)
+    partes_para_algoritmo = preparar_partes(requerimientos)
+    
+    # Pre-chequeo: si la cota inferior ya no cabe, no correr el solver
+    avisar("prechequeo")
+    prechequeo = prechequeo_factibilidad(partes_para_algoritmo, capacidades_compatibles, horas_objetivo)
+    if not prechequeo["factible_posible"]:
+        return DistribucionResponse(
+            package_id=package_id,
+            package_nombre=package.nombre,
+            demanda=demanda,
+            horas_objetivo=horas_objetivo,
+            asignaciones=[],
+            es_factible=False,
+            alertas_generales=[],
+            errores_generales=[f"❌ CAPACIDAD INSUFICIENTE: {motivo}" for motivo in prechequeo["motivos"]] + [
+                "Solución: Añadir más máquinas, reducir demanda o aumentar horas objetivo."
+            ],
+            resumen={"prechequeo": prechequeo}
+        )
     
     # 6. Ejecutar algoritmo optimizado con REGLA DURA de tiempo
-    asignaciones_optimizadas = asignar_optimizado_final(
-        partes=partes_para_algoritmo,
-        horas_objetivo=horas_objetivo,  # LÍMITE ABSOLUTO de tiempo
-        umbral_compatibilidad=70
-    )
+    avisar("resolviendo", cota_inferior=prechequeo["cota_inferior_maquinas"])
+    al_mejorar = lambda maquinas: avisar("resolviendo", mejor_maquinas=maquinas)
+    if modo_solver == "maquinas":
+        # Directo sobre las máquinas reales (capacidad por tipo/guía, dañadas, grosor, mesa)
+        plan, alertas_plan = asignar_en_maquinas(
+            partes=partes_para_algoritmo,
+            capacidades=capacidades_compatibles,
+            horas_objetivo=horas_objetivo
+        )
+        asignaciones_optimizadas = None
+        info_solver = {"modo_solver": "maquinas"}
+    elif modo_solver == "exacto":
+        asignaciones_optimizadas, info_solver = resolver_exacto_en_pool(
+            partes=partes_para_algoritmo,
+            horas_objetivo=horas_objetivo,
+            umbral_compatibilidad=70,
+            tiempo_limite_seg=tiempo_limite_seg,
+            al_mejorar=al_mejorar
+        )
+    elif modo_solver == "portafolio":
+        asignaciones_optimizadas, info_solver = resolver_portafolio(
+            partes=partes_para_algoritmo,
+            horas_objetivo=horas_objetivo,
+            semilla=semilla,
+            al_mejorar=al_mejorar
+        )
+    else:
+        asignaciones_optimizadas = asignar_optimizado_final(
+            partes=partes_para_algoritmo,
+            horas_objetivo=horas_objetivo,  # LÍMITE ABSOLUTO de tiempo
+            umbral_compatibilidad=70
+        )
+        info_solver = {"modo_solver": "greedy"}
+    
+    if busqueda_local and asignaciones_optimizadas is not None:
+        avisar("busqueda_local")
+        asignaciones_optimizadas, info_solver["busqueda_local"] = mejorar_asignacion(
+            partes=partes_para_algoritmo,
+            asignaciones=asignaciones_optimizadas,
+            horas_objetivo=horas_objetivo,
+            tiempo_limite_seg=tiempo_limite_seg,
+            semilla=semilla
+        )
     
     # 7. Convertir resultado del algoritmo al formato de AsignacionMaquina
+    avisar("construyendo", mejor_maquinas=(
+        len(asignaciones_optimizadas) if asignaciones_optimizadas is not None else len(plan)
+    ))
     asignaciones_response = []
     machines_dict = {m.id: m for m in machines_compatibles}
     
     # Validar que haya suficientes máquinas
-    maquinas_necesarias = len(asignaciones_optimizadas)
+    maquinas_necesarias = len(asignaciones_optimizadas) if asignaciones_optimizadas is not None else len(plan)
     if maquinas_necesarias > len(machines_compatibles):
         return DistribucionResponse(
             package_id=package_id,
@@ -796,95 +1155,19 @@ def crear_distribucion_optimizada(
             resumen={}
         )
     
-    for maq_num, partes_asignadas in asignaciones_optimizadas.items():
-        # Obtener máquina correspondiente
-        machine = machines_compatibles[maq_num - 1]
-        
-        # Crear asignaciones de parts
-        parts_asignados = []
-        herramientas_unificadas = {}
-        tiempo_total = 0.0
-        
-        for parte in partes_asignadas:
-            part_id = parte['part_id']
-            req_data = requerimientos[part_id]
-            
-            # Calcular horas de corrida
-            horas = parte['quantity'] / parte['uph'] if parte['uph'] > 0 else 0
-            tiempo_total += horas
-            
-            # Crear AsignacionPart
-            part_number_str = parte['part_number']
-            if isinstance(part_number_str, dict):
-                part_number_str = part_number_str.get("full", "N/A")
-            
-            asignacion_part = AsignacionPart(
-                part_filename=parte['filename'],
-                part_number=part_number_str,
-                cantidad_requerida=parte['quantity'],
-                cantidad_asignada=parte['quantity'],
-                horas_corrida=round(horas, 2),
-                estaciones_usadas=len(parte['stations']),
-                estaciones_unificadas=0  # Se calculará después
-            )
-            parts_asignados.append(asignacion_part)
-            
-            # Procesar herramientas para unificación
-            machine_data = {
-                "herramientas_unificadas": herramientas_unificadas,
-                "machine": machine,
-                "parts_asignados": parts_asignados,
-                "tiempo_usado": tiempo_total,
-                "alertas": [],
-                "errores": []
-            }
-            procesar_herramientas_part(
-                req_data,
-                machine_data,
-                machine,
-                part_number_str
-            )
-        
-        # Generar estilo
-        estilo, estilo_overflow = generar_estilo(herramientas_unificadas, machine)
-        
-        # Actualizar conteo de estaciones unificadas
-        for part in parts_asignados:
-            part.estaciones_unificadas = len(estilo)
-        
-        # Validación CRÍTICA de tiempo (REGLA DURA)
-        alertas = []
-        errores = []
-        
-        if tiempo_total > horas_objetivo:
-            errores.append(
-                f"❌ ERROR CRÍTICO: Tiempo asignado ({tiempo_total:.2f}h) excede límite ({horas_objetivo:.2f}h). "
-                f"Esto NO debería ocurrir - Bug en algoritmo."
-            )
-        elif tiempo_total > horas_objetivo * 0.95:
-            alertas.append(f"✅ Utilización óptima: {(tiempo_total/horas_objetivo)*100:.1f}% del tiempo disponible")
-        
-        # Validación de overflow de estaciones (REGLA BLANDA)
-        if len(estilo_overflow) > 10:
-            errores.append(f"⚠️ Overflow: {len(estilo_overflow)} herramientas fuera del estilo (excede tolerancia +10)")
-        elif len(estilo_overflow) > 0:
-            alertas.append(f"⚠️ {len(estilo_overflow)} herramientas en overflow (dentro de tolerancia +10)")
-        
-        asignacion = AsignacionMaquina(
-            machine_id=machine.id,
-            machine_nombre=machine.nombre,
-            tipo_maquina=machine.template.tipo_maquina,
-            parts_asignados=parts_asignados,
-            tiempo_total_usado=round(tiempo_total, 2),
-            tiempo_disponible=horas_objetivo,
-            tiempo_sobrante=round(horas_objetivo - tiempo_total, 2),
-            estilo=estilo,
-            estaciones_fuera_estilo=estilo_overflow,
-            alertas=alertas,
-            errores=errores
-        )
-        
-        asignaciones_response.append(asignacion)
+    # Máquinas virtuales → máquinas reales según capacidad y reglas duras
+    errores_plan = []
+    if asignaciones_optimizadas is not None:
+        plan, errores_plan = emparejar_con_maquinas(asignaciones_optimizadas, capacidades_compatibles)
+        alertas_plan = []
+    
+    for machine_id, partes_asignadas in plan.items():
+        asignaciones_response.append(construir_asignacion_maquina(
+            machines_dict[machine_id],
+            partes_asignadas,
+            requerimientos,
+            horas_objetivo
+        ))
     
     # 8. Evaluar factibilidad
     es_factible, alertas_gen, errores_gen = evaluar_factibilidad(
@@ -892,9 +1175,15 @@ def crear_distribucion_optimizada(
         requerimientos,
         horas_objetivo
     )
+    alertas_gen = alertas_plan + alertas_gen
+    if errores_plan:
+        # Grosor/mesa es regla dura: sin emparejamiento completo no es factible
+        es_factible = False
+        errores_gen = [f"❌ {error}" for error in errores_plan] + errores_gen
     
     # 9. Generar resumen
-    resumen = generar_resumen(asignaciones_response, demanda, horas_objetivo)
+    info_solver["cota_inferior_prechequeo"] = prechequeo["cota_inferior_maquinas"]
+    resumen = generar_resumen(asignaciones_response, demanda, horas_objetivo, info_solver)
     
     # 10. Crear respuesta
     distribucion_response = DistribucionResponse(
@@ -909,20 +1198,237 @@ def crear_distribucion_optimizada(
         resumen=resumen
     )
     
-    # 11. Guardar distribución en BD
+    # 11. Guardar distribución en BD (con su huella para el caché)
+    avisar("guardando")
+    guardada = guardar_distribucion(db, distribucion_response, machine_ids, huella)
+    distribucion_response.resumen["distribucion_id"] = guardada.id
+    
+    return distribucion_response
+
+
+def replanificar_distribucion(
+    db: Session,
+    distribucion_id: int,
+    demanda: int = None
+) -> DistribucionResponse:
+    """
+    Re-planificación incremental de una distribución guardada.
+    
+    Toma las cantidades actuales del package (por si se cambiaron con
+    actualizar_cantidades) y la demanda nueva (o la guardada), y repara solo
+    las máquinas afectadas con reparar_plan:
+    - máquinas sin cambios, o que solo cambian cantidades o pierden parts,
+      conservan su estilo (las herramientas que siguen en uso no se mueven)
+    - máquinas que reciben parts nuevos, o cuyo estilo ya no se puede montar
+      (estaciones dañadas o template cambiados), generan su estilo otra vez
+    El resultado se guarda como una distribución nueva.
+    """
     from app.models.distribucion_storage_model import DistribucionStorage
+    from datetime import datetime
+    
+    # 1. Distribución base
+    dist = db.query(DistribucionStorage).filter(
+        DistribucionStorage.id == distribucion_id,
+        DistribucionStorage.activa == True,
+        DistribucionStorage.expires_at > datetime.utcnow()
+    ).first()
+    if not dist:
+        raise ValueError(f"Distribución {distribucion_id} no encontrada o expirada")
+    
+    anterior = DistribucionResponse(**dist.resultado_json)
+    demanda = demanda if demanda is not None else dist.demanda
+    horas_objetivo = dist.horas_objetivo
+    
+    package = cargar_package(db, dist.package_id)
+    if not package or not package.parts:
+        raise ValueError(f"Package {dist.package_id} no encontrado o sin parts")
+    
+    machines = cargar_machines(db, dist.machine_ids)
+    if not machines:
+        raise ValueError("No hay máquinas activas disponibles")
+    machines_dict = {m.id: m for m in machines}
     
-    dist_storage = DistribucionStorage(
-        package_id=package_id,
+    # 2. Requerimientos nuevos y plan anterior en índices de parte
+    requerimientos = calcular_requerimientos(package, demanda)
+    partes = preparar_partes(requerimientos)
+    indice_por_archivo = {p['filename']: i for i, p in enumerate(partes)}
+    
+    plan_anterior = {}
+    asignacion_anterior = {}
+    for asig in anterior.asignaciones:
+        if asig.machine_id not in machines_dict:
+            continue  # Máquina desactivada: sus piezas se vuelven a asignar
+        asignacion_anterior[asig.machine_id] = asig
+        piezas = {}
+        for part in asig.parts_asignados:
+            idx = indice_por_archivo.get(part.part_filename)
+            if idx is not None:
+                piezas[idx] = piezas.get(idx, 0) + part.cantidad_asignada
+        plan_anterior[asig.machine_id] = piezas
+    
+    capacidades = [capacidad_maquina(m) for m in machines]
+    capacidades = [c for c in capacidades if any(parte_elegible(p, c) for p in partes)]
+    
+    # 3. Reparar solo lo que cambió
+    plan, alertas_plan = reparar_plan(partes, plan_anterior, capacidades, horas_objetivo)
+    
+    asignaciones_response = []
+    sin_cambios, solo_cantidades, reparadas, nuevas = [], [], [], []
+    for machine_id, piezas in plan.items():
+        partes_asignadas = [{**partes[idx], 'quantity': cantidad} for idx, cantidad in piezas.items()]
+        previo = asignacion_anterior.get(machine_id)
+        
+        estilo_previo = None
+        if (
+            previo is not None
+            and set(piezas) <= set(plan_anterior[machine_id])
+            and estilo_vigente(previo.estilo, machines_dict[machine_id])
+        ):
+            # Mismos parts (o menos) y la máquina no cambió (dañadas/template):
+            # mismas herramientas en las mismas estaciones
+            estilo_previo = (previo.estilo, previo.estaciones_fuera_estilo)
+            if piezas == plan_anterior[machine_id]:
+                sin_cambios.append(machine_id)
+            else:
+                solo_cantidades.append(machine_id)
+        elif previo is not None:
+            reparadas.append(machine_id)
+        else:
+            nuevas.append(machine_id)
+        
+        asignaciones_response.append(construir_asignacion_maquina(
+            machines_dict[machine_id],
+            partes_asignadas,
+            requerimientos,
+            horas_objetivo,
+            estilo_previo=estilo_previo
+        ))
+    
+    # 4. Factibilidad, resumen y guardado
+    es_factible, alertas_gen, errores_gen = evaluar_factibilidad(
+        asignaciones_response,
+        requerimientos,
+        horas_objetivo
+    )
+    info_solver = {
+        "modo_solver": "replanificacion",
+        "distribucion_base_id": distribucion_id,
+        "maquinas_sin_cambios": sin_cambios,
+        "maquinas_solo_cantidades": solo_cantidades,  # Estilo conservado
+        "maquinas_reparadas": reparadas,  # Recibieron parts o la máquina cambió: estilo nuevo
+        "maquinas_nuevas": nuevas,
+        "maquinas_liberadas": [m for m in plan_anterior if m not in plan]
+    }
+    
+    distribucion_response = DistribucionResponse(
+        package_id=package.id,
         package_nombre=package.nombre,
         demanda=demanda,
         horas_objetivo=horas_objetivo,
-        machine_ids=machine_ids,
-        resultado_json=json.loads(distribucion_response.model_dump_json()),
-        es_factible=es_factible
+        asignaciones=asignaciones_response,
+        es_factible=es_factible,
+        alertas_generales=alertas_plan + alertas_gen,
+        errores_generales=errores_gen,
+        resumen=generar_resumen(asignaciones_response, demanda, horas_objetivo, info_solver)
     )
-    db.add(dist_storage)
-    db.commit()
-    db.refresh(dist_storage)
+    guardar_distribucion(db, distribucion_response, dist.machine_ids)
     
     return distribucion_response
+
+
+def barrido_distribucion(
+    db: Session,
+    package_id: int,
+    demandas: List[int],
+    horas: List[float],
+    machine_ids: List[int],
+    modo_solver: str = "greedy"
+) -> Dict:
+    """
+    Barrido what-if: máquinas necesarias y factibilidad para cada
+    combinación de demanda y horas objetivo.
+    
+    Los requerimientos se calculan una vez (para demanda 1) y se escalan;
+    no se generan estilos ni se guarda nada en BD.
+    """
+    if any(d <= 0 for d in demandas) or any(h <= 0 for h in horas):
+        raise ValueError("demandas y horas deben ser mayores a 0")
+    
+    package = cargar_package(db, package_id)
+    if not package:
+        raise ValueError(f"Package {package_id} no encontrado")
+    if not package.parts:
+        raise ValueError(f"Package {package_id} no tiene parts")
+    
+    machines = cargar_machines(db, machine_ids)
+    if not machines:
+        raise ValueError("No hay máquinas activas disponibles")
+    
+    # Cantidades por UNA unidad de demanda
+    partes = preparar_partes(calcular_requerimientos(package, 1))
+    
+    todas = [capacidad_maquina(m) for m in machines]
+    capacidades = [c for c in todas if any(parte_elegible(p, c) for p in partes)]
+    
+    # Igual que /crear: un part que ninguna máquina puede correr (grosor/mesa)
+    # hace infactible cualquier combinación (no depende de demanda ni horas)
+    parts_sin_maquina = [
+        p['part_number'] for p in partes
+        if not any(parte_elegible(p, c) for c in todas)
+    ]
+    
+    resultado = barrido_asignacion(
+        partes,
+        demandas,
+        horas,
+        maquinas_disponibles=len(capacidades),
+        capacidades=capacidades if modo_solver == "maquinas" else None,
+        emparejar_con=capacidades
+    )
+    if parts_sin_maquina:
+        resultado["es_factible"] = [[False] * len(horas) for _ in demandas]
+    return {
+        "package_id": package.id,
+        "package_nombre": package.nombre,
+        "modo_solver": modo_solver,
+        **resultado,
+        "parts_sin_maquina": parts_sin_maquina
+    }
+
+
+def prechequear_distribucion(
+    db: Session,
+    package_id: int,
+    demanda: int,
+    horas_objetivo: float,
+    machine_ids: List[int]
+) -> Dict:
+    """
+    Pre-chequeo rápido: ¿el package con esta demanda puede caber en las
+    máquinas seleccionadas? Solo usa requerimientos y capacidad de las
+    máquinas (no corre el solver ni guarda nada).
+    """
+    if demanda <= 0 or horas_objetivo <= 0:
+        raise ValueError("demanda y horas_objetivo deben ser mayores a 0")
+    
+    package = cargar_package(db, package_id)
+    if not package:
+        raise ValueError(f"Package {package_id} no encontrado")
+    if not package.parts:
+        raise ValueError(f"Package {package_id} no tiene parts")
+    
+    machines = cargar_machines(db, machine_ids)
+    if not machines:
+        raise ValueError("No hay máquinas activas disponibles")
+    
+    partes = preparar_partes(calcular_requerimientos(package, demanda))
+    capacidades = [capacidad_maquina(m) for m in machines]
+    capacidades = [c for c in capacidades if any(parte_elegible(p, c) for p in partes)]
+    
+    return {
+        "package_id": package.id,
+        "package_nombre": package.nombre,
+        "demanda": demanda,
+        "horas_objetivo": horas_objetivo,
+        **prechequeo_factibilidad(partes, capacidades, horas_objetivo)
+    }
@@ -2,6 +2,7 @@ from sqlalchemy.orm import Session
 from app.models.machine_model import Machine
 from app.models.machine_template_model import MachineTemplate
 from typing import List, Optional
+from app.utils.templates_compilados import invalidar_maquina
 
 def crear_machine(
     db: Session,
@@ -49,6 +50,9 @@ def actualizar_machine(db: Session, machine_id: int, datos: dict) -> Optional[Ma
     
     db.commit()
     db.refresh(machine)
+    if "estaciones_dañadas" in datos:
+        # La máscara de dañadas compilada ya no aplica
+        invalidar_maquina(machine_id)
     return machine
 
 def eliminar_machine(db: Session, machine_id: int) -> bool:
@@ -58,4 +62,5 @@ def eliminar_machine(db: Session, machine_id: int) -> bool:
     
     db.delete(machine)
     db.commit()
+    invalidar_maquina(machine_id)
     return True
\ No newline at end of file
@@ -1,6 +1,7 @@
 from sqlalchemy.orm import Session
 from app.models.package_model import Package
 from app.models.package_part_model import PackagePart
+from app.services import setup_catalogo_service
 from datetime import datetime
 from typing import List, Optional
 
@@ -10,6 +11,12 @@ def crear_package(
     descripcion: str,
     parts_data: List[dict]  # [{filename, cantidad, parsed_data}, ...]
 ) -> Package:
+    """
+    Crea el package. Cada parsed_data se registra en el catálogo de setups
+    y el part solo guarda la referencia: si el contenido es igual al setup
+    vigente se reutiliza, si no se agrega una revisión nueva (los packages
+    que ya usan la anterior no cambian).
+    """
     nuevo_package = Package(
         nombre=nombre,
         descripcion=descripcion
@@ -17,15 +24,69 @@ def crear_package(
     db.add(nuevo_package)
     db.flush()  # Para obtener el ID
     
-    # Agregar parts
-    for part_data in parts_data:
-        package_part = PackagePart(
+    # Setups ya registrados en el catálogo (una sola consulta)
+    part_fulls = [
+        (part_data["parsed_data"].get("part_number") or {}).get("full")
+        for part_data in parts_data
+    ]
+    existentes = setup_catalogo_service.obtener_setups(db, [pf for pf in part_fulls if pf])
+    
+    parts = []
+    for part_data, part_full in zip(parts_data, part_fulls):
+        part = PackagePart(
             package_id=nuevo_package.id,
             part_filename=part_data["filename"],
-            cantidad=part_data["cantidad"],
-            parsed_data=part_data["parsed_data"]
+            cantidad=part_data["cantidad"]
+        )
+        if part_full:
+            part.setup = setup_catalogo_service.registrar_setup(
+                db, part_data["parsed_data"], existentes=existentes
+            )
+            part.parsed_data = None
+        else:
+            # Sin part number válido no se puede catalogar: snapshot propio
+            part.parsed_data = part_data["parsed_data"]
+        parts.append(part)
+    
+    # Agregar parts (un solo INSERT masivo)
+    db.add_all(parts)
+    
+    db.commit()
+    db.refresh(nuevo_package)
+    return nuevo_package
+
+def crear_package_desde_catalogo(
+    db: Session,
+    nombre: str,
+    descripcion: str,
+    items: List[dict]  # [{part_full, cantidad}, ...]
+) -> Package:
+    """
+    Crea un package con setups que ya están en el catálogo, sin subir ni
+    parsear archivos. Lanza ValueError si algún part_full no existe.
+    """
+    setups = setup_catalogo_service.obtener_setups(db, [item["part_full"] for item in items])
+    faltantes = [item["part_full"] for item in items if item["part_full"] not in setups]
+    if faltantes:
+        raise ValueError(f"Setups no encontrados en el catálogo: {', '.join(faltantes)}")
+    
+    nuevo_package = Package(
+        nombre=nombre,
+        descripcion=descripcion
+    )
+    db.add(nuevo_package)
+    db.flush()
+    
+    db.add_all([
+        PackagePart(
+            package_id=nuevo_package.id,
+            part_filename=item["part_full"],
+            cantidad=int(item["cantidad"]),
+            setup=setups[item["part_full"]],
+            parsed_data_json=None
         )
-        db.add(package_part)
+        for item in items
+    ])
     
     db.commit()
     db.refresh(nuevo_package)
@@ -0,0 +1,137 @@
+"""
+Catálogo de setups (tabla `setups`).
+
+Cada setup parseado se guarda UNA vez, identificado por part number + versión
+(part_full). Los packages referencian el registro del catálogo (setup_id) en
+lugar de guardar una copia de parsed_data por cada PackagePart, así armar un
+package con parts conocidos no requiere parsear ni duplicar JSON.
+
+Los registros no se modifican una vez creados: otros packages los
+referencian. Si llega un contenido distinto para el mismo part_full se
+agrega una revisión nueva y la vigente es la de mayor id; los packages
+anteriores conservan la suya.
+"""
+from sqlalchemy import func
+from sqlalchemy.orm import Session
+from app.models.setup_model import Setup
+from app.models.package_part_model import PackagePart
+from typing import Dict, List, Optional
+
+
+def aplicar_parsed_data(setup: Setup, parsed_data: dict):
+    """Copia el resultado de parse_setup a las columnas de Setup"""
+    part_info = parsed_data.get("part_number") or {}
+    sheet_size = parsed_data.get("sheet_size") or [None, None]
+
+    setup.part_full = part_info.get("full")
+    setup.prefix = part_info.get("prefix")
+    setup.number = part_info.get("number")
+    setup.version = part_info.get("version")
+    setup.nivel = part_info.get("nivel")
+
+    setup.thickness = parsed_data.get("thickness")
+    setup.sheet_x = sheet_size[0]
+    setup.sheet_y = sheet_size[1]
+
+    setup.stations = ",".join(parsed_data.get("stations", []))
+    setup.tool_numbers = ",".join(parsed_data.get("tool_numbers", []))
+
+    setup.sym = parsed_data.get("sym")
+    setup.run_time_mins = parsed_data.get("run_time_mins")
+    setup.uph = parsed_data.get("uph")
+
+    setup.parsed_data = parsed_data
+
+
+def obtener_setup(db: Session, part_full: str) -> Optional[Setup]:
+    """Obtiene el setup vigente del catálogo por part number completo (con versión)"""
+    return db.query(Setup).filter(Setup.part_full == part_full).order_by(Setup.id.desc()).first()
+
+
+def obtener_setups(db: Session, part_fulls: List[str]) -> Dict[str, Setup]:
+    """Obtiene varios setups vigentes en una sola consulta: {part_full: Setup}"""
+    if not part_fulls:
+        return {}
+    setups = db.query(Setup).filter(Setup.part_full.in_(set(part_fulls))).order_by(Setup.id).all()
+    return {s.part_full: s for s in setups}  # La última revisión gana
+
+
+def listar_catalogo(db: Session, number: Optional[str] = None) -> List[Setup]:
+    """Lista el catálogo vigente (opcionalmente filtrado por número de parte)"""
+    vigentes = db.query(func.max(Setup.id)).group_by(Setup.part_full)
+    query = db.query(Setup).filter(Setup.id.in_(vigentes))
+    if number:
+        query = query.filter(Setup.number == number)
+    return query.order_by(Setup.number, Setup.version).all()
+
+
+def registrar_setup(
+    db: Session,
+    parsed_data: dict,
+    content_hash: Optional[str] = None,
+    existentes: Optional[Dict[str, Setup]] = None
+) -> Setup:
+    """
+    Registra el setup en el catálogo por part_full: si el contenido es igual
+    al de la revisión vigente la reutiliza; si no, agrega una revisión nueva
+    (nunca modifica un registro que otros packages pueden referenciar).
+    No hace commit. `existentes` permite reutilizar un dict {part_full: Setup}
+    vigente ya cargado para registrar muchos setups sin una consulta por cada uno.
+    """
+    part_full = (parsed_data.get("part_number") or {}).get("full")
+    if not part_full:
+        raise ValueError("El setup no tiene part number válido")
+
+    if existentes is not None:
+        vigente = existentes.get(part_full)
+    else:
+        vigente = obtener_setup(db, part_full)
+
+    # Mismo hash del .stp: mismo contenido sin comparar (ni cargar) parsed_data
+    mismo_hash = content_hash is not None and vigente is not None and vigente.content_hash == content_hash
+    if vigente is not None and (mismo_hash or vigente.parsed_data == parsed_data):
+        if content_hash and not vigente.content_hash:
+            vigente.content_hash = content_hash  # Mismo contenido: solo se completa el hash
+        return vigente
+
+    setup = Setup()
+    aplicar_parsed_data(setup, parsed_data)
+    setup.content_hash = content_hash
+    db.add(setup)
+    if existentes is not None:
+        existentes[part_full] = setup
+    return setup
+
+
+def vincular_parts_existentes(db: Session) -> int:
+    """
+    Migra los PackagePart que guardan su propio parsed_data al catálogo:
+    registra cada setup una vez y deja el part apuntando a él.
+    Un part solo se vincula si su parsed_data es igual al del setup vigente;
+    si otro part (o la ingesta) ya registró un contenido distinto para el
+    mismo part_full, conserva su propio snapshot.
+    Retorna cantidad de parts vinculados.
+    """
+    parts = db.query(PackagePart).filter(PackagePart.setup_id.is_(None)).all()
+
+    part_fulls = [
+        (p.parsed_data_json or {}).get("part_number", {}).get("full")
+        for p in parts
+    ]
+    existentes = obtener_setups(db, [pf for pf in part_fulls if pf])
+
+    count = 0
+    for part, part_full in zip(parts, part_fulls):
+        if not part_full:
+            continue
+        setup = existentes.get(part_full)
+        if setup is None:
+            setup = registrar_setup(db, part.parsed_data_json, existentes=existentes)
+        elif setup.parsed_data != part.parsed_data_json:
+            continue
+        part.setup = setup
+        part.parsed_data_json = None
+        count += 1
+
+    db.commit()
+    return count
@@ -0,0 +1,177 @@
+"""
+Ingesta incremental de carpetas de setups hacia la tabla `setups`.
+
+Se guarda un manifiesto (setup_manifest) con ruta, mtime, tamaño y hash de
+cada archivo. En cada corrida:
+  - mtime y tamaño iguales        → no se toca el archivo
+  - cambió mtime/tamaño, mismo hash → solo se actualiza el manifiesto
+  - archivo nuevo o con otro hash  → se parsea y se registra en el catálogo (`setups`, revisión nueva si cambió)
+  - archivo con error de parseo    → se guarda su hash y se trata igual: solo se
+                                     vuelve a parsear si cambia el contenido
+  - error de lectura (OSError)     → sin hash; se reintenta en cada corrida
+Así un refresh nocturno solo parsea los pocos archivos que cambiaron.
+"""
+from sqlalchemy.orm import Session, load_only
+from app.models.setup_model import Setup
+from app.models.setup_manifest_model import SetupManifest
+from app.services.setup_catalogo_service import registrar_setup
+from app.utils.parser_cache import sha256_archivo
+from app.utils.parser_setups import parse_setup
+from app.utils.pool_procesos import obtener_pool
+from typing import Dict, List, Optional, Tuple
+import os
+
+EXTENSIONES = (".stp",)
+
+
+def listar_archivos(carpeta: str, recursivo: bool = True) -> List[Tuple[str, int, int]]:
+    """Retorna [(ruta, mtime_ns, tamaño)] de los setups de la carpeta"""
+    archivos = []
+    pendientes = [carpeta]
+
+    while pendientes:
+        actual = pendientes.pop()
+        with os.scandir(actual) as entradas:
+            for entrada in entradas:
+                if entrada.is_dir(follow_symlinks=False):
+                    if recursivo:
+                        pendientes.append(entrada.path)
+                elif entrada.name.lower().endswith(EXTENSIONES):
+                    stat = entrada.stat()
+                    archivos.append((os.path.abspath(entrada.path), stat.st_mtime_ns, stat.st_size))
+
+    archivos.sort()
+    return archivos
+
+
+def hashear_y_parsear(ruta: str, sha_anterior: Optional[str]) -> Tuple[str, Optional[dict], Optional[str]]:
+    """
+    Corre en el pool de procesos: calcula el hash del archivo por bloques y
+    solo lo parsea (en streaming) si el hash cambió.
+    Retorna (sha256, parsed_data o None, error o None). Si el archivo no se
+    pudo leer (OSError) el sha256 queda vacío.
+    """
+    sha = ""
+    try:
+        sha = sha256_archivo(ruta)
+        if sha == sha_anterior:
+            return sha, None, None
+        return sha, parse_setup(ruta), None
+    except OSError as e:
+        return "", None, str(e)
+    except Exception as e:
+        return sha, None, str(e)
+
+
+def setups_vigentes(db: Session, part_fulls: List[str]) -> Dict[str, Setup]:
+    """
+    Revisión vigente de cada part_full (la de mayor id), solo con las
+    columnas que compara registrar_setup; parsed_data se carga si hace falta.
+    """
+    if not part_fulls:
+        return {}
+    setups = (
+        db.query(Setup)
+        .options(load_only(Setup.id, Setup.part_full, Setup.content_hash))
+        .filter(Setup.part_full.in_(set(part_fulls)))
+        .order_by(Setup.id)
+        .all()
+    )
+    return {s.part_full: s for s in setups}
+
+
+def ingestar_carpeta(db: Session, carpeta: str, recursivo: bool = True) -> Dict:
+    """
+    Ingesta incremental de una carpeta de setups.
+    Retorna un resumen con los conteos de cada caso.
+    """
+    archivos = listar_archivos(carpeta, recursivo)
+    rutas_actuales = {ruta for ruta, _, _ in archivos}
+
+    # Manifiesto actual (una sola consulta)
+    manifiesto = {m.ruta: m for m in db.query(SetupManifest).all()}
+
+    resumen = {
+        "total_archivos": len(archivos),
+        "nuevos": 0,
+        "modificados": 0,
+        "sin_cambios": 0,
+        "solo_metadatos": 0,
+        "eliminados": 0,
+        "errores": []
+    }
+
+    # 1. Detectar candidatos por mtime/tamaño (los que no se pudieron leer se
+    #    reintentan aunque no hayan cambiado)
+    candidatos = []
+    for ruta, mtime_ns, tamano in archivos:
+        entrada = manifiesto.get(ruta)
+        if entrada and entrada.mtime_ns == mtime_ns and entrada.tamano == tamano and entrada.sha256:
+            resumen["sin_cambios"] += 1
+            if entrada.error:
+                resumen["errores"].append(f"{ruta}: {entrada.error}")
+            continue
+        candidatos.append((ruta, mtime_ns, tamano, entrada))
+
+    # 2. Hash + parseo en paralelo solo de los candidatos
+    pool = obtener_pool()
+    futuros = [
+        pool.submit(hashear_y_parsear, ruta, entrada.sha256 if entrada else None)
+        for ruta, _, _, entrada in candidatos
+    ]
+
+    parseados = []
+    for (ruta, mtime_ns, tamano, entrada), futuro in zip(candidatos, futuros):
+        try:
+            sha, parsed_data, error = futuro.result()
+        except Exception as e:
+            # El worker murió: sin hash para reintentarlo en la próxima corrida
+            sha, parsed_data, error = "", None, str(e)
+
+        if error is not None:
+            resumen["errores"].append(f"{ruta}: {error}")
+            if entrada:
+                entrada.mtime_ns, entrada.tamano, entrada.sha256, entrada.error = mtime_ns, tamano, sha, error
+            else:
+                db.add(SetupManifest(ruta=ruta, mtime_ns=mtime_ns, tamano=tamano, sha256=sha, error=error))
+            continue
+
+        if parsed_data is None:
+            # Solo cambió mtime (touch, copia): mismo contenido
+            entrada.mtime_ns, entrada.tamano = mtime_ns, tamano
+            resumen["solo_metadatos"] += 1
+            if entrada.error:
+                resumen["errores"].append(f"{ruta}: {entrada.error}")
+            continue
+
+        parseados.append((ruta, mtime_ns, tamano, entrada, sha, parsed_data))
+
+    # 3. Catálogo por part number completo (revisión nueva si cambió el
+    #    contenido); solo se consultan los parts que se parsearon
+    setups_por_part = setups_vigentes(db, [p[5]["part_number"]["full"] for p in parseados])
+
+    for ruta, mtime_ns, tamano, entrada, sha, parsed_data in parseados:
+        setup = registrar_setup(db, parsed_data, content_hash=sha, existentes=setups_por_part)
+
+        if entrada:
+            entrada.mtime_ns, entrada.tamano, entrada.sha256 = mtime_ns, tamano, sha
+            entrada.setup, entrada.error = setup, None
+            resumen["modificados"] += 1
+        else:
+            db.add(SetupManifest(ruta=ruta, mtime_ns=mtime_ns, tamano=tamano, sha256=sha, setup=setup))
+            resumen["nuevos"] += 1
+
+    # 4. Archivos que ya no existen: sacarlos del manifiesto
+    #    (el setup se conserva en el catálogo)
+    carpeta_abs = os.path.abspath(carpeta)
+    for ruta, entrada in manifiesto.items():
+        if recursivo:
+            dentro = ruta.startswith(carpeta_abs + os.sep)
+        else:
+            dentro = os.path.dirname(ruta) == carpeta_abs
+        if dentro and ruta not in rutas_actuales:
+            db.delete(entrada)
+            resumen["eliminados"] += 1
+
+    db.commit()
+    return resumen
@@ -0,0 +1,209 @@
+"""
+Distribuciones en segundo plano.
+
+POST /distribucion/trabajos guarda un registro en `trabajos_distribucion` y
+regresa de inmediato; un pool de hilos corre crear_distribucion_optimizada y
+va escribiendo en ese registro la fase, la cota inferior y el mejor número de
+máquinas encontrado.
+
+Los hilos comparten el GIL con el servidor, así que la búsqueda pesada no
+corre en ellos: los modos exacto y portafolio la mandan al pool de procesos
+y el hilo solo espera y reporta el progreso. En el hilo quedan las consultas,
+el greedy y la búsqueda local (acotada por tiempo_limite_seg); por eso
+TRABAJOS_WORKERS es chico. El cliente consulta el registro (polling o SSE): como el
+estado vive en SQLite no hace falta un broker externo.
+
+El resultado final se guarda como una distribución (`distribuciones`) y el
+trabajo apunta a ella con distribucion_id.
+"""
+from concurrent.futures import Future, ThreadPoolExecutor
+from datetime import datetime
+import threading
+import time
+from typing import Dict, Iterator, Optional
+
+from sqlalchemy.orm import Session, sessionmaker
+
+from app.core import TRABAJOS_INTERVALO_SSE_SEG, TRABAJOS_WORKERS
+from app.models.distribucion_model import DistribucionRequest, TrabajoDistribucionResponse
+from app.models.trabajo_distribucion_model import TrabajoDistribucion
+from app.services.distribucion_service import crear_distribucion_optimizada, guardar_distribucion
+
+ESTADOS_FINALES = ("completado", "error")
+
+_executor: Optional[ThreadPoolExecutor] = None
+_futuros: Dict[int, Future] = {}
+_lock = threading.Lock()
+
+
+def obtener_executor() -> ThreadPoolExecutor:
+    """Pool de hilos de los trabajos (se crea la primera vez que se usa)"""
+    global _executor
+    with _lock:
+        if _executor is None:
+            _executor = ThreadPoolExecutor(max_workers=max(1, TRABAJOS_WORKERS), thread_name_prefix="distribucion")
+        return _executor
+
+
+def cerrar_trabajadores():
+    """Cancela los trabajos en cola y cierra el pool (main.py al apagar)"""
+    global _executor
+    with _lock:
+        if _executor is not None:
+            _executor.shutdown(wait=False, cancel_futures=True)
+            _executor = None
+
+
+def crear_trabajo(db: Session, request: DistribucionRequest) -> TrabajoDistribucion:
+    """Registra el trabajo y lo encola; no espera al solver"""
+    trabajo = TrabajoDistribucion(parametros=request.model_dump(), estado="pendiente")
+    db.add(trabajo)
+    db.commit()
+    db.refresh(trabajo)
+
+    # El worker abre sus propias sesiones sobre la misma BD que el request
+    fabrica = sessionmaker(autocommit=False, autoflush=False, bind=db.get_bind())
+    trabajo_id = trabajo.id
+    futuro = obtener_executor().submit(ejecutar_trabajo, fabrica, trabajo_id)
+    with _lock:
+        _futuros[trabajo_id] = futuro
+    futuro.add_done_callback(lambda _: _quitar_futuro(trabajo_id))
+    return trabajo
+
+
+def _quitar_futuro(trabajo_id: int):
+    with _lock:
+        _futuros.pop(trabajo_id, None)
+
+
+def esperar_trabajo(trabajo_id: int, timeout: Optional[float] = None):
+    """Bloquea hasta que el trabajo termine (si sigue en este proceso)"""
+    with _lock:
+        futuro = _futuros.get(trabajo_id)
+    if futuro is not None:
+        futuro.result(timeout=timeout)
+
+
+def _actualizar(fabrica: sessionmaker, trabajo_id: int, cambios: Dict):
+    """Escribe cambios del trabajo en su propia sesión (no toca la del solver)"""
+    db = fabrica()
+    try:
+        db.query(TrabajoDistribucion).filter(TrabajoDistribucion.id == trabajo_id).update(cambios)
+        db.commit()
+    finally:
+        db.close()
+
+
+def ejecutar_trabajo(fabrica: sessionmaker, trabajo_id: int):
+    """Corre en el pool: resuelve la distribución y reporta el progreso"""
+    db = fabrica()
+    try:
+        trabajo = db.query(TrabajoDistribucion).filter(TrabajoDistribucion.id == trabajo_id).first()
+        if trabajo is None:
+            return
+        parametros = dict(trabajo.parametros)
+        _actualizar(fabrica, trabajo_id, {"estado": "ejecutando", "started_at": datetime.utcnow()})
+
+        ultimo = {}
+
+        def progreso(fase: str, **datos):
+            cambios = {"fase": fase}
+            if datos.get("mejor_maquinas") is not None:
+                cambios["mejor_maquinas"] = datos["mejor_maquinas"]
+            if datos.get("cota_inferior") is not None:
+                cambios["cota_inferior"] = datos["cota_inferior"]
+            if any(ultimo.get(k) != v for k, v in cambios.items()):
+                ultimo.update(cambios)
+                _actualizar(fabrica, trabajo_id, cambios)
+
+        try:
+            distribucion = crear_distribucion_optimizada(db=db, progreso=progreso, **parametros)
+            distribucion_id = distribucion.resumen.get("distribucion_id")
+            if distribucion_id is None:
+                # Se descartó antes del solver (sin máquinas compatibles o sin
+                # capacidad): también se guarda, con sus errores
+                distribucion_id = guardar_distribucion(db, distribucion, parametros["machine_ids"]).id
+            _actualizar(fabrica, trabajo_id, {
+                "estado": "completado",
+                "distribucion_id": distribucion_id,
+                "mejor_maquinas": len(distribucion.asignaciones) or ultimo.get("mejor_maquinas"),
+                "finished_at": datetime.utcnow()
+            })
+        except ValueError as e:
+            _actualizar(fabrica, trabajo_id, {"estado": "error", "error": str(e), "finished_at": datetime.utcnow()})
+        except Exception as e:
+            db.rollback()
+            _actualizar(fabrica, trabajo_id, {
+                "estado": "error",
+                "error": f"Error creando distribución: {str(e)}",
+                "finished_at": datetime.utcnow()
+            })
+    finally:
+        db.close()
+
+
+def marcar_interrumpidos(db: Session) -> int:
+    """
+    Al arrancar: los trabajos que quedaron pendientes o ejecutando eran de un
+    proceso anterior (el pool vive en memoria) y ya no van a terminar.
+    """
+    interrumpidos = db.query(TrabajoDistribucion).filter(
+        TrabajoDistribucion.estado.in_(("pendiente", "ejecutando"))
+    ).update({
+        "estado": "error",
+        "error": "Trabajo interrumpido: el servidor se reinició",
+        "finished_at": datetime.utcnow()
+    }, synchronize_session=False)
+    db.commit()
+    return interrumpidos
+
+
+def estado_trabajo(trabajo: TrabajoDistribucion) -> TrabajoDistribucionResponse:
+    """Estado para el cliente (polling y SSE)"""
+    tiempo = 0.0
+    if trabajo.started_at is not None:
+        tiempo = ((trabajo.finished_at or datetime.utcnow()) - trabajo.started_at).total_seconds()
+    return TrabajoDistribucionResponse(
+        trabajo_id=trabajo.id,
+        estado=trabajo.estado,
+        fase=trabajo.fase,
+        mejor_maquinas=trabajo.mejor_maquinas,
+        cota_inferior=trabajo.cota_inferior,
+        tiempo_transcurrido_seg=round(tiempo, 3),
+        error=trabajo.error,
+        distribucion_id=trabajo.distribucion_id
+    )
+
+
+def obtener_trabajo(db: Session, trabajo_id: int) -> Optional[TrabajoDistribucion]:
+    return db.query(TrabajoDistribucion).filter(TrabajoDistribucion.id == trabajo_id).first()
+
+
+def seguir_trabajo(
+    fabrica: sessionmaker,
+    trabajo_id: int,
+    intervalo_seg: float = TRABAJOS_INTERVALO_SSE_SEG
+) -> Iterator[TrabajoDistribucionResponse]:
+    """
+    Estados del trabajo cada vez que cambia la fase, el estado o el mejor
+    plan, hasta que termina (para el stream SSE). Cada revisión usa una
+    sesión nueva para ver lo que escribió el worker.
+    """
+    anterior = None
+    while True:
+        db = fabrica()
+        try:
+            trabajo = obtener_trabajo(db, trabajo_id)
+            if trabajo is None:
+                return
+            estado = estado_trabajo(trabajo)
+        finally:
+            db.close()
+
+        llave = (estado.estado, estado.fase, estado.mejor_maquinas, estado.cota_inferior)
+        if llave != anterior:
+            anterior = llave
+            yield estado
+        if estado.estado in ESTADOS_FINALES:
+            return
+        time.sleep(intervalo_seg)
@@ -10,6 +10,15 @@ Versión Corregida con:
 
 from typing import List, Dict, Tuple, Optional
 from collections import defaultdict
+import random
+import numpy as np
+
+# Reglas duras compartidas por todos los modos del solver
+LIMITE_ESTACIONES = 52  # Herramientas únicas máximas por máquina
+MAX_MAQUINAS = 20
+
+# Criterios de orden para agrupar (ver ordenar_partes)
+ORDENES_AGRUPACION = ("uph", "horas_desc", "herramientas_desc", "aleatorio")
 
 
 def es_redondo(tool_number) -> bool:
@@ -21,7 +30,7 @@ def es_redondo(tool_number) -> bool:
     return str(tool_number).startswith('1')
 
 
-def calcular_score_compatibilidad(parte1: dict, parte2: dict) -> int:
+def calcular_score_compatibilidad(parte1: dict, parte2: dict, matriz: Optional[np.ndarray] = None) -> int:
     """
     Calcula el score de compatibilidad entre dos partes.
     
@@ -32,7 +41,13 @@ def calcular_score_compatibilidad(parte1: dict, parte2: dict) -> int:
     
     Score máximo: 100 puntos (alta compatibilidad)
     Score mínimo: 0 puntos (sin compatibilidad)
+    
+    Si se pasa la matriz de construir_matriz_compatibilidad, el score se
+    lee de ella usando el índice '_idx' de cada parte.
     """
+    if matriz is not None:
+        return int(matriz[parte1['_idx'], parte2['_idx']])
+    
     score = 0
     
     # Mismo grosor
@@ -52,24 +67,173 @@ def calcular_score_compatibilidad(parte1: dict, parte2: dict) -> int:
     return score
 
 
-def contar_divisiones_parte(part_id: int) -> int:
+def _llave_igualdad(valor):
+    """Llave hashable que respeta la igualdad de Python (listas → tuplas)"""
+    if isinstance(valor, list):
+        return ('__lista__', tuple(valor))
+    return valor
+
+
+def _codificar(valores: list) -> np.ndarray:
+    """Asigna un código entero a cada valor distinto (iguales → mismo código)"""
+    codigos = {}
+    return np.array([codigos.setdefault(_llave_igualdad(v), len(codigos)) for v in valores], dtype=np.int32)
+
+
+def internar_herramientas(partes: List[dict]) -> List[List[int]]:
+    """
+    Asigna un id entero a cada tool number distinto.
+    Retorna, por parte, la lista de ids de sus herramientas.
+    """
+    ids_tools = {}
+    return [
+        [
+            ids_tools.setdefault(tool['tool_number'] if isinstance(tool, dict) else tool, len(ids_tools))
+            for tool in parte.get('tools', [])
+        ]
+        for parte in partes
+    ]
+
+
+def construir_mascaras_herramientas(ids_por_parte: List[List[int]]) -> List[int]:
+    """
+    Bitmask (int de Python) de las herramientas de cada parte: bit k = tool id k.
+    Las herramientas únicas de un grupo son el OR de sus máscaras y su
+    cantidad es el popcount (int.bit_count()).
+    """
+    mascaras = []
+    for ids in ids_por_parte:
+        mascara = 0
+        for tool_id in ids:
+            mascara |= 1 << tool_id
+        mascaras.append(mascara)
+    return mascaras
+
+
+def mascara_partes(partes: List[dict], mascaras: List[int]) -> int:
+    """OR de las máscaras de herramientas de las partes (usa '_idx')"""
+    mascara = 0
+    for parte in partes:
+        mascara |= mascaras[parte['_idx']]
+    return mascara
+
+
+def construir_matriz_compatibilidad(
+    partes: List[dict],
+    ids_por_parte: Optional[List[List[int]]] = None
+) -> np.ndarray:
+    """
+    Calcula de una sola vez el score de compatibilidad entre todas las partes
+    (mismos criterios que calcular_score_compatibilidad).
+    
+    Returns:
+        Matriz n x n (int16) donde [i, j] es el score entre partes[i] y partes[j]
+    """
+    n = len(partes)
+    if n == 0:
+        return np.zeros((0, 0), dtype=np.int16)
+    
+    # Igualdad de grosor y lámina: comparar códigos enteros
+    grosores = _codificar([p.get('thickness') for p in partes])
+    laminas = _codificar([p.get('sheet_size') for p in partes])
+    
+    matriz = np.zeros((n, n), dtype=np.int16)
+    matriz += 30 * (grosores[:, None] == grosores[None, :])
+    matriz += 30 * (laminas[:, None] == laminas[None, :])
+    
+    # Herramientas en común: matriz de incidencia parte x herramienta
+    if ids_por_parte is None:
+        ids_por_parte = internar_herramientas(partes)
+    filas, columnas = [], []
+    for i, ids in enumerate(ids_por_parte):
+        filas.extend([i] * len(ids))
+        columnas.extend(ids)
+    
+    if columnas:
+        incidencia = np.zeros((n, max(columnas) + 1), dtype=np.float32)
+        incidencia[filas, columnas] = 1.0
+        comparten = (incidencia @ incidencia.T) > 0
+        matriz += 40 * comparten
+    
+    return matriz
+
+
+class ContextoAsignacion:
+    """
+    Estado de UNA llamada a asignar_optimizado_final: partes etiquetadas con
+    '_idx', matriz de compatibilidad, máscaras de herramientas y conteo de
+    divisiones por parte.
+
+    Cada llamada crea su propio contexto (no hay estado a nivel de módulo),
+    así varias distribuciones pueden correr en paralelo en hilos o procesos
+    y dar exactamente el mismo resultado que corriendo solas.
+    """
+
+    def __init__(
+        self,
+        partes: List[dict],
+        matriz: Optional[np.ndarray] = None,
+        mascaras: Optional[List[int]] = None
+    ):
+        # Copias etiquetadas: las divisiones (copias) conservan su '_idx'
+        self.partes = [{**parte, '_idx': i} for i, parte in enumerate(partes)]
+        # Matriz y máscaras no dependen de las cantidades: se pueden reusar
+        # entre llamadas con las mismas partes (ej. barrido de demanda)
+        if matriz is None or mascaras is None:
+            ids_por_parte = internar_herramientas(self.partes)
+            matriz = construir_matriz_compatibilidad(self.partes, ids_por_parte)
+            mascaras = construir_mascaras_herramientas(ids_por_parte)
+        self.matriz = matriz
+        self.mascaras = mascaras
+        self.num_divisiones: Dict[int, int] = {}
+
+
+def contar_divisiones_parte(contexto: ContextoAsignacion, part_id: int) -> int:
     """
-    Cuenta cuántas veces se ha dividido una parte usando tracking global.
+    Cuenta cuántas veces se ha dividido una parte en esta asignación.
     Límite: 2 divisiones (parte puede estar en máximo 2 máquinas)
     """
-    global _num_divisiones
-    return _num_divisiones.get(part_id, 0)
+    return contexto.num_divisiones.get(part_id, 0)
 
 
-def marcar_division_parte(part_id: int):
+def marcar_division_parte(contexto: ContextoAsignacion, part_id: int):
     """
-    Marca que una parte ha sido dividida, incrementando el contador global.
+    Marca que una parte ha sido dividida, incrementando su contador.
     """
-    global _num_divisiones
-    _num_divisiones[part_id] = _num_divisiones.get(part_id, 0) + 1
+    contexto.num_divisiones[part_id] = contexto.num_divisiones.get(part_id, 0) + 1
 
 
-def agrupar_por_compatibilidad_alta(partes: List[dict], umbral: int = 70, limite_estaciones: int = 52) -> List[List[dict]]:
+def ordenar_partes(partes: List[dict], orden: str = "uph", semilla: int = 0) -> List[dict]:
+    """
+    Orden en que se agrupan las partes:
+    - "uph": UPH ascendente (más lentas/complejas primero, el original)
+    - "horas_desc": más horas requeridas primero
+    - "herramientas_desc": más herramientas primero
+    - "aleatorio": permutación reproducible con la semilla
+    Los empates conservan el orden de entrada.
+    """
+    if orden == "uph":
+        return sorted(partes, key=lambda p: p.get('uph', 0))
+    if orden == "horas_desc":
+        return sorted(partes, key=lambda p: -calcular_horas_parte(p))
+    if orden == "herramientas_desc":
+        return sorted(partes, key=lambda p: -len(p.get('tools', [])))
+    if orden == "aleatorio":
+        partes_ordenadas = list(partes)
+        random.Random(semilla).shuffle(partes_ordenadas)
+        return partes_ordenadas
+    raise ValueError(f"Orden desconocido: {orden}. Opciones: {', '.join(ORDENES_AGRUPACION)}")
+
+
+def agrupar_por_compatibilidad_alta(
+    partes: List[dict],
+    umbral: int = 70,
+    limite_estaciones: int = 52,
+    matriz: Optional[np.ndarray] = None,
+    mascaras: Optional[List[int]] = None,
+    orden: str = "uph",
+    semilla: int = 0
+) -> List[List[dict]]:
     """
     Agrupa partes que tienen alta compatibilidad (score >= umbral).
     
@@ -82,47 +246,74 @@ def agrupar_por_compatibilidad_alta(partes: List[dict], umbral: int = 70, limite
        - Si encuentra uno, la añade
        - Si no, crea un nuevo grupo con esa parte
     
+    Con `matriz` (ver construir_matriz_compatibilidad) la verificación contra
+    todo el grupo es una sola lectura vectorizada de la matriz. Con `mascaras`
+    se lleva la unión de herramientas de cada grupo y el conteo es un popcount.
+    
     Returns:
         Lista de grupos, donde cada grupo es una lista de partes compatibles
     """
-    # Ordenar por UPH ascendente (partes más lentas/complejas primero)
-    partes_ordenadas = sorted(partes, key=lambda p: p.get('uph', 0))
+    # Ordenar por UPH ascendente (partes más lentas/complejas primero),
+    # u otro criterio de ordenar_partes
+    partes_ordenadas = ordenar_partes(partes, orden, semilla)
     
     grupos = []
+    indices_grupos = []  # Índices '_idx' de cada grupo (solo con matriz)
+    mascaras_grupos = []  # Unión de herramientas de cada grupo (solo con mascaras)
     
     for parte in partes_ordenadas:
         grupo_asignado = False
         
         # Intentar añadir a un grupo existente
-        for grupo in grupos:
+        for num_grupo, grupo in enumerate(grupos):
             # Verificar compatibilidad con TODAS las partes del grupo
-            compatible_con_todas = True
-            for parte_grupo in grupo:
-                score = calcular_score_compatibilidad(parte, parte_grupo)
-                if score < umbral:
-                    compatible_con_todas = False
-                    break
+            if matriz is not None:
+                indices = indices_grupos[num_grupo]
+                compatible_con_todas = bool(matriz[parte['_idx'], indices].min() >= umbral)
+            else:
+                compatible_con_todas = True
+                for parte_grupo in grupo:
+                    score = calcular_score_compatibilidad(parte, parte_grupo)
+                    if score < umbral:
+                        compatible_con_todas = False
+                        break
             
             # REGLA DURA: Verificar que no exceda límite de estaciones
             if compatible_con_todas:
-                herramientas_test = contar_herramientas_unicas(grupo + [parte])
+                if mascaras is not None:
+                    mascara_test = mascaras_grupos[num_grupo] | mascaras[parte['_idx']]
+                    herramientas_test = mascara_test.bit_count()
+                else:
+                    herramientas_test = contar_herramientas_unicas(grupo + [parte])
                 if herramientas_test <= limite_estaciones:
                     grupo.append(parte)
+                    if matriz is not None:
+                        indices_grupos[num_grupo].append(parte['_idx'])
+                    if mascaras is not None:
+                        mascaras_grupos[num_grupo] = mascara_test
                     grupo_asignado = True
                     break
         
         # Si no se pudo añadir a ningún grupo, crear uno nuevo
         if not grupo_asignado:
             grupos.append([parte])
+            if matriz is not None:
+                indices_grupos.append([parte['_idx']])
+            if mascaras is not None:
+                mascaras_grupos.append(mascaras[parte['_idx']])
     
     return grupos
 
 
-def contar_herramientas_unicas(partes: List[dict]) -> int:
+def contar_herramientas_unicas(partes: List[dict], mascaras: Optional[List[int]] = None) -> int:
     """
     Cuenta el número de herramientas únicas en un grupo de partes.
     Esto permite estimar si habrá overflow de estaciones.
+    Con `mascaras` (ver construir_mascaras_herramientas) es un OR + popcount.
     """
+    if mascaras is not None:
+        return mascara_partes(partes, mascaras).bit_count()
+    
     herramientas_unicas = set()
     for parte in partes:
         tools = parte.get('tools', [])
@@ -162,13 +353,19 @@ def calcular_carga_maquina(partes: List[dict]) -> float:
     return (carga_total / 24.0) * 100.0
 
 
-def encontrar_compatibilidad_promedio_grupo(grupo: List[dict]) -> float:
+def encontrar_compatibilidad_promedio_grupo(grupo: List[dict], matriz: Optional[np.ndarray] = None) -> float:
     """
     Calcula la compatibilidad promedio entre todas las partes de un grupo.
     """
     if len(grupo) <= 1:
         return 100.0  # Un solo elemento tiene compatibilidad perfecta consigo mismo
     
+    if matriz is not None:
+        indices = [p['_idx'] for p in grupo]
+        sub = matriz[np.ix_(indices, indices)].astype(np.int64)
+        n = len(indices)
+        return float(sub[np.triu_indices(n, k=1)].sum()) / (n * (n - 1) // 2)
+    
     scores = []
     for i in range(len(grupo)):
         for j in range(i + 1, len(grupo)):
@@ -178,7 +375,7 @@ def encontrar_compatibilidad_promedio_grupo(grupo: List[dict]) -> float:
     return sum(scores) / len(scores) if scores else 0.0
 
 
-def identificar_parte_menos_compatible(grupo: List[dict]) -> dict:
+def identificar_parte_menos_compatible(grupo: List[dict], matriz: Optional[np.ndarray] = None) -> dict:
     """
     Identifica la parte con menor compatibilidad promedio con el resto del grupo.
     Esta parte es candidata a ser removida si el grupo no cabe en tiempo/estaciones.
@@ -186,6 +383,14 @@ def identificar_parte_menos_compatible(grupo: List[dict]) -> dict:
     if len(grupo) <= 1:
         return grupo[0] if grupo else None
     
+    if matriz is not None:
+        # Suma de scores contra el resto = suma de la fila - diagonal.
+        # argmin retorna la primera en empate (igual que el sort estable).
+        indices = [p['_idx'] for p in grupo]
+        sub = matriz[np.ix_(indices, indices)].astype(np.int64)
+        sumas = sub.sum(axis=1) - np.diagonal(sub)
+        return grupo[int(np.argmin(sumas))]
+    
     compatibilidades = []
     
     for i, parte in enumerate(grupo):
@@ -201,10 +406,134 @@ def identificar_parte_menos_compatible(grupo: List[dict]) -> dict:
     return compatibilidades[0][1]  # Retornar parte con menor compatibilidad
 
 
+class GrupoIncremental:
+    """
+    Grupo de partes con totales corridos para no recalcular todo el grupo en
+    cada remoción:
+    - horas: suma de calcular_horas_parte
+    - conteo de referencias por herramienta (y la máscara de la unión)
+    - suma de compatibilidad de cada parte contra el resto del grupo
+
+    Agregar o quitar una parte cuesta O(herramientas de la parte + partes del
+    grupo); identificar la menos compatible es un argmin sobre las sumas.
+    Conteos y sumas se arman la primera vez que se modifica el grupo (la
+    mayoría de los grupos se asignan completos sin tocarlos).
+
+    Con `mascaras` las herramientas son los bits de la máscara de cada parte
+    (usa '_idx'); sin ellas, los tool numbers. Con `matriz` los scores se leen
+    de la matriz; sin ella se usa calcular_score_compatibilidad.
+    """
+
+    def __init__(
+        self,
+        partes: List[dict] = (),
+        matriz: Optional[np.ndarray] = None,
+        mascaras: Optional[List[int]] = None
+    ):
+        self.matriz = matriz
+        self.mascaras = mascaras
+        self.partes: List[dict] = list(partes)
+        self.horas = calcular_horas_grupo(self.partes)
+        self.mascara = mascara_partes(self.partes, mascaras) if mascaras is not None else 0
+        self._conteo: Optional[Dict] = None
+        self._sumas: Optional[np.ndarray] = None
+
+    def __len__(self) -> int:
+        return len(self.partes)
+
+    @property
+    def herramientas_unicas(self) -> int:
+        if self.mascaras is not None:
+            return self.mascara.bit_count()
+        self._preparar()
+        return len(self._conteo)
+
+    def _herramientas(self, parte: dict):
+        """Llaves de herramienta de la parte: bit de la máscara o tool number"""
+        if self.mascaras is not None:
+            mascara = self.mascaras[parte['_idx']]
+            while mascara:
+                bit = mascara & -mascara
+                yield bit
+                mascara ^= bit
+        else:
+            for tool in parte.get('tools', []):
+                yield tool['tool_number'] if isinstance(tool, dict) else tool
+
+    def _scores(self, parte: dict) -> np.ndarray:
+        """Score de la parte contra cada parte actual del grupo"""
+        if self.matriz is not None:
+            return self.matriz[parte['_idx'], [p['_idx'] for p in self.partes]].astype(np.int64)
+        return np.array([calcular_score_compatibilidad(parte, otra) for otra in self.partes], dtype=np.int64)
+
+    def _preparar(self):
+        """Conteo de herramientas y sumas de compatibilidad (una sola vez)"""
+        if self._sumas is not None:
+            return
+        if self.matriz is not None:
+            indices = [p['_idx'] for p in self.partes]
+            sub = self.matriz[np.ix_(indices, indices)].astype(np.int64)
+            self._sumas = sub.sum(axis=1) - np.diagonal(sub)
+        else:
+            self._sumas = np.array(
+                [sum(calcular_score_compatibilidad(p, otra) for j, otra in enumerate(self.partes) if j != i)
+                 for i, p in enumerate(self.partes)],
+                dtype=np.int64
+            )
+        self._conteo = {}
+        for parte in self.partes:
+            for herramienta in self._herramientas(parte):
+                self._conteo[herramienta] = self._conteo.get(herramienta, 0) + 1
+
+    def agregar(self, parte: dict):
+        self._preparar()
+        scores = self._scores(parte)
+        self._sumas = np.append(self._sumas + scores, scores.sum())
+        self.partes.append(parte)
+        self.horas += calcular_horas_parte(parte)
+        for herramienta in self._herramientas(parte):
+            if herramienta not in self._conteo:
+                self._conteo[herramienta] = 0
+                if self.mascaras is not None:
+                    self.mascara |= herramienta
+            self._conteo[herramienta] += 1
+
+    def remover(self, parte: dict):
+        """Quita la parte (por identidad) y actualiza los totales"""
+        self._preparar()
+        posicion = next(i for i, p in enumerate(self.partes) if p is parte)
+        del self.partes[posicion]
+        self._sumas = np.delete(self._sumas, posicion) - self._scores(parte)
+        # Grupo vacío: sin residuo de redondeo en las horas
+        self.horas = self.horas - calcular_horas_parte(parte) if self.partes else 0.0
+        for herramienta in self._herramientas(parte):
+            self._conteo[herramienta] -= 1
+            if self._conteo[herramienta] == 0:
+                del self._conteo[herramienta]
+                if self.mascaras is not None:
+                    self.mascara &= ~herramienta
+
+    def menos_compatible(self) -> Optional[dict]:
+        """Misma elección que identificar_parte_menos_compatible (primera en empate)"""
+        if len(self.partes) <= 1:
+            return self.partes[0] if self.partes else None
+        self._preparar()
+        return self.partes[int(np.argmin(self._sumas))]
+
+    def compatibilidad_promedio(self) -> float:
+        """Misma cifra que encontrar_compatibilidad_promedio_grupo"""
+        n = len(self.partes)
+        if n <= 1:
+            return 100.0
+        self._preparar()
+        return float(self._sumas.sum() // 2) / (n * (n - 1) // 2)
+
+
 def ajustar_grupo_a_tiempo_disponible(
     grupo: List[dict],
     tiempo_disponible: float,
-    umbral_compatibilidad: int = 70
+    umbral_compatibilidad: int = 70,
+    matriz: Optional[np.ndarray] = None
 ) -> Tuple[List[dict], List[dict]]:
     """
     Ajusta un grupo de partes compatibles para que quepa en el tiempo disponible.
@@ -218,20 +547,20 @@ def ajustar_grupo_a_tiempo_disponible(
     Returns:
         Tupla (grupo_ajustado, partes_removidas)
     """
-    grupo_actual = grupo.copy()
+    grupo_actual = GrupoIncremental(grupo, matriz)
     partes_removidas = []
     
-    while calcular_horas_grupo(grupo_actual) > tiempo_disponible:
+    while grupo_actual.horas > tiempo_disponible:
         if len(grupo_actual) <= 1:
             # Si solo queda 1 parte y no cabe, se deberá dividir después
             break
         
         # Identificar y remover parte menos compatible
-        parte_menos_compatible = identificar_parte_menos_compatible(grupo_actual)
-        grupo_actual.remove(parte_menos_compatible)
+        parte_menos_compatible = grupo_actual.menos_compatible()
+        grupo_actual.remover(parte_menos_compatible)
         partes_removidas.append(parte_menos_compatible)
     
-    return grupo_actual, partes_removidas
+    return grupo_actual.partes, partes_removidas
 
 
 def dividir_parte_por_tiempo(
@@ -346,7 +675,11 @@ def minimizar_maquinas(asignaciones: Dict[int, List[dict]], horas_objetivo: floa
 def asignar_optimizado_final(
     partes: List[dict],
     horas_objetivo: float = 96.0,
-    umbral_compatibilidad: int = 70
+    umbral_compatibilidad: int = 70,
+    orden: str = "uph",
+    semilla: int = 0,
+    matriz: Optional[np.ndarray] = None,
+    mascaras: Optional[List[int]] = None
 ) -> Dict[int, List[dict]]:
     """
     Algoritmo principal de asignación optimizada con REGLAS DURAS ESTRICTAS.
@@ -378,34 +711,51 @@ def asignar_optimizado_final(
                 Campos esperados: part_id, quantity, uph, thickness, sheet_size, tools
         horas_objetivo: Horas disponibles por máquina (LÍMITE ABSOLUTO)
         umbral_compatibilidad: Score mínimo para considerar partes compatibles (default 70)
+        orden: criterio de orden para agrupar (ver ordenar_partes, default UPH)
+        semilla: semilla del orden "aleatorio"
+        matriz, mascaras: matriz de compatibilidad y máscaras de herramientas
+                ya calculadas para estas partes (se calculan si faltan)
     
     Returns:
         Diccionario con asignaciones {maquina_id: [lista_de_partes]}
+    
+    Es re-entrante: todo el estado vive en un ContextoAsignacion propio de la
+    llamada, se puede correr en varios hilos/procesos a la vez.
     """
     if not partes:
         return {}
 
-    # Inicializar tracking de divisiones por parte
-    global _num_divisiones
-    _num_divisiones = {}
+    # Estado propio de esta llamada: matriz de compatibilidad y máscaras
+    # calculadas UNA vez, y tracking de divisiones por parte
+    contexto = ContextoAsignacion(partes, matriz, mascaras)
+    partes = contexto.partes
+    matriz = contexto.matriz
+    mascaras = contexto.mascaras
 
-    LIMITE_ESTACIONES = 52
     grupos_compatibilidad = agrupar_por_compatibilidad_alta(
         partes,
         umbral_compatibilidad,
-        limite_estaciones=LIMITE_ESTACIONES
+        limite_estaciones=LIMITE_ESTACIONES,
+        matriz=matriz,
+        mascaras=mascaras,
+        orden=orden,
+        semilla=semilla
     )
 
     asignaciones = {}
     maquina_actual = 1
     asignaciones[maquina_actual] = []
     tiempo_usado = {maquina_actual: 0.0}
+    mascara_maquina = {maquina_actual: 0}  # Unión de herramientas por máquina
     partes_pendientes = []
-    MAX_MAQUINAS = 20
     alertas = []
 
     # Paso 2: Asignar grupos validando OVERFLOW = 0 y tiempo
-    for grupo in grupos_compatibilidad:
+    for partes_grupo in grupos_compatibilidad:
+        # Horas, herramientas y compatibilidad del grupo se llevan al día en
+        # cada remoción (GrupoIncremental), sin recalcular todo el grupo
+        estado_grupo = GrupoIncremental(partes_grupo, matriz, mascaras)
+        grupo = estado_grupo.partes
         grupo_asignado = False
         intentos_division = 0
         MAX_INTENTOS = 3
@@ -417,7 +767,7 @@ def asignar_optimizado_final(
                 raise Exception(f"Se excedió el límite de {MAX_MAQUINAS} máquinas. Revisa configuración.")
 
             tiempo_disponible = horas_objetivo - tiempo_usado[maquina_actual]
-            horas_grupo = calcular_horas_grupo(grupo)
+            horas_grupo = estado_grupo.horas
 
 
             # VALIDACIÓN 1: TIEMPO (REGLA DURA ABSOLUTA)
@@ -435,25 +785,27 @@ def asignar_optimizado_final(
                         parte_asignada['quantity'] = cantidad_que_cabe
                         parte_asignada['_es_division'] = True
                         parte_asignada['_cantidad_original'] = cantidad_total
-                        grupo = [parte_asignada]
+                        estado_grupo = GrupoIncremental([parte_asignada], matriz, mascaras)
+                        grupo = estado_grupo.partes
                         parte_pendiente = parte.copy()
                         parte_pendiente['quantity'] = cantidad_pendiente
                         parte_pendiente['_es_division'] = True
                         parte_pendiente['_cantidad_original'] = cantidad_total
                         partes_pendientes.append(parte_pendiente)
-                        horas_grupo = calcular_horas_grupo(grupo)
+                        horas_grupo = estado_grupo.horas
                     else:
                         # No cabe nada, pasar a siguiente máquina
                         maquina_actual += 1
                         asignaciones[maquina_actual] = []
                         tiempo_usado[maquina_actual] = 0.0
+                        mascara_maquina[maquina_actual] = 0
                         break
                 else:
                     # Remover la parte menos compatible y pasarla a pendientes
-                    parte_menos_compatible = identificar_parte_menos_compatible(grupo)
-                    grupo.remove(parte_menos_compatible)
+                    parte_menos_compatible = estado_grupo.menos_compatible()
+                    estado_grupo.remover(parte_menos_compatible)
                     partes_pendientes.append(parte_menos_compatible)
-                    horas_grupo = calcular_horas_grupo(grupo)
+                    horas_grupo = estado_grupo.horas
                 # Recalcular tiempo disponible
                 tiempo_disponible = horas_objetivo - tiempo_usado[maquina_actual]
             # Si el grupo quedó vacío, pasar a siguiente máquina
@@ -461,11 +813,15 @@ def asignar_optimizado_final(
                 maquina_actual += 1
                 asignaciones[maquina_actual] = []
                 tiempo_usado[maquina_actual] = 0.0
+                mascara_maquina[maquina_actual] = 0
                 continue
+            # Lo que se carga a la máquina es la suma fresca (una vez por
+            # grupo), así el acumulado por restas no arrastra redondeo
+            horas_grupo = calcular_horas_grupo(grupo)
 
             # VALIDACIÓN 2: OVERFLOW = 0 (REGLA DURA)
-            partes_simuladas = asignaciones[maquina_actual] + grupo
-            herramientas_totales = contar_herramientas_unicas(partes_simuladas)
+            mascara_grupo = estado_grupo.mascara
+            herramientas_totales = (mascara_maquina[maquina_actual] | mascara_grupo).bit_count()
 
             if herramientas_totales > LIMITE_ESTACIONES:
                 # ALERTA: Overflow, pero no bloquea
@@ -473,23 +829,25 @@ def asignar_optimizado_final(
                 # CASO 1: Máquina vacía y grupo excede límite
                 if len(asignaciones[maquina_actual]) == 0:
                     if len(grupo) > 1:
-                        parte_menos_compatible = identificar_parte_menos_compatible(grupo)
-                        grupo.remove(parte_menos_compatible)
+                        parte_menos_compatible = estado_grupo.menos_compatible()
+                        estado_grupo.remover(parte_menos_compatible)
                         partes_pendientes.append(parte_menos_compatible)
                         continue
                     else:
                         parte_problema = grupo[0]
                         alertas.append(
-                            f"ALERTA: Part {parte_problema.get('part_number', 'N/A')} tiene {contar_herramientas_unicas([parte_problema])} herramientas únicas, excede el límite de {LIMITE_ESTACIONES} estaciones. No se puede asignar sin modificar el part."
+                            f"ALERTA: Part {parte_problema.get('part_number', 'N/A')} tiene {mascaras[parte_problema['_idx']].bit_count()} herramientas únicas, excede el límite de {LIMITE_ESTACIONES} estaciones. No se puede asignar sin modificar el part."
                         )
                         # Asignar igual, pero con alerta
                         asignaciones[maquina_actual].extend(grupo)
                         tiempo_usado[maquina_actual] += horas_grupo
+                        mascara_maquina[maquina_actual] |= mascara_grupo
                         grupo_asignado = True
                         break
                 maquina_actual += 1
                 asignaciones[maquina_actual] = []
                 tiempo_usado[maquina_actual] = 0.0
+                mascara_maquina[maquina_actual] = 0
                 continue
 
             # ALERTA: Out-of-style tools (estructura para expansión)
@@ -502,27 +860,29 @@ def asignar_optimizado_final(
             # Asignar grupo
             asignaciones[maquina_actual].extend(grupo)
             tiempo_usado[maquina_actual] += horas_grupo
+            mascara_maquina[maquina_actual] |= mascara_grupo
             grupo_asignado = True
 
     # Paso 3: Procesar partes pendientes (removidas de grupos)
     for parte in partes_pendientes:
         parte_asignada = False
         horas_parte = calcular_horas_parte(parte)
+        mascara_parte = mascaras[parte['_idx']]
         part_id = parte.get('part_id')
-        num_divisiones = contar_divisiones_parte(part_id)
+        num_divisiones = contar_divisiones_parte(contexto, part_id)
 
         # Intentar asignar completa en máquina existente
         for maq_id in sorted(asignaciones.keys()):
             tiempo_disponible = horas_objetivo - tiempo_usado[maq_id]
             if horas_parte > tiempo_disponible:
                 continue
-            partes_simuladas = asignaciones[maq_id] + [parte]
-            herramientas_totales = contar_herramientas_unicas(partes_simuladas)
+            herramientas_totales = (mascara_maquina[maq_id] | mascara_parte).bit_count()
             if herramientas_totales > LIMITE_ESTACIONES:
                 alertas.append(f"ALERTA: Máquina {maq_id} excede límite de estaciones ({herramientas_totales} > {LIMITE_ESTACIONES})")
                 # No bloquea, solo alerta
             asignaciones[maq_id].append(parte)
             tiempo_usado[maq_id] += horas_parte
+            mascara_maquina[maq_id] |= mascara_parte
             parte_asignada = True
             break
 
@@ -530,15 +890,16 @@ def asignar_optimizado_final(
         if not parte_asignada:
             # OPCIÓN A: Crear nueva máquina
             if horas_parte <= horas_objetivo:
-                if contar_herramientas_unicas([parte]) > LIMITE_ESTACIONES:
+                if mascara_parte.bit_count() > LIMITE_ESTACIONES:
                     alertas.append(
-                        f"ALERTA: Part {parte.get('part_number', 'N/A')} requiere {contar_herramientas_unicas([parte])} estaciones, excede límite de {LIMITE_ESTACIONES}."
+                        f"ALERTA: Part {parte.get('part_number', 'N/A')} requiere {mascara_parte.bit_count()} estaciones, excede límite de {LIMITE_ESTACIONES}."
                     )
                 maquina_actual += 1
                 if maquina_actual > MAX_MAQUINAS:
                     raise Exception(f"Se excedió límite de {MAX_MAQUINAS} máquinas.")
                 asignaciones[maquina_actual] = [parte]
                 tiempo_usado[maquina_actual] = horas_parte
+                mascara_maquina[maquina_actual] = mascara_parte
                 parte_asignada = True
             # OPCIÓN B: Dividir parte (si no ha llegado al límite)
             elif num_divisiones < 2:
@@ -552,18 +913,20 @@ def asignar_optimizado_final(
                     tiempo_disponible
                 )
                 if parte_asignada_div:
-                    partes_sim = asignaciones[maq_con_mas_espacio] + [parte_asignada_div]
-                    if contar_herramientas_unicas(partes_sim) > LIMITE_ESTACIONES:
-                        alertas.append(f"ALERTA: Máquina {maq_con_mas_espacio} excede límite de estaciones ({contar_herramientas_unicas(partes_sim)} > {LIMITE_ESTACIONES})")
+                    herramientas_sim = (mascara_maquina[maq_con_mas_espacio] | mascara_parte).bit_count()
+                    if herramientas_sim > LIMITE_ESTACIONES:
+                        alertas.append(f"ALERTA: Máquina {maq_con_mas_espacio} excede límite de estaciones ({herramientas_sim} > {LIMITE_ESTACIONES})")
                         maquina_actual += 1
                         if maquina_actual > MAX_MAQUINAS:
                             raise Exception(f"Se excedió límite de {MAX_MAQUINAS} máquinas.")
                         asignaciones[maquina_actual] = [parte_asignada_div]
                         tiempo_usado[maquina_actual] = calcular_horas_parte(parte_asignada_div)
+                        mascara_maquina[maquina_actual] = mascara_parte
                     else:
                         asignaciones[maq_con_mas_espacio].append(parte_asignada_div)
                         tiempo_usado[maq_con_mas_espacio] += calcular_horas_parte(parte_asignada_div)
-                    marcar_division_parte(part_id)
+                        mascara_maquina[maq_con_mas_espacio] |= mascara_parte
+                    marcar_division_parte(contexto, part_id)
                     if parte_pendiente_div:
                         partes_pendientes.append(parte_pendiente_div)
                     parte_asignada = True
@@ -575,6 +938,7 @@ def asignar_optimizado_final(
                     if horas_parte <= tiempo_disponible:
                         asignaciones[maq_id].append(parte)
                         tiempo_usado[maq_id] += horas_parte
+                        mascara_maquina[maq_id] |= mascara_parte
                         alertas.append(f"ALERTA: Part {parte.get('part_number', 'N/A')} asignada sin compatibilidad por falta de espacio.")
                         parte_asignada = True
                         break
@@ -585,6 +949,7 @@ def asignar_optimizado_final(
                         raise Exception(f"Se excedió límite de {MAX_MAQUINAS} máquinas.")
                     asignaciones[maquina_actual] = [parte]
                     tiempo_usado[maquina_actual] = horas_parte
+                    mascara_maquina[maquina_actual] = mascara_parte
                     alertas.append(f"ALERTA: Part {parte.get('part_number', 'N/A')} asignada en máquina nueva sin compatibilidad por falta de espacio.")
                     parte_asignada = True
                 if not parte_asignada:
@@ -593,6 +958,9 @@ def asignar_optimizado_final(
                     )
 
     asignaciones = {maq_id: partes for maq_id, partes in asignaciones.items() if partes}
+    for partes_maquina in asignaciones.values():
+        for parte in partes_maquina:
+            parte.pop('_idx', None)
     # Opcional: retornar alertas junto con asignaciones
     # return asignaciones, alertas
     return asignaciones
@@ -0,0 +1,464 @@
+"""
+Asignación consciente de las máquinas reales.
+
+asignar_optimizado_final trabaja con máquinas virtuales 1..N y un límite fijo
+de LIMITE_ESTACIONES herramientas. Aquí cada máquina real se describe con su
+vector de capacidad:
+- estaciones utilizables por (tipo, guía), ya sin las estaciones dañadas
+- estaciones autoindex (las herramientas autoindex no se mueven)
+- rango de grosor y tamaño de mesa
+y se decide si un conjunto de herramientas cabe con la misma regla que usa
+generar_estilo (no redondos: tipo y guía exactos; redondos: mismo tipo, con o
+sin guía). Así el overflow se detecta al asignar y no después.
+
+- asignar_en_maquinas: asigna las partes directo a máquinas reales en una pasada
+- emparejar_con_maquinas: lleva un plan de máquinas virtuales (greedy, exacto,
+  portafolio) a máquinas reales respetando capacidad y reglas duras
+- reparar_plan: ajusta un plan guardado a nuevas cantidades sin tocar las
+  máquinas que no cambian
+"""
+from typing import Dict, List, Optional, Tuple
+
+from app.utils.algoritmo_asignacion import calcular_horas_parte, es_redondo, ordenar_partes
+from app.utils.solver_exacto import EPS, asignaciones_desde_piezas, max_piezas_parte
+from app.utils.templates_compilados import compilar_maquina
+
+
+def capacidad_maquina(machine) -> Dict:
+    """
+    Vector de capacidad de una máquina (dict simple, se puede mandar al pool
+    de procesos).
+    """
+    compilada = compilar_maquina(machine)
+    config = compilada.template.config
+    disponibles = list(compilada.disponibles)
+
+    estaciones: Dict[Tuple[str, bool], List[str]] = {}
+    for est in disponibles:
+        llave = (config[est].get("tipo", "A"), bool(config[est].get("tiene_guia", False)))
+        estaciones.setdefault(llave, []).append(est)
+
+    return {
+        "machine_id": machine.id,
+        "tipo_maquina": machine.template.tipo_maquina if machine.template else None,
+        "config": config,
+        "estaciones": estaciones,
+        "total_estaciones": len(disponibles),
+        "thickness_min": machine.thickness_min or 0,
+        "thickness_max": machine.thickness_max or 0,
+        "mesa_x": machine.mesa_x or 0,
+        "mesa_y": machine.mesa_y or 0,
+    }
+
+
+def parte_elegible(parte: dict, capacidad: Dict) -> bool:
+    """Reglas duras de grosor y mesa de una parte en una máquina"""
+    thickness = parte.get('thickness')
+    if capacidad["thickness_min"] > 0 and capacidad["thickness_max"] > 0 and thickness is not None:
+        if not (capacidad["thickness_min"] <= thickness <= capacidad["thickness_max"]):
+            return False
+
+    sheet_size = parte.get('sheet_size') or [0, 0]
+    if capacidad["mesa_x"] > 0 and capacidad["mesa_y"] > 0:
+        sheet_x, sheet_y = sheet_size[0], sheet_size[1]
+        if sheet_x > capacidad["mesa_x"] or sheet_y > capacidad["mesa_y"]:
+            return False
+
+    return True
+
+
+def herramientas_parte(parte: dict) -> List[Tuple[str, str]]:
+    """[(tool_number, estación original)] en el mismo orden que procesar_herramientas_part"""
+    parsed_data = parte.get('parsed_data') or {}
+    tools_data = parsed_data.get("tools_data", [])
+    if tools_data:
+        return [(t["tool_number"], t["station"]) for t in tools_data]
+    stations = parsed_data.get("stations", parte.get('stations', []))
+    tool_numbers = parsed_data.get("tool_numbers", parte.get('tools', []))
+    return list(zip(tool_numbers, stations))
+
+
+def agregar_herramientas(herramientas: Dict[str, str], parte: dict) -> Dict[str, str]:
+    """Unión {tool_number: estación original}; manda la primera aparición (como la unificación)"""
+    nuevas = dict(herramientas)
+    for tn, station in herramientas_parte(parte):
+        nuevas.setdefault(tn, station)
+    return nuevas
+
+
+def demanda_estaciones(herramientas: Dict[str, str], capacidad: Dict) -> Tuple[Dict, Dict, Dict]:
+    """
+    Cuenta lo que piden las herramientas en la máquina, con su template.
+
+    Returns:
+        (exactas {(tipo, guía): herramientas no redondas},
+         redondas {tipo: herramientas redondas},
+         libres {(tipo, guía): estaciones sin herramienta autoindex})
+    """
+    config = capacidad["config"]
+    ocupadas_autoindex = set()
+    exactas: Dict[Tuple[str, bool], int] = {}
+    redondas: Dict[str, int] = {}
+
+    for tn, station in herramientas.items():
+        station_config = config.get(station, {})
+        if station_config.get("es_autoindex", False):
+            ocupadas_autoindex.add(station)
+            continue
+        tipo = station_config.get("tipo", "A")
+        if es_redondo(tn):
+            redondas[tipo] = redondas.get(tipo, 0) + 1
+        else:
+            llave = (tipo, bool(station_config.get("tiene_guia", False)))
+            exactas[llave] = exactas.get(llave, 0) + 1
+
+    libres = {
+        llave: sum(1 for est in estaciones if est not in ocupadas_autoindex)
+        for llave, estaciones in capacidad["estaciones"].items()
+    }
+    return exactas, redondas, libres
+
+
+def herramientas_fuera(herramientas: Dict[str, str], capacidad: Dict) -> int:
+    """
+    Cuántas herramientas quedarían fuera del estilo en la máquina (0 = cabe).
+
+    Misma regla que generar_estilo: las autoindex se quedan en su estación,
+    las no redondas necesitan tipo y guía exactos y los redondos usan lo que
+    quede de su tipo (primero sin guía). Además el total no puede pasar las
+    estaciones disponibles.
+    """
+    exactas, redondas, libres = demanda_estaciones(herramientas, capacidad)
+
+    sin_estacion = 0
+    sobrantes_por_tipo: Dict[str, int] = {}
+    for llave, necesarias in exactas.items():
+        disponibles = libres.get(llave, 0)
+        sin_estacion += max(0, necesarias - disponibles)
+        libres[llave] = max(0, disponibles - necesarias)
+    for (tipo, _), cantidad in libres.items():
+        sobrantes_por_tipo[tipo] = sobrantes_por_tipo.get(tipo, 0) + cantidad
+    for tipo, necesarias in redondas.items():
+        sin_estacion += max(0, necesarias - sobrantes_por_tipo.get(tipo, 0))
+
+    exceso_total = max(0, len(herramientas) - capacidad["total_estaciones"])
+    return max(sin_estacion, exceso_total)
+
+
+class _EstadoMaquina:
+    """Máquina real abierta durante asignar_en_maquinas"""
+
+    def __init__(self, capacidad: Dict):
+        self.capacidad = capacidad
+        self.piezas: List[Tuple[int, int]] = []
+        self.horas = 0.0
+        self.herramientas: Dict[str, str] = {}
+
+    def tiene(self, idx: int) -> bool:
+        return any(i == idx for i, _ in self.piezas)
+
+    def agregar(self, idx: int, parte: dict, cantidad: int, horas: float):
+        self.piezas.append((idx, cantidad))
+        self.horas += horas
+        self.herramientas = agregar_herramientas(self.herramientas, parte)
+
+
+def asignar_en_maquinas(
+    partes: List[dict],
+    capacidades: List[Dict],
+    horas_objetivo: float,
+    piezas_disponibles: Optional[List[int]] = None
+) -> Tuple[Dict[int, List[dict]], List[str]]:
+    """
+    Asigna las partes directamente a máquinas reales, en una sola pasada.
+
+    Las partes se recorren de más a menos horas. Cada parte va completa a la
+    máquina abierta que la acepte (grosor/mesa, horas ≤ horas_objetivo y sin
+    herramientas fuera del estilo) con más herramientas en común; si ninguna,
+    se abre la máquina libre elegible con más estaciones. Si no cabe completa
+    en ninguna, se divide llenando el tiempo libre (máximo max_piezas_parte
+    piezas por parte, o lo que indique piezas_disponibles para cada parte,
+    p. ej. cuando la parte ya corre en otras máquinas en reparar_plan).
+
+    Returns:
+        Tupla ({machine_id: [partes]}, alertas). Las partes que no se pudieron
+        asignar completas quedan reportadas en las alertas (y como faltantes
+        en evaluar_factibilidad).
+    """
+    H = horas_objetivo
+    alertas = []
+    abiertas: List[_EstadoMaquina] = []
+    ids_abiertas = set()
+
+    indice = {id(parte): i for i, parte in enumerate(partes)}
+    for parte in ordenar_partes(partes, "horas_desc"):
+        idx = indice[id(parte)]
+        uph = parte.get('uph', 0)
+        cantidad = parte.get('quantity', 0)
+        horas_totales = calcular_horas_parte(parte)
+        max_piezas = max_piezas_parte(horas_totales, H) if piezas_disponibles is None else piezas_disponibles[idx]
+
+        def horas_de(q: int) -> float:
+            return q / uph if uph > 0 else 0.0
+
+        def acepta(estado: _EstadoMaquina) -> bool:
+            return (
+                not estado.tiene(idx)
+                and parte_elegible(parte, estado.capacidad)
+                and herramientas_fuera(agregar_herramientas(estado.herramientas, parte), estado.capacidad) == 0
+            )
+
+        def abrir(capacidad: Dict) -> _EstadoMaquina:
+            ids_abiertas.add(capacidad["machine_id"])
+            estado = _EstadoMaquina(capacidad)
+            abiertas.append(estado)
+            return estado
+
+        herramientas_propias = agregar_herramientas({}, parte)
+        nuevas_elegibles = [
+            c for c in capacidades
+            if c["machine_id"] not in ids_abiertas and parte_elegible(parte, c) and herramientas_fuera(herramientas_propias, c) == 0
+        ]
+
+        restante = cantidad
+        piezas = 0
+        if restante > 0 and max_piezas <= 0:
+            alertas.append(
+                f"Part {parte.get('part_number')}: {restante} piezas sin asignar, la parte ya "
+                f"está dividida en el máximo de máquinas permitido"
+            )
+            continue
+        while restante > 0:
+            horas_restante = horas_de(restante)
+
+            # 1. Completa en una máquina abierta: la de más herramientas en común
+            candidatas = [e for e in abiertas if e.horas + horas_restante <= H + EPS and acepta(e)]
+            if candidatas:
+                destino = max(
+                    candidatas,
+                    key=lambda e: (len(herramientas_propias.keys() & e.herramientas.keys()), e.horas)
+                )
+                destino.agregar(idx, parte, restante, horas_restante)
+                piezas += 1
+                break
+
+            # 2. Completa en una máquina nueva: la elegible con más estaciones
+            nuevas = [c for c in nuevas_elegibles if c["machine_id"] not in ids_abiertas]
+            if nuevas and horas_restante <= H + EPS:
+                destino = abrir(max(nuevas, key=lambda c: c["total_estaciones"]))
+                destino.agregar(idx, parte, restante, horas_restante)
+                piezas += 1
+                break
+
+            # 3. Dividir: llenar el tiempo libre de una máquina (abierta o nueva)
+            destino = None
+            if uph > 0 and piezas + 1 < max_piezas:
+                con_tiempo = [e for e in abiertas if acepta(e) and int((H - e.horas + EPS) * uph) > 0]
+                if con_tiempo:
+                    destino = max(con_tiempo, key=lambda e: H - e.horas)
+                elif nuevas and int((H + EPS) * uph) > 0:
+                    destino = abrir(max(nuevas, key=lambda c: c["total_estaciones"]))
+            if destino is None:
+                alertas.append(
+                    f"Part {parte.get('part_number')}: {restante} piezas sin máquina con "
+                    f"estaciones y tiempo disponibles"
+                )
+                break
+
+            porcion = min(restante, int((H - destino.horas + EPS) * uph))
+            destino.agregar(idx, parte, porcion, horas_de(porcion))
+            restante -= porcion
+            piezas += 1
+
+    usadas = [e for e in abiertas if e.piezas]
+    asignaciones = asignaciones_desde_piezas(partes, [e.piezas for e in usadas])
+    return {
+        estado.capacidad["machine_id"]: asignaciones[num]
+        for num, estado in enumerate(usadas, start=1)
+    }, alertas
+
+
+def emparejar_con_maquinas(
+    asignaciones: Dict[int, List[dict]],
+    capacidades: List[Dict]
+) -> Tuple[Dict[int, List[dict]], List[str]]:
+    """
+    Asigna cada máquina virtual de un plan a una máquina real.
+
+    Grosor y mesa son reglas duras: una máquina virtual solo va a una máquina
+    que cumple para todas sus partes. Es un emparejamiento bipartito con
+    caminos aumentantes: las máquinas virtuales con más herramientas escogen
+    primero la libre elegible con menos herramientas fuera del estilo y, a
+    igualdad, la de menos estaciones (deja las grandes para los grupos
+    grandes); si ninguna elegible está libre se intenta mover a otra máquina
+    virtual ya emparejada. Así solo queda una máquina virtual sin máquina si
+    de verdad no existe un emparejamiento completo.
+
+    Returns:
+        Tupla ({machine_id: [partes]} en el orden del plan, errores).
+        Las máquinas virtuales sin máquina elegible no quedan en el plan (sus
+        piezas salen como faltantes) y se reportan en errores.
+    """
+    herramientas = {}
+    for num, partes in asignaciones.items():
+        herramientas[num] = {}
+        for parte in partes:
+            herramientas[num] = agregar_herramientas(herramientas[num], parte)
+    orden = sorted(asignaciones, key=lambda num: (-len(herramientas[num]), num))
+
+    posicion = {c["machine_id"]: i for i, c in enumerate(capacidades)}
+    candidatas = {
+        num: sorted(
+            (c for c in capacidades if all(parte_elegible(p, c) for p in asignaciones[num])),
+            key=lambda c: (herramientas_fuera(herramientas[num], c), c["total_estaciones"], posicion[c["machine_id"]])
+        )
+        for num in asignaciones
+    }
+    dueño: Dict[int, int] = {}  # machine_id → máquina virtual
+    destino_por_num: Dict[int, Dict] = {}
+
+    def aumentar(num: int, visitadas: set) -> bool:
+        """Camino aumentante desde num (mueve máquinas virtuales ya emparejadas)"""
+        for c in candidatas[num]:
+            machine_id = c["machine_id"]
+            if machine_id in visitadas:
+                continue
+            visitadas.add(machine_id)
+            if machine_id not in dueño or aumentar(dueño[machine_id], visitadas):
+                dueño[machine_id] = num
+                destino_por_num[num] = c
+                return True
+        return False
+
+    errores = []
+    for num in orden:
+        # Primero la mejor libre (preferencia); si no hay, camino aumentante
+        libre = next((c for c in candidatas[num] if c["machine_id"] not in dueño), None)
+        if libre is not None:
+            dueño[libre["machine_id"]] = num
+            destino_por_num[num] = libre
+        elif not aumentar(num, set()):
+            errores.append(
+                f"Máquina virtual {num}: ninguna máquina disponible cumple grosor/mesa para todas sus partes "
+                f"({', '.join(str(p.get('part_number')) for p in asignaciones[num])})"
+            )
+
+    return {
+        destino_por_num[num]["machine_id"]: asignaciones[num]
+        for num in asignaciones if num in destino_por_num
+    }, errores
+
+
+def reparar_plan(
+    partes: List[dict],
+    plan: Dict[int, Dict[int, int]],
+    capacidades: List[Dict],
+    horas_objetivo: float
+) -> Tuple[Dict[int, Dict[int, int]], List[str]]:
+    """
+    Ajusta un plan existente a nuevas cantidades tocando lo menos posible.
+
+    Args:
+        partes: partes con la cantidad NUEVA en 'quantity'
+        plan: plan anterior {machine_id: {índice de parte: cantidad}}
+        capacidades: máquinas disponibles (las del plan y las libres)
+        horas_objetivo: horas disponibles por máquina (LÍMITE ABSOLUTO)
+
+    Pasos:
+    1. Si bajó la cantidad, se quita primero de las piezas más chicas
+       (las divisiones pequeñas desaparecen).
+    2. Si subió, se agrega donde la parte ya corre (mismas herramientas,
+       el estilo no cambia), después en otras máquinas del plan donde sus
+       herramientas caben y al final en máquinas libres (asignar_en_maquinas).
+
+    Returns:
+        Tupla (plan nuevo {machine_id: {índice: cantidad}}, alertas)
+    """
+    H = horas_objetivo
+    nuevo = {machine_id: dict(piezas) for machine_id, piezas in plan.items()}
+    por_id = {c["machine_id"]: c for c in capacidades}
+
+    def horas_de(idx: int, cantidad: int) -> float:
+        uph = partes[idx].get('uph', 0)
+        return cantidad / uph if uph > 0 else 0.0
+
+    def horas_maquina(machine_id: int) -> float:
+        return sum(horas_de(i, q) for i, q in nuevo[machine_id].items())
+
+    def cabe_por_tiempo(idx: int, machine_id: int, falta: int) -> int:
+        """Piezas de las que faltan que caben en el tiempo libre de la máquina"""
+        uph = partes[idx].get('uph', 0)
+        if uph <= 0:
+            return falta  # Sin UPH no consume horas (mismo criterio que horas_de)
+        return min(falta, max(0, int((H - horas_maquina(machine_id) + EPS) * uph)))
+
+    asignado = {}
+    for piezas in nuevo.values():
+        for idx, cantidad in piezas.items():
+            asignado[idx] = asignado.get(idx, 0) + cantidad
+
+    # 1. Reducir
+    for idx, parte in enumerate(partes):
+        sobra = asignado.get(idx, 0) - parte.get('quantity', 0)
+        for machine_id in sorted((m for m in nuevo if idx in nuevo[m]), key=lambda m: nuevo[m][idx]):
+            if sobra <= 0:
+                break
+            quitar = min(sobra, nuevo[machine_id][idx])
+            nuevo[machine_id][idx] -= quitar
+            if nuevo[machine_id][idx] == 0:
+                del nuevo[machine_id][idx]
+            sobra -= quitar
+
+    # 2. Aumentar
+    pendientes = []
+    presupuesto = []  # Piezas que aún puede tener cada pendiente
+    for idx, parte in enumerate(partes):
+        falta = parte.get('quantity', 0) - asignado.get(idx, 0)
+        if falta <= 0:
+            continue
+
+        # 2a. Donde la parte ya corre: no cambia el estilo
+        for machine_id in sorted((m for m in nuevo if idx in nuevo[m]), key=horas_maquina):
+            agregar = cabe_por_tiempo(idx, machine_id, falta)
+            nuevo[machine_id][idx] += agregar
+            falta -= agregar
+            if falta <= 0:
+                break
+
+        # 2b. Otras máquinas del plan donde sus herramientas caben
+        piezas = sum(1 for m in nuevo if idx in nuevo[m])
+        max_piezas = max_piezas_parte(horas_de(idx, parte.get('quantity', 0)), H)
+        for machine_id in sorted(nuevo, key=horas_maquina):
+            if falta <= 0 or piezas >= max_piezas:
+                break
+            capacidad = por_id.get(machine_id)
+            if idx in nuevo[machine_id] or capacidad is None or not parte_elegible(parte, capacidad):
+                continue
+            herramientas = {}
+            for otro in nuevo[machine_id]:
+                herramientas = agregar_herramientas(herramientas, partes[otro])
+            if herramientas_fuera(agregar_herramientas(herramientas, parte), capacidad) > 0:
+                continue
+            agregar = cabe_por_tiempo(idx, machine_id, falta)
+            if agregar > 0:
+                nuevo[machine_id][idx] = agregar
+                falta -= agregar
+                piezas += 1
+
+        if falta > 0:
+            pendientes.append({**parte, 'quantity': falta, '_idx': idx})
+            presupuesto.append(max_piezas - piezas)
+
+    # 2c. Lo que falta va a máquinas libres, con las piezas que le quedan a
+    #     cada parte (la regla de divisiones cuenta las que ya tiene)
+    alertas = []
+    if pendientes:
+        libres = [c for c in capacidades if not nuevo.get(c["machine_id"])]
+        extra, alertas = asignar_en_maquinas(pendientes, libres, H, piezas_disponibles=presupuesto)
+        for machine_id, partes_maquina in extra.items():
+            nuevo[machine_id] = {}
+            for parte in partes_maquina:
+                idx = parte['_idx']
+                nuevo[machine_id][idx] = nuevo[machine_id].get(idx, 0) + parte['quantity']
+
+    return {machine_id: piezas for machine_id, piezas in nuevo.items() if piezas}, alertas
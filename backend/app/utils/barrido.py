@@ -0,0 +1,111 @@
+"""
+Barrido "what-if" de demanda x horas objetivo.
+
+Para responder "¿cuántas máquinas para demanda 100/200/500 a 12/24/36 h?"
+sin llamar /distribucion/crear por cada combinación:
+- los requerimientos, la matriz de compatibilidad y las máscaras de
+  herramientas se calculan UNA vez (no dependen de la cantidad)
+- la matriz de horas demanda x part se calcula con NumPy, junto con la cota
+  inferior por horas de cada celda
+- en cada celda solo se corre el núcleo de asignación (sin estilos ni BD) y,
+  como en /distribucion/crear, el emparejamiento con las máquinas reales
+"""
+from typing import Dict, List, Optional
+
+import numpy as np
+
+from app.utils.algoritmo_asignacion import (
+    LIMITE_ESTACIONES,
+    asignar_optimizado_final,
+    construir_mascaras_herramientas,
+    construir_matriz_compatibilidad,
+    internar_herramientas,
+)
+from app.utils.asignacion_maquinas import asignar_en_maquinas, emparejar_con_maquinas
+from app.utils.portafolio import evaluar_asignacion
+from app.utils.solver_exacto import EPS
+
+
+def matriz_horas(partes: List[dict], demandas: List[int]) -> np.ndarray:
+    """
+    Horas por (demanda, part): demanda * cantidad por producto / UPH.
+    'quantity' de cada parte es la cantidad para UNA unidad de demanda.
+    Partes sin UPH cuentan 0 horas (igual que calcular_horas_parte).
+    """
+    cantidades = np.array([p.get('quantity', 0) for p in partes], dtype=float)
+    uph = np.array([p.get('uph', 0) or 0 for p in partes], dtype=float)
+    horas_por_unidad = np.divide(cantidades, uph, out=np.zeros_like(cantidades), where=uph > 0)
+    return np.outer(np.asarray(demandas, dtype=float), horas_por_unidad)
+
+
+def barrido_asignacion(
+    partes: List[dict],
+    demandas: List[int],
+    horas: List[float],
+    maquinas_disponibles: int,
+    capacidades: Optional[List[Dict]] = None,
+    emparejar_con: Optional[List[Dict]] = None
+) -> Dict:
+    """
+    Corre el núcleo de asignación para cada (demanda, horas_objetivo).
+
+    Args:
+        partes: partes con 'quantity' = cantidad para UNA unidad de demanda
+        demandas, horas: valores a combinar
+        maquinas_disponibles: máquinas compatibles (para la factibilidad)
+        capacidades: si se pasan, se usa asignar_en_maquinas (máquinas
+            reales); si no, asignar_optimizado_final (máquinas virtuales)
+        emparejar_con: capacidades de las máquinas reales; con máquinas
+            virtuales, una celda solo es factible si todas se pueden
+            emparejar con una máquina real (grosor/mesa)
+
+    Returns:
+        Tabla compacta: matrices [demanda][horas] de máquinas, cota inferior
+        por horas y factibilidad, más las horas totales por demanda.
+    """
+    horas_dp = matriz_horas(partes, demandas)
+    horas_totales = horas_dp.sum(axis=1)
+    horas_arr = np.asarray(horas, dtype=float)
+    cota_por_horas = np.maximum(1, np.ceil(horas_totales[:, None] / horas_arr[None, :] - EPS)).astype(int)
+
+    # Matriz y máscaras una sola vez para todas las celdas
+    if capacidades is None:
+        ids_por_parte = internar_herramientas(partes)
+        matriz = construir_matriz_compatibilidad(partes, ids_por_parte)
+        mascaras = construir_mascaras_herramientas(ids_por_parte)
+
+    maquinas = np.zeros((len(demandas), len(horas)), dtype=int)
+    factible = np.zeros((len(demandas), len(horas)), dtype=bool)
+    errores = []
+
+    for i, demanda in enumerate(demandas):
+        partes_demanda = [{**p, 'quantity': int(p.get('quantity', 0) * demanda)} for p in partes]
+        for j, horas_objetivo in enumerate(horas):
+            try:
+                if capacidades is None:
+                    asignaciones = asignar_optimizado_final(
+                        partes_demanda, horas_objetivo, 70, matriz=matriz, mascaras=mascaras
+                    )
+                    cumple, usadas, _ = evaluar_asignacion(asignaciones, horas_objetivo, LIMITE_ESTACIONES)
+                    if cumple and emparejar_con is not None and usadas <= maquinas_disponibles:
+                        cumple = not emparejar_con_maquinas(asignaciones, emparejar_con)[1]
+                else:
+                    asignaciones, alertas = asignar_en_maquinas(partes_demanda, capacidades, horas_objetivo)
+                    cumple, usadas = not alertas, len(asignaciones)
+            except Exception as e:
+                errores.append({"demanda": demanda, "horas_objetivo": horas_objetivo, "error": str(e)})
+                maquinas[i, j] = -1
+                continue
+            maquinas[i, j] = usadas
+            factible[i, j] = cumple and usadas <= maquinas_disponibles
+
+    return {
+        "demandas": list(demandas),
+        "horas": list(horas),
+        "maquinas_disponibles": maquinas_disponibles,
+        "horas_totales": [round(float(h), 2) for h in horas_totales],
+        "maquinas": maquinas.tolist(),
+        "cota_inferior_por_horas": cota_por_horas.tolist(),
+        "es_factible": factible.tolist(),
+        "errores": errores
+    }
@@ -0,0 +1,215 @@
+"""
+Fase de mejora por búsqueda local después de la asignación greedy/exacta.
+
+Recocido simulado (simulated annealing) sobre tres vecindarios:
+- mover:   pasar un part completo de una máquina a otra
+- swap:    intercambiar dos parts entre máquinas
+- dividir: pasar parte de la cantidad de un part a otra máquina con tiempo
+           libre (rebalanceo de divisiones)
+
+Objetivo: primero menos máquinas, después menos herramientas únicas en total
+(suma de la unión de herramientas de cada máquina). Se respetan las mismas
+reglas duras: horas ≤ horas_objetivo, herramientas ≤ LIMITE_ESTACIONES
+(una máquina que ya lo excedía no puede empeorar) y máximo de divisiones
+por part.
+
+Con la misma semilla y sin límite de tiempo efectivo (solo max_iteraciones)
+el resultado es reproducible.
+"""
+import math
+import random
+import time
+from typing import Dict, List, Tuple
+
+from app.utils.algoritmo_asignacion import (
+    LIMITE_ESTACIONES,
+    calcular_horas_parte,
+    construir_mascaras_herramientas,
+    internar_herramientas,
+)
+from app.utils.solver_exacto import EPS, asignaciones_desde_piezas, max_piezas_parte
+
+# Peso de una máquina frente a una herramienta en el costo
+_PESO_MAQUINA = 1000
+# Premio a máquinas muy cargadas: empuja a vaciar las poco cargadas
+_PESO_CONCENTRACION = 10
+
+
+def mejorar_asignacion(
+    partes: List[dict],
+    asignaciones: Dict[int, List[dict]],
+    horas_objetivo: float,
+    tiempo_limite_seg: float = 2.0,
+    max_iteraciones: int = 20000,
+    semilla: int = 0,
+    limite_estaciones: int = LIMITE_ESTACIONES
+) -> Tuple[Dict[int, List[dict]], Dict]:
+    """
+    Mejora una asignación (formato de asignar_optimizado_final).
+
+    Args:
+        partes: las partes originales (para cantidades, UPH y herramientas)
+        asignaciones: resultado del greedy o del modo exacto
+        horas_objetivo: horas disponibles por máquina (LÍMITE ABSOLUTO)
+        tiempo_limite_seg / max_iteraciones: presupuesto (lo que llegue primero)
+        semilla: semilla del generador aleatorio
+
+    Returns:
+        Tupla (asignaciones, info) con info = maquinas/herramientas antes y
+        después, iteraciones y movimientos aceptados.
+    """
+    inicio = time.perf_counter()
+    H = horas_objetivo
+
+    # Índice de cada part por part_id (se necesita que sea único)
+    indice = {p.get('part_id'): i for i, p in enumerate(partes)}
+    if len(indice) != len(partes) or not asignaciones:
+        return asignaciones, {"aplicada": False}
+
+    mascaras = construir_mascaras_herramientas(internar_herramientas(partes))
+    uph = [p.get('uph', 1) for p in partes]
+    horas_totales = [calcular_horas_parte(p) for p in partes]
+    max_piezas = [max_piezas_parte(h, H) for h in horas_totales]
+
+    def horas_de(idx: int, cantidad: int) -> float:
+        return cantidad / uph[idx] if uph[idx] > 0 else 0.0
+
+    # Estado: por máquina {idx: cantidad}, horas y unión de herramientas
+    maquinas: List[Dict[int, int]] = []
+    for num in sorted(asignaciones):
+        maquina = {}
+        for parte in asignaciones[num]:
+            idx = indice.get(parte.get('part_id'))
+            if idx is None:
+                return asignaciones, {"aplicada": False}
+            maquina[idx] = maquina.get(idx, 0) + parte.get('quantity', 0)
+        maquinas.append(maquina)
+
+    def union_de(maquina: Dict[int, int]) -> int:
+        mascara = 0
+        for idx in maquina:
+            mascara |= mascaras[idx]
+        return mascara.bit_count()
+
+    horas = [sum(horas_de(i, q) for i, q in m.items()) for m in maquinas]
+    unions = [union_de(m) for m in maquinas]
+    # Máquinas que ya excedían el límite (alerta del greedy) no pueden empeorar
+    limites = [max(limite_estaciones, u) for u in unions]
+    piezas = [0] * len(partes)
+    for m in maquinas:
+        for idx in m:
+            piezas[idx] += 1
+
+    def costo_maquina(m: int) -> float:
+        if not maquinas[m]:
+            return 0.0
+        return _PESO_MAQUINA + unions[m] - _PESO_CONCENTRACION * (horas[m] / H) ** 2
+
+    def clave() -> Tuple[int, int]:
+        return (sum(1 for m in maquinas if m), sum(unions[m] for m in range(len(maquinas)) if maquinas[m]))
+
+    inicial = clave()
+    mejor_clave = inicial
+    mejor_estado = [dict(m) for m in maquinas]
+
+    rng = random.Random(semilla)
+    temp_inicial, temp_final = 20.0, 0.1
+    aceptados = 0
+    iteracion = 0
+
+    for iteracion in range(1, max_iteraciones + 1):
+        if iteracion % 128 == 0 and time.perf_counter() - inicio > tiempo_limite_seg:
+            break
+
+        activas = [m for m in range(len(maquinas)) if maquinas[m]]
+        if len(activas) < 2:
+            break
+        temperatura = temp_inicial * (temp_final / temp_inicial) ** (iteracion / max_iteraciones)
+
+        a, b = rng.sample(activas, 2)
+        idx = rng.choice(list(maquinas[a]))
+        cantidad = maquinas[a][idx]
+        vecindario = rng.random()
+
+        # Cambios propuestos: [(máquina, idx, delta de cantidad)]
+        if vecindario < 0.4:
+            cambios = [(a, idx, -cantidad), (b, idx, cantidad)]
+        elif vecindario < 0.7:
+            otro = rng.choice(list(maquinas[b]))
+            if otro == idx or otro in maquinas[a] or idx in maquinas[b]:
+                continue
+            cambios = [(a, idx, -cantidad), (b, idx, cantidad),
+                       (b, otro, -maquinas[b][otro]), (a, otro, maquinas[b][otro])]
+        else:
+            if uph[idx] <= 0:
+                continue
+            mover = min(cantidad - 1, int((H - horas[b]) * uph[idx]))
+            if mover <= 0:
+                continue
+            cambios = [(a, idx, -mover), (b, idx, mover)]
+
+        # Aplicar tentativamente sobre copias de las máquinas tocadas
+        tocadas = {m for m, _, _ in cambios}
+        nuevas = {m: dict(maquinas[m]) for m in tocadas}
+        for m, i, delta in cambios:
+            nuevas[m][i] = nuevas[m].get(i, 0) + delta
+            if nuevas[m][i] == 0:
+                del nuevas[m][i]
+
+        # Reglas duras: horas, estaciones y máximo de divisiones
+        factible = True
+        nuevas_horas, nuevas_unions = {}, {}
+        for m in tocadas:
+            nuevas_horas[m] = sum(horas_de(i, q) for i, q in nuevas[m].items())
+            nuevas_unions[m] = union_de(nuevas[m])
+            if nuevas_horas[m] > H + EPS or nuevas_unions[m] > limites[m]:
+                factible = False
+                break
+        if not factible:
+            continue
+        for i in {i for _, i, _ in cambios}:
+            antes = sum(1 for m in tocadas if i in maquinas[m])
+            despues = sum(1 for m in tocadas if i in nuevas[m])
+            if despues > antes and piezas[i] + despues - antes > max_piezas[i]:
+                factible = False
+                break
+        if not factible:
+            continue
+
+        anterior = {m: (maquinas[m], horas[m], unions[m]) for m in tocadas}
+        costo_antes = sum(costo_maquina(m) for m in tocadas)
+        for m in tocadas:
+            maquinas[m], horas[m], unions[m] = nuevas[m], nuevas_horas[m], nuevas_unions[m]
+        delta_costo = sum(costo_maquina(m) for m in tocadas) - costo_antes
+
+        if delta_costo <= 0 or rng.random() < math.exp(-delta_costo / temperatura):
+            aceptados += 1
+            for m in tocadas:
+                for i in set(anterior[m][0]) - set(maquinas[m]):
+                    piezas[i] -= 1
+                for i in set(maquinas[m]) - set(anterior[m][0]):
+                    piezas[i] += 1
+            actual = clave()
+            if actual < mejor_clave:
+                mejor_clave = actual
+                mejor_estado = [dict(m) for m in maquinas]
+        else:
+            for m in tocadas:
+                maquinas[m], horas[m], unions[m] = anterior[m]
+
+    info = {
+        "aplicada": True,
+        "maquinas_antes": inicial[0],
+        "maquinas_despues": mejor_clave[0],
+        "herramientas_antes": inicial[1],
+        "herramientas_despues": mejor_clave[1],
+        "iteraciones": iteracion,
+        "movimientos_aceptados": aceptados,
+        "tiempo_seg": round(time.perf_counter() - inicio, 3)
+    }
+
+    if mejor_clave == inicial:
+        return asignaciones, info
+
+    piezas_finales = [list(m.items()) for m in mejor_estado if m]
+    return asignaciones_desde_piezas(partes, piezas_finales), info
@@ -0,0 +1,199 @@
+"""
+Caché persistente de setups parseados.
+
+Cada entrada se guarda con la llave SHA-256(contenido del .stp) + PARSER_VERSION
+en un SQLite aparte (parse_cache.db, junto a clasificador.db). Solo se guarda
+lo que depende del contenido; el part number se vuelve a leer del nombre del
+archivo en cada llamada, así el mismo archivo subido con otro nombre no
+hereda un part number equivocado.
+
+Cuando el total guardado supera PARSE_CACHE_MAX_BYTES se eliminan las
+entradas usadas hace más tiempo (LRU).
+"""
+import asyncio
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+from typing import IO, List, Optional, Tuple, Union
+
+from app.core import PARSE_CACHE_FILENAME, PARSE_CACHE_MAX_BYTES
+from app.database.db import engine
+from app.utils.parser_setups import PARSER_VERSION, parse_setup, part_number_desde_ruta
+from app.utils.pool_procesos import obtener_pool
+
+_lock_esquema = threading.Lock()
+_esquema_listo = False
+
+
+def ruta_cache() -> str:
+    """Ruta del SQLite del caché: misma carpeta que clasificador.db"""
+    carpeta = os.path.dirname(engine.url.database or "") or "."
+    return os.path.join(carpeta, PARSE_CACHE_FILENAME)
+
+
+def _conectar() -> sqlite3.Connection:
+    global _esquema_listo
+    conn = sqlite3.connect(ruta_cache(), timeout=10)
+
+    if not _esquema_listo:
+        with _lock_esquema:
+            if not _esquema_listo:
+                conn.execute("PRAGMA journal_mode=WAL")
+                conn.execute("""
+                    CREATE TABLE IF NOT EXISTS parse_cache (
+                        clave TEXT PRIMARY KEY,
+                        version INTEGER NOT NULL,
+                        datos TEXT NOT NULL,
+                        tamano INTEGER NOT NULL,
+                        ultimo_uso REAL NOT NULL
+                    )
+                """)
+                conn.execute("CREATE INDEX IF NOT EXISTS ix_parse_cache_uso ON parse_cache (ultimo_uso)")
+                # Entradas de otra versión del parser ya no son válidas
+                conn.execute("DELETE FROM parse_cache WHERE version != ?", (PARSER_VERSION,))
+                conn.commit()
+                _esquema_listo = True
+
+    return conn
+
+
+def clave_contenido(contenido: bytes) -> str:
+    """SHA-256 del contenido + versión del parser"""
+    return f"{hashlib.sha256(contenido).hexdigest()}:v{PARSER_VERSION}"
+
+
+def sha256_archivo(ruta: str, bloque: int = 1024 * 1024) -> str:
+    """SHA-256 de un archivo leyendo por bloques (memoria constante)"""
+    sha = hashlib.sha256()
+    with open(ruta, "rb") as f:
+        for trozo in iter(lambda: f.read(bloque), b""):
+            sha.update(trozo)
+    return sha.hexdigest()
+
+
+def clave_archivo(ruta: str) -> str:
+    """Igual que clave_contenido pero leyendo el archivo por bloques"""
+    return f"{sha256_archivo(ruta)}:v{PARSER_VERSION}"
+
+
+def obtener(clave: str) -> Optional[dict]:
+    """Retorna los datos guardados para la clave (o None) y marca su uso"""
+    try:
+        conn = _conectar()
+        try:
+            fila = conn.execute(
+                "SELECT datos FROM parse_cache WHERE clave = ? AND version = ?",
+                (clave, PARSER_VERSION)
+            ).fetchone()
+            if fila is None:
+                return None
+            conn.execute(
+                "UPDATE parse_cache SET ultimo_uso = ? WHERE clave = ?",
+                (time.time(), clave)
+            )
+            conn.commit()
+            return json.loads(fila[0])
+        finally:
+            conn.close()
+    except sqlite3.Error:
+        # El caché nunca debe bloquear un parseo
+        return None
+
+
+def guardar(clave: str, datos: dict):
+    """Guarda los datos parseados y aplica el límite de tamaño (LRU)"""
+    serializado = json.dumps(datos)
+    try:
+        conn = _conectar()
+        try:
+            conn.execute(
+                "INSERT OR REPLACE INTO parse_cache (clave, version, datos, tamano, ultimo_uso) "
+                "VALUES (?, ?, ?, ?, ?)",
+                (clave, PARSER_VERSION, serializado, len(serializado), time.time())
+            )
+            # Eliminar las menos usadas recientemente hasta quedar bajo el límite
+            conn.execute("""
+                DELETE FROM parse_cache WHERE clave IN (
+                    SELECT clave FROM (
+                        SELECT clave, SUM(tamano) OVER (
+                            ORDER BY ultimo_uso DESC, clave
+                        ) AS acumulado
+                        FROM parse_cache
+                    ) WHERE acumulado > ?
+                )
+            """, (PARSE_CACHE_MAX_BYTES,))
+            conn.commit()
+        finally:
+            conn.close()
+    except sqlite3.Error:
+        pass
+
+
+def limpiar() -> int:
+    """Vacía el caché. Retorna cantidad de entradas eliminadas"""
+    conn = _conectar()
+    try:
+        count = conn.execute("DELETE FROM parse_cache").rowcount
+        conn.commit()
+        return count
+    finally:
+        conn.close()
+
+
+def parse_setup_cacheado(fuente: Union[str, bytes, IO], nombre_archivo: Optional[str] = None) -> dict:
+    """
+    Igual que parse_setup (acepta ruta, bytes o stream), pero si el contenido
+    ya se parseó antes con la misma versión del parser se omite el parseo.
+    """
+    if nombre_archivo is None:
+        if not isinstance(fuente, str):
+            raise ValueError("nombre_archivo es obligatorio si el setup no viene de una ruta")
+        nombre_archivo = fuente
+
+    part_info = part_number_desde_ruta(nombre_archivo)
+
+    if isinstance(fuente, str):
+        # Ruta: hash por bloques y parseo en streaming, sin cargar el archivo
+        clave = clave_archivo(fuente)
+        contenido = fuente
+    else:
+        if isinstance(fuente, (bytes, bytearray, memoryview)):
+            contenido = bytes(fuente)
+        else:
+            contenido = fuente.read()
+            if isinstance(contenido, str):
+                contenido = contenido.encode("utf-8")
+        clave = clave_contenido(contenido)
+
+    datos = obtener(clave)
+    if datos is not None:
+        return {"part_number": part_info, **datos}
+
+    resultado = parse_setup(contenido, nombre_archivo)
+    guardar(clave, {k: v for k, v in resultado.items() if k != "part_number"})
+    return resultado
+
+
+async def parse_setups_en_pool(archivos: List[Tuple[bytes, str]]) -> List[Union[dict, Exception]]:
+    """
+    Parsea varios setups en paralelo usando el pool de procesos compartido,
+    sin bloquear el event loop.
+
+    archivos: lista de (contenido, nombre_archivo).
+    Retorna una lista en el mismo orden con el dict parseado, o la
+    excepción si ese archivo falló (los demás se procesan igual).
+    """
+    if not archivos:
+        return []
+
+    loop = asyncio.get_running_loop()
+    pool = obtener_pool()
+
+    futuros = [
+        loop.run_in_executor(pool, parse_setup_cacheado, contenido, nombre)
+        for contenido, nombre in archivos
+    ]
+    return await asyncio.gather(*futuros, return_exceptions=True)
@@ -1,7 +1,46 @@
 import re
-from typing import List, Optional
+from collections import deque
+from typing import IO, Iterable, Iterator, List, Optional, Union
+import io
 import os
 
+# Versión del parser. Incrementarla cuando cambie el resultado de
+# escanear_setup: invalida todos los parseos guardados en parser_cache.
+PARSER_VERSION = 1
+
+# =========================================================
+#   PATRONES PRECOMPILADOS
+# =========================================================
+_RE_PART_NUMBER = re.compile(r"^([A-Z0-9]+)-(\d+)_(\d+)-(SW)")
+
+_RE_THICKNESS = re.compile(r"THICKNESS\s*:\s*([0-9.]+)")
+_RE_SHEET_SIZE = re.compile(r"SHEET SIZE\s*:\s*([0-9]+)\s*x\s*([0-9]+)", re.I)
+_RE_SYM = re.compile(r"sym\s*=\s*([0-9]+)", re.I)
+_RE_RUN_TIME = re.compile(r"=\s*([0-9.]+)\s*mins", re.I)
+
+_RE_ESTACION = re.compile(r"^(\d{3})[a-zA-Z]?$")
+_RE_TOOL_NUMBER = re.compile(r"^\d{4,6}(\.\d+)?$")
+_RE_ANGULO = re.compile(r"^\d+\.0+$")
+
+_ANGULOS_VALIDOS = {0.0, 90.0, 180.0, 270.0, 45.0}
+
+# Encabezados: (clave, patrón, texto que debe aparecer en la ventana).
+# El texto ancla evita correr el regex en líneas que no pueden contenerlo.
+_ENCABEZADOS = (
+    ("thickness", _RE_THICKNESS, "THICKNESS"),
+    ("sheet_size", _RE_SHEET_SIZE, "SHEET SIZE"),
+    ("sym", _RE_SYM, "SYM"),
+    ("run_time", _RE_RUN_TIME, "MINS"),
+)
+
+# Líneas con texto que se conservan para buscar encabezados partidos en
+# varias líneas (ej: "THICKNESS :" y el valor en la línea siguiente).
+# Las líneas en blanco intermedias no cuentan, pero la ventana nunca
+# supera _VENTANA_MAX_LINEAS.
+_VENTANA_ENCABEZADOS = 3
+_VENTANA_MAX_LINEAS = 64
+
+
 def extraer_part_number(nombre_archivo: str) -> dict:
     """
     Extrae:
@@ -13,8 +52,7 @@ def extraer_part_number(nombre_archivo: str) -> dict:
       TYEH-1153532_02-SW
       ETYEH-1153532_03-SW
     """
-    patron = r"^([A-Z0-9]+)-(\d+)_(\d+)-(SW)"
-    match = re.match(patron, nombre_archivo)
+    match = _RE_PART_NUMBER.match(nombre_archivo)
 
     if not match:
         return {
@@ -41,140 +79,137 @@ def extraer_part_number(nombre_archivo: str) -> dict:
     }
 
 
-def parse_setup(file_path: str):
-    # =========================================================
-    #   1) NOMBRE (part number)
-    # =========================================================
-    nombre_archivo = os.path.basename(file_path).replace(".stp", "")
-
-    # limpiar prefijos de upload
-    for rm in ["temp_", "file-"]:
-        if nombre_archivo.startswith(rm):
-            nombre_archivo = nombre_archivo[len(rm):]
-
-    part_info = extraer_part_number(nombre_archivo)
-
-    # VALIDAR NIVEL SW
-    if part_info["nivel"] != "SW":
-        raise ValueError("Solo se aceptan setups de nivel SW.")
-
-    # =========================================================
-    #   2) LEER CONTENIDO DEL ARCHIVO
-    # =========================================================
-    with open(file_path, 'r', encoding='utf-8', errors='ignore') as f:
-        content = f.read()
-
-    # =========================================================
-    #   3) THICKNESS
-    # =========================================================
-    thick_match = re.search(r"THICKNESS\s*:\s*([0-9.]+)", content)
-    thickness = float(thick_match.group(1)) if thick_match else None
+def escanear_setup(lineas: Iterable[str]) -> dict:
+    """
+    Recorre las líneas de un .stp UNA sola vez y extrae encabezados
+    (THICKNESS, SHEET SIZE, sym, mins), estaciones, tool numbers y ángulos.
 
-    # =========================================================
-    #   4) SHEET SIZE
-    # =========================================================
-    sheet_match = re.search(r"SHEET SIZE\s*:\s*([0-9]+)\s*x\s*([0-9]+)", content, re.I)
-    if sheet_match:
-        s1, s2 = int(sheet_match.group(1)), int(sheet_match.group(2))
-        sheet_size = sorted([s1, s2], reverse=True)
-    else:
-        sheet_size = None
+    Retorna todos los campos de parse_setup excepto part_number, que
+    depende del nombre del archivo y no del contenido.
+    """
+    encabezados = {}
+    pendientes = list(_ENCABEZADOS)
+    ultimas = deque()
+    ultimas_mayus = deque()
+    con_texto = 0
 
-    # =========================================================
-    #   5) STATIONS, TOOL NUMBERS & ANGLES
-    # =========================================================
     stations = []
     tool_numbers = []
     angles = []
     tools_data = []  # Lista de dicts con info completa
+    seen = set()
 
-    for line in content.split("\n"):
-        line = line.strip()
+    for raw in lineas:
+        mayus = raw.upper()
+
+        # =====================================================
+        #   ENCABEZADOS (ventana acotada de líneas recientes)
+        # =====================================================
+        if pendientes:
+            ultimas.append(raw)
+            ultimas_mayus.append(mayus)
+            if raw and not raw.isspace():
+                con_texto += 1
+            while con_texto > _VENTANA_ENCABEZADOS or len(ultimas) > _VENTANA_MAX_LINEAS:
+                descartada = ultimas.popleft()
+                ultimas_mayus.popleft()
+                if descartada and not descartada.isspace():
+                    con_texto -= 1
+
+            ventana = None
+            for encabezado in pendientes[:]:
+                clave, patron, ancla = encabezado
+                if not any(ancla in m for m in ultimas_mayus):
+                    continue
+                if ventana is None:
+                    ventana = "\n".join(ultimas)
+                match = patron.search(ventana)
+                if match:
+                    encabezados[clave] = match
+                    pendientes.remove(encabezado)
+
+        # =====================================================
+        #   ESTACIONES, TOOL NUMBERS & ÁNGULOS
+        # =====================================================
+        line = raw.strip()
         if not line:
             continue
 
         # ignorar encabezados
-        if "TOOL" in line.upper() and "TYPE" in line.upper():
+        if "TOOL" in mayus and "TYPE" in mayus:
             continue
 
-        # Buscar patrón: estación, tool number y ángulo
         # Formato: "201 RECTANGULAR ... 90.000 ... 31750.156"
         parts = line.split()
         if len(parts) < 2:
             continue
-        
+
         # Primera columna debe ser estación (3 dígitos)
-        if not re.match(r'^\d{3}[a-zA-Z]?$', parts[0]):
+        est_match = _RE_ESTACION.match(parts[0])
+        if not est_match:
             continue
-        
-        station = re.match(r'^(\d{3})', parts[0]).group(1)
-        
+
+        station = est_match.group(1)
+
         # Buscar tool number (formato XXXXX.X o XXXXX)
         tool_num = None
         angle = None
-        
+
         for i, part in enumerate(parts):
             # Tool number: 4-6 dígitos con posible decimal
-            if re.match(r'^\d{4,6}(\.\d+)?$', part):
+            if _RE_TOOL_NUMBER.match(part):
                 tool_num = part
-                
-                # Buscar ángulo antes del tool number
-                # Los ángulos suelen estar 1-3 posiciones antes
-                for j in range(max(0, i-5), i):
-                    if re.match(r'^\d+\.0+$', parts[j]):
+
+                # Los ángulos suelen estar 1-5 posiciones antes
+                for j in range(max(0, i - 5), i):
+                    if _RE_ANGULO.match(parts[j]):
                         potential_angle = float(parts[j])
-                        if potential_angle in [0.0, 90.0, 180.0, 270.0, 45.0]:
+                        if potential_angle in _ANGULOS_VALIDOS:
                             angle = potential_angle
                             break
                 break
-        
-        # Validar y agregar
+
+        # Validar y agregar (sin duplicados, manteniendo orden)
         if tool_num and float(tool_num.split('.')[0]) >= 1000:
+            key = (station, tool_num)
+            if key in seen:
+                continue
+            seen.add(key)
+
+            angle = angle if angle is not None else 0.0  # Default 0° si no se encuentra
             stations.append(station)
             tool_numbers.append(tool_num)
-            angles.append(angle if angle is not None else 0.0)  # Default 0° si no se encuentra
-            
+            angles.append(angle)
             tools_data.append({
                 "station": station,
                 "tool_number": tool_num,
-                "angle": angle if angle is not None else 0.0
+                "angle": angle
             })
 
-    # eliminar duplicados manteniendo orden
-    seen = set()
-    unique_stations = []
-    unique_tool_numbers = []
-    unique_angles = []
-    unique_tools_data = []
-    
-    for i, (st, tn) in enumerate(zip(stations, tool_numbers)):
-        key = f"{st}_{tn}"
-        if key not in seen:
-            seen.add(key)
-            unique_stations.append(st)
-            unique_tool_numbers.append(tn)
-            unique_angles.append(angles[i])
-            unique_tools_data.append(tools_data[i])
-    
-    stations = unique_stations
-    tool_numbers = unique_tool_numbers
-    angles = unique_angles
-    tools_data = unique_tools_data
-
     # =========================================================
-    #   6) SYM  (Piezas por blank, NO es booleano)
+    #   THICKNESS / SHEET SIZE
     # =========================================================
-    sym_match = re.search(r"sym\s*=\s*([0-9]+)", content, re.I)
-    sym = int(sym_match.group(1)) if sym_match else None
+    thick_match = encabezados.get("thickness")
+    thickness = float(thick_match.group(1)) if thick_match else None
+
+    sheet_match = encabezados.get("sheet_size")
+    if sheet_match:
+        s1, s2 = int(sheet_match.group(1)), int(sheet_match.group(2))
+        sheet_size = sorted([s1, s2], reverse=True)
+    else:
+        sheet_size = None
 
     # =========================================================
-    #   7) RUN TIME (mins)
+    #   SYM (Piezas por blank, NO es booleano) y RUN TIME (mins)
     # =========================================================
-    run_match = re.search(r"=\s*([0-9.]+)\s*mins", content, re.I)
+    sym_match = encabezados.get("sym")
+    sym = int(sym_match.group(1)) if sym_match else None
+
+    run_match = encabezados.get("run_time")
     run_time = float(run_match.group(1)) if run_match else None
 
     # =========================================================
-    #   8) UPH  (según tu fórmula oficial)
+    #   UPH  (según tu fórmula oficial)
     # =========================================================
     if sym is not None and run_time is not None:
         total_time = run_time + 6
@@ -182,11 +217,7 @@ def parse_setup(file_path: str):
     else:
         uph = None
 
-    # =========================================================
-    #   9) RESPUESTA FINAL
-    # =========================================================
     return {
-        "part_number": part_info,
         "thickness": thickness,
         "sheet_size": sheet_size,
         "stations": stations,
@@ -197,3 +228,97 @@ def parse_setup(file_path: str):
         "run_time_mins": run_time,
         "uph": uph
     }
+
+
+def part_number_desde_ruta(file_path: str) -> dict:
+    """
+    Obtiene el part number a partir del nombre del archivo.
+    Lanza ValueError si el setup no es de nivel SW.
+    """
+    nombre_archivo = os.path.basename(file_path).replace(".stp", "")
+
+    # limpiar prefijos de upload
+    for rm in ["temp_", "file-"]:
+        if nombre_archivo.startswith(rm):
+            nombre_archivo = nombre_archivo[len(rm):]
+
+    part_info = extraer_part_number(nombre_archivo)
+
+    # VALIDAR NIVEL SW
+    if part_info["nivel"] != "SW":
+        raise ValueError("Solo se aceptan setups de nivel SW.")
+
+    return part_info
+
+
+def _lineas(texto: IO[str]) -> Iterator[str]:
+    """
+    Recorre un stream de texto línea por línea, sin el salto de línea final.
+    Equivale a texto.read().split("\n") (incluida la línea vacía final si el
+    archivo termina en salto de línea) pero sin cargar el archivo completo.
+    """
+    linea = ""
+    for linea in texto:
+        yield linea[:-1] if linea.endswith("\n") else linea
+    if linea == "" or linea.endswith("\n"):
+        yield ""
+
+
+def iterar_lineas(fuente: Union[str, bytes, IO]) -> Iterator[str]:
+    """
+    Lee las líneas del setup desde una ruta, bytes o un stream (texto o
+    binario) sin cargar el contenido completo en memoria.
+    Se decodifica igual que al abrir el archivo en modo texto (utf-8
+    ignorando errores, saltos de línea universales).
+    """
+    if isinstance(fuente, str):
+        with open(fuente, 'r', encoding='utf-8', errors='ignore') as f:
+            yield from _lineas(f)
+        return
+
+    if isinstance(fuente, (bytes, bytearray, memoryview)):
+        fuente = io.BytesIO(fuente)
+
+    if isinstance(fuente, io.TextIOBase):
+        yield from _lineas(fuente)
+        return
+
+    # Stream binario: se decodifica por bloques. detach() evita que el
+    # wrapper cierre el stream original (ej: UploadFile.file).
+    texto = io.TextIOWrapper(fuente, encoding='utf-8', errors='ignore')
+    try:
+        yield from _lineas(texto)
+    finally:
+        texto.detach()
+
+
+def parse_setup(fuente: Union[str, bytes, IO], nombre_archivo: Optional[str] = None):
+    """
+    Parsea un setup .stp.
+
+    fuente puede ser la ruta del archivo, su contenido en bytes o un stream
+    abierto (ej: UploadFile.file). Si no es una ruta, nombre_archivo es
+    obligatorio porque de él se obtiene el part number.
+
+    El contenido se recorre línea por línea: la memoria usada no depende del
+    tamaño del archivo (los encabezados se buscan en una ventana acotada).
+    """
+    # =========================================================
+    #   1) NOMBRE (part number)
+    # =========================================================
+    if nombre_archivo is None:
+        if not isinstance(fuente, str):
+            raise ValueError("nombre_archivo es obligatorio si el setup no viene de una ruta")
+        nombre_archivo = fuente
+
+    part_info = part_number_desde_ruta(nombre_archivo)
+
+    # =========================================================
+    #   2) LEER Y ESCANEAR CONTENIDO (una sola pasada, en streaming)
+    # =========================================================
+    datos = escanear_setup(iterar_lineas(fuente))
+
+    # =========================================================
+    #   3) RESPUESTA FINAL
+    # =========================================================
+    return {"part_number": part_info, **datos}
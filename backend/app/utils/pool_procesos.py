@@ -0,0 +1,36 @@
+"""
+Pool de procesos compartido por todo el backend.
+
+Se crea la primera vez que se usa y se mantiene vivo entre requests, para no
+pagar el costo de levantar procesos en cada llamada. main.py lo cierra al
+apagar la aplicación.
+"""
+from concurrent.futures import ProcessPoolExecutor
+import threading
+from typing import Optional
+
+from app.core import PROCESS_POOL_WORKERS
+
+_pool: Optional[ProcessPoolExecutor] = None
+_lock = threading.Lock()
+
+
+def obtener_pool() -> ProcessPoolExecutor:
+    """Retorna el pool compartido (lo crea, o lo recrea si un worker murió)"""
+    global _pool
+    with _lock:
+        if _pool is not None and getattr(_pool, "_broken", False):
+            _pool.shutdown(wait=False, cancel_futures=True)
+            _pool = None
+        if _pool is None:
+            _pool = ProcessPoolExecutor(max_workers=PROCESS_POOL_WORKERS or None)
+        return _pool
+
+
+def cerrar_pool():
+    """Cierra el pool compartido (se vuelve a crear si se usa de nuevo)"""
+    global _pool
+    with _lock:
+        if _pool is not None:
+            _pool.shutdown(wait=True, cancel_futures=True)
+            _pool = None
@@ -0,0 +1,127 @@
+"""
+Portafolio de estrategias (multi-start) para la asignación.
+
+El resultado del greedy depende mucho del orden en que se agrupan las partes
+y del umbral de compatibilidad. Aquí se corre asignar_optimizado_final con
+varias combinaciones (orden x umbral, más órdenes aleatorios con semilla) en
+el pool de procesos y se queda el mejor plan.
+
+Criterio (determinista, no depende de qué proceso termine primero):
+1. Cumple reglas duras (tiempo y estaciones)
+2. Menos máquinas
+3. Menos herramientas únicas en total (suma por máquina)
+4. Orden de la estrategia en el portafolio
+"""
+from typing import Callable, Dict, List, Optional, Tuple
+
+from app.utils.algoritmo_asignacion import (
+    LIMITE_ESTACIONES,
+    asignar_optimizado_final,
+    calcular_horas_grupo,
+    contar_herramientas_unicas,
+)
+from app.utils.pool_procesos import obtener_pool
+
+ORDENES_PORTAFOLIO = ("uph", "horas_desc", "herramientas_desc")
+UMBRALES_PORTAFOLIO = (50, 60, 70, 80)
+
+
+def estrategias_portafolio(semilla: int = 0, inicios_aleatorios: int = 2) -> List[Dict]:
+    """Lista ordenada de estrategias: [{orden, umbral, semilla}]"""
+    estrategias = [
+        {"orden": orden, "umbral": umbral, "semilla": semilla}
+        for orden in ORDENES_PORTAFOLIO
+        for umbral in UMBRALES_PORTAFOLIO
+    ]
+    for k in range(inicios_aleatorios):
+        for umbral in UMBRALES_PORTAFOLIO:
+            estrategias.append({"orden": "aleatorio", "umbral": umbral, "semilla": semilla * 1000 + k})
+    return estrategias
+
+
+def correr_estrategia(partes: List[dict], horas_objetivo: float, estrategia: Dict) -> Tuple[Optional[Dict], Optional[str]]:
+    """
+    Corre el greedy con una estrategia (se ejecuta en el pool de procesos).
+    Retorna (asignaciones, None) o (None, mensaje de error).
+    """
+    try:
+        asignaciones = asignar_optimizado_final(
+            partes,
+            horas_objetivo,
+            estrategia["umbral"],
+            orden=estrategia["orden"],
+            semilla=estrategia["semilla"]
+        )
+        return asignaciones, None
+    except Exception as e:
+        return None, str(e)
+
+
+def evaluar_asignacion(
+    asignaciones: Dict[int, List[dict]],
+    horas_objetivo: float,
+    limite_estaciones: int = LIMITE_ESTACIONES
+) -> Tuple[bool, int, int]:
+    """(cumple reglas duras, máquinas, herramientas únicas totales)"""
+    herramientas = [contar_herramientas_unicas(p) for p in asignaciones.values()]
+    cumple = all(h <= limite_estaciones for h in herramientas) and all(
+        calcular_horas_grupo(p) <= horas_objetivo + 1e-9 for p in asignaciones.values()
+    )
+    return cumple, len(asignaciones), sum(herramientas)
+
+
+def resolver_portafolio(
+    partes: List[dict],
+    horas_objetivo: float = 96.0,
+    semilla: int = 0,
+    inicios_aleatorios: int = 2,
+    paralelo: bool = True,
+    al_mejorar: Optional[Callable[[int], None]] = None
+) -> Tuple[Dict[int, List[dict]], Dict]:
+    """
+    Corre todas las estrategias del portafolio y retorna el mejor plan.
+    al_mejorar se llama con las máquinas del mejor plan cada vez que una
+    estrategia (en orden del portafolio) lo mejora.
+
+    Returns:
+        Tupla (asignaciones, info) con la estrategia ganadora y el resultado
+        de cada estrategia evaluada.
+    """
+    estrategias = estrategias_portafolio(semilla, inicios_aleatorios)
+
+    if paralelo and len(estrategias) > 1:
+        pool = obtener_pool()
+        futuros = [pool.submit(correr_estrategia, partes, horas_objetivo, e) for e in estrategias]
+        pendientes = (f.result() for f in futuros)
+    else:
+        pendientes = (correr_estrategia(partes, horas_objetivo, e) for e in estrategias)
+
+    mejor = None
+    mejor_clave = None
+    detalle = []
+    resultados = []
+    for posicion, (estrategia, resultado) in enumerate(zip(estrategias, pendientes)):
+        resultados.append(resultado)
+        asignaciones, error = resultado
+        if asignaciones is None:
+            detalle.append({**estrategia, "error": error})
+            continue
+        cumple, maquinas, herramientas = evaluar_asignacion(asignaciones, horas_objetivo)
+        detalle.append({**estrategia, "maquinas": maquinas, "herramientas": herramientas, "cumple_reglas": cumple})
+        clave = (not cumple, maquinas, herramientas, posicion)
+        if mejor_clave is None or clave < mejor_clave:
+            mejor, mejor_clave = asignaciones, clave
+            if al_mejorar:
+                al_mejorar(maquinas)
+
+    if mejor is None:
+        # Ninguna estrategia encontró plan: mismo error que el greedy original
+        raise Exception(resultados[0][1])
+
+    info = {
+        "modo_solver": "portafolio",
+        "estrategia_ganadora": estrategias[mejor_clave[3]],
+        "estrategias_evaluadas": len(estrategias),
+        "estrategias": detalle
+    }
+    return mejor, info
@@ -0,0 +1,165 @@
+"""
+Pre-chequeo rápido de factibilidad (antes de correr el solver).
+
+Con solo los requerimientos y la capacidad de las máquinas se calcula una
+cota inferior de máquinas; si ya es mayor que las máquinas disponibles no
+tiene caso correr la asignación completa.
+
+- por_horas: horas totales / horas_objetivo
+- por_herramientas: herramientas distintas contra las estaciones de las
+  máquinas más grandes (+ tolerancia de overflow)
+- por_conflictos: clique de parts que no pueden compartir máquina
+  (cota_inferior_maquinas con el límite real de estaciones)
+- por part: sin máquina por grosor/mesa, o sus propias herramientas no
+  caben en ninguna máquina elegible
+- por tipo de máquina: cuántas máquinas de ese tipo harían falta solo por
+  estaciones (informativo, la flota puede ser mixta)
+
+Las cotas consideran la tolerancia de overflow de evaluar_factibilidad
+(+10 por máquina), así nunca se descarta un plan que sí sería factible.
+"""
+import math
+import time
+from typing import Dict, List
+
+from app.utils.algoritmo_asignacion import calcular_horas_parte
+from app.utils.asignacion_maquinas import (
+    agregar_herramientas,
+    demanda_estaciones,
+    herramientas_fuera,
+    parte_elegible,
+)
+from app.utils.solver_exacto import EPS, cota_inferior_maquinas
+
+TOLERANCIA_OVERFLOW = 10  # Herramientas fuera del estilo aceptadas por máquina
+
+
+def _maquinas_por_estaciones(herramientas: Dict[str, str], capacidad: Dict):
+    """Máquinas de este template necesarias solo por estaciones (None = imposible)"""
+    exactas, redondas, libres = demanda_estaciones(herramientas, capacidad)
+    necesarias = 1
+    por_tipo_necesarias: Dict[str, int] = {}
+    por_tipo_libres: Dict[str, int] = {}
+
+    for llave, cantidad in exactas.items():
+        if libres.get(llave, 0) == 0:
+            return None
+        necesarias = max(necesarias, math.ceil(cantidad / libres[llave]))
+        por_tipo_necesarias[llave[0]] = por_tipo_necesarias.get(llave[0], 0) + cantidad
+    for (tipo, _), cantidad in libres.items():
+        por_tipo_libres[tipo] = por_tipo_libres.get(tipo, 0) + cantidad
+    for tipo, cantidad in redondas.items():
+        por_tipo_necesarias[tipo] = por_tipo_necesarias.get(tipo, 0) + cantidad
+    for tipo, cantidad in por_tipo_necesarias.items():
+        if por_tipo_libres.get(tipo, 0) == 0:
+            return None
+        necesarias = max(necesarias, math.ceil(cantidad / por_tipo_libres[tipo]))
+
+    return max(necesarias, math.ceil(len(herramientas) / max(1, capacidad["total_estaciones"])))
+
+
+def prechequeo_factibilidad(
+    partes: List[dict],
+    capacidades: List[Dict],
+    horas_objetivo: float
+) -> Dict:
+    """
+    Cota inferior de máquinas y motivos de infactibilidad.
+
+    Args:
+        partes: formato de los algoritmos (preparar_partes)
+        capacidades: máquinas seleccionadas (capacidad_maquina)
+        horas_objetivo: horas disponibles por máquina
+
+    Returns:
+        dict con "factible_posible" (False = seguro no cabe), la cota y cada
+        criterio, los parts problemáticos y los motivos en texto.
+    """
+    inicio = time.perf_counter()
+    H = horas_objetivo
+    motivos = []
+
+    horas = [calcular_horas_parte(p) for p in partes]
+    horas_totales = sum(horas)
+
+    # Por part: máquinas elegibles y si sus herramientas caben en alguna
+    parts_sin_maquina, parts_sin_estaciones, parts_con_overflow, parts_multi_maquina = [], [], [], []
+    for parte, horas_parte in zip(partes, horas):
+        elegibles = [c for c in capacidades if parte_elegible(parte, c)]
+        if not elegibles:
+            parts_sin_maquina.append(parte.get('part_number'))
+            continue
+        herramientas = agregar_herramientas({}, parte)
+        fuera = min(herramientas_fuera(herramientas, c) for c in elegibles)
+        if fuera > TOLERANCIA_OVERFLOW:
+            parts_sin_estaciones.append(parte.get('part_number'))
+        elif fuera > 0:
+            parts_con_overflow.append(parte.get('part_number'))
+        if horas_parte > H + EPS:
+            parts_multi_maquina.append({
+                "part_number": parte.get('part_number'),
+                "horas": round(horas_parte, 2),
+                "maquinas_minimas": math.ceil(horas_parte / H - EPS)
+            })
+
+    if parts_sin_maquina:
+        motivos.append(f"Parts sin máquina compatible (grosor/mesa): {', '.join(parts_sin_maquina)}")
+    if parts_sin_estaciones:
+        motivos.append(
+            f"Parts cuyas herramientas no caben en ninguna máquina elegible: {', '.join(parts_sin_estaciones)}"
+        )
+
+    # Cotas globales
+    herramientas_union = {}
+    for parte in partes:
+        herramientas_union = agregar_herramientas(herramientas_union, parte)
+
+    capacidades_estaciones = sorted((c["total_estaciones"] + TOLERANCIA_OVERFLOW for c in capacidades), reverse=True)
+    por_herramientas, cubiertas = 0, 0
+    for estaciones in capacidades_estaciones:
+        if cubiertas >= len(herramientas_union):
+            break
+        cubiertas += estaciones
+        por_herramientas += 1
+    if cubiertas < len(herramientas_union):
+        por_herramientas = len(capacidades) + 1
+
+    limite = max(capacidades_estaciones, default=0)
+    cotas = cota_inferior_maquinas(partes, H, limite_estaciones=max(1, limite))
+    cota = max(cotas["por_horas"], por_herramientas, cotas["por_conflictos"]) if partes else 0
+
+    if cota > len(capacidades):
+        motivos.append(
+            f"Se necesitan al menos {cota} máquinas y solo hay {len(capacidades)} compatibles "
+            f"({horas_totales:.1f}h de trabajo, {len(capacidades) * H:.1f}h disponibles)"
+        )
+
+    # Informativo: máquinas necesarias si solo se usara cada tipo de máquina
+    por_tipo = {}
+    for capacidad in capacidades:
+        tipo = capacidad.get("tipo_maquina") or "N/A"
+        if tipo not in por_tipo:
+            por_tipo[tipo] = {
+                "maquinas": 0,
+                "minimas_por_estaciones": _maquinas_por_estaciones(herramientas_union, capacidad)
+            }
+        por_tipo[tipo]["maquinas"] += 1
+
+    return {
+        "factible_posible": not motivos,
+        "cota_inferior_maquinas": cota,
+        "por_horas": cotas["por_horas"],
+        "por_herramientas": por_herramientas,
+        "por_conflictos": cotas["por_conflictos"],
+        "maquinas_disponibles": len(capacidades),
+        "horas_totales": round(horas_totales, 2),
+        "horas_disponibles": round(len(capacidades) * H, 2),
+        "herramientas_unicas": len(herramientas_union),
+        "parts_sin_maquina": parts_sin_maquina,
+        "parts_sin_estaciones": parts_sin_estaciones,
+        "parts_con_overflow": parts_con_overflow,
+        "parts_multi_maquina": parts_multi_maquina,
+        "por_tipo_maquina": por_tipo,
+        "motivos": motivos,
+        "tiempo_seg": round(time.perf_counter() - inicio, 6)
+    }
@@ -0,0 +1,419 @@
+"""
+Modo exacto / anytime de la asignación de partes a máquinas.
+
+Branch-and-bound sobre la asignación (máquinas idénticas) con las mismas
+reglas duras del algoritmo greedy:
+- Tiempo por máquina ≤ horas_objetivo
+- Herramientas únicas por máquina ≤ LIMITE_ESTACIONES
+- Un part se divide en máximo 2 máquinas (o las mínimas indispensables si
+  por sí solo requiere más de 2 máquinas de tiempo)
+
+Parte de la solución greedy como incumbente y busca soluciones con menos
+máquinas hasta agotar el presupuesto de tiempo. Siempre retorna la mejor
+solución encontrada y la cota inferior probada del número de máquinas; si
+ambas coinciden, la solución cumple las reglas duras y la búsqueda no se
+cortó, la solución es óptima.
+
+La profundidad de la búsqueda se limita explícitamente (bajo el límite de
+recursión de Python): si se alcanza, la búsqueda se corta como por tiempo.
+
+El branch-and-bound es Python puro y retiene el GIL mientras corre: desde el
+servidor se usa resolver_exacto_en_pool, que lo corre en el pool de procesos.
+"""
+import math
+import multiprocessing
+import queue
+import sys
+import time
+import traceback
+from typing import Callable, Dict, List, Optional, Tuple
+
+from app.utils.algoritmo_asignacion import (
+    LIMITE_ESTACIONES,
+    MAX_MAQUINAS,
+    asignar_optimizado_final,
+    calcular_horas_parte,
+    construir_mascaras_herramientas,
+    internar_herramientas,
+)
+from app.utils.pool_procesos import obtener_pool
+
+EPS = 1e-9
+INTERVALO_PROGRESO_SEG = 0.1  # Cada cuánto se revisan los incumbentes del worker
+
+
+class _TiempoAgotado(Exception):
+    pass
+
+
+class _ProfundidadAgotada(Exception):
+    pass
+
+
+class _CotaAlcanzada(Exception):
+    pass
+
+
+MARGEN_PILA = 200  # Frames libres bajo el límite de recursión (al_mejorar, el intérprete)
+
+
+def _profundidad_disponible() -> int:
+    """Niveles de colocar() que caben bajo el límite de recursión desde aquí"""
+    return sys.getrecursionlimit() - sum(1 for _ in traceback.walk_stack(None)) - MARGEN_PILA
+
+
+def _maquinas_minimas_por_horas(horas: float, horas_objetivo: float) -> int:
+    """Máquinas de tiempo que ocupa una cantidad de horas (mínimo 1)"""
+    return max(1, math.ceil(horas / horas_objetivo - EPS))
+
+
+def max_piezas_parte(horas: float, horas_objetivo: float) -> int:
+    """Máquinas en las que se puede repartir un part (regla de divisiones)"""
+    return max(2, _maquinas_minimas_por_horas(horas, horas_objetivo))
+
+
+def cota_inferior_maquinas(
+    partes: List[dict],
+    horas_objetivo: float,
+    limite_estaciones: int = LIMITE_ESTACIONES,
+    mascaras: Optional[List[int]] = None
+) -> Dict:
+    """
+    Cota inferior del número de máquinas necesarias (ninguna asignación
+    que cumpla las reglas duras puede usar menos).
+
+    - por_horas: relajación lineal, horas totales / horas_objetivo
+    - por_herramientas: herramientas distintas / limite_estaciones
+    - por_conflictos: parts que no pueden compartir máquina porque juntos
+      exceden el límite de estaciones forman una clique; sus máquinas son
+      disjuntas, así que se suman las máquinas de tiempo de cada uno
+
+    Retorna dict con la cota ("cota") y el valor de cada criterio.
+    """
+    if not partes:
+        return {"cota": 0, "por_horas": 0, "por_herramientas": 0, "por_conflictos": 0}
+
+    if mascaras is None:
+        mascaras = construir_mascaras_herramientas(internar_herramientas(partes))
+
+    horas = [calcular_horas_parte(p) for p in partes]
+    por_horas = max(1, math.ceil(sum(horas) / horas_objetivo - EPS))
+
+    union = 0
+    for mascara in mascaras:
+        union |= mascara
+    por_herramientas = max(1, math.ceil(union.bit_count() / limite_estaciones))
+
+    # Clique greedy en el grafo de conflictos de estaciones
+    n = len(partes)
+    pesos = [_maquinas_minimas_por_horas(h, horas_objetivo) for h in horas]
+    conflictos = [
+        {j for j in range(n) if j != i and (mascaras[i] | mascaras[j]).bit_count() > limite_estaciones}
+        for i in range(n)
+    ]
+    orden = sorted(range(n), key=lambda i: (-pesos[i], -len(conflictos[i]), i))
+    clique = []
+    for i in orden:
+        if all(j in conflictos[i] for j in clique):
+            clique.append(i)
+    por_conflictos = sum(pesos[i] for i in clique)
+
+    return {
+        "cota": max(por_horas, por_herramientas, por_conflictos),
+        "por_horas": por_horas,
+        "por_herramientas": por_herramientas,
+        "por_conflictos": por_conflictos
+    }
+
+
+def _cumple_reglas(asignaciones: Dict[int, List[dict]], horas_objetivo: float, limite_estaciones: int) -> bool:
+    """Verifica tiempo y estaciones de una asignación (para usarla de incumbente)"""
+    for partes_maquina in asignaciones.values():
+        if sum(calcular_horas_parte(p) for p in partes_maquina) > horas_objetivo + EPS:
+            return False
+        herramientas = set()
+        for parte in partes_maquina:
+            for tool in parte.get('tools', []):
+                herramientas.add(tool['tool_number'] if isinstance(tool, dict) else tool)
+        if len(herramientas) > limite_estaciones:
+            return False
+    return True
+
+
+def asignaciones_desde_piezas(partes: List[dict], maquinas: List[List[Tuple[int, int]]]) -> Dict[int, List[dict]]:
+    """Convierte [[(índice de parte, cantidad)]] al formato de asignar_optimizado_final"""
+    piezas_por_parte = {}
+    for maquina in maquinas:
+        for idx, _ in maquina:
+            piezas_por_parte[idx] = piezas_por_parte.get(idx, 0) + 1
+
+    asignaciones = {}
+    for num, maquina in enumerate(maquinas, start=1):
+        asignaciones[num] = []
+        for idx, cantidad in maquina:
+            parte = partes[idx].copy()
+            if piezas_por_parte[idx] > 1:
+                parte['_cantidad_original'] = parte.get('quantity', 0)
+                parte['quantity'] = cantidad
+                parte['_es_division'] = True
+            asignaciones[num].append(parte)
+    return asignaciones
+
+
+def resolver_exacto(
+    partes: List[dict],
+    horas_objetivo: float = 96.0,
+    umbral_compatibilidad: int = 70,
+    tiempo_limite_seg: float = 10.0,
+    limite_estaciones: int = LIMITE_ESTACIONES,
+    al_mejorar: Optional[Callable[[int], None]] = None
+) -> Tuple[Dict[int, List[dict]], Dict]:
+    """
+    Asignación con branch-and-bound anytime.
+
+    Args:
+        partes: mismo formato que asignar_optimizado_final
+        horas_objetivo: horas disponibles por máquina (LÍMITE ABSOLUTO)
+        umbral_compatibilidad: umbral del greedy usado como solución inicial
+        tiempo_limite_seg: presupuesto de tiempo de la búsqueda
+        al_mejorar: se llama con el número de máquinas de cada incumbente
+            nuevo (el greedy y cada mejora del branch-and-bound)
+
+    Returns:
+        Tupla (asignaciones, info) donde asignaciones tiene el formato de
+        asignar_optimizado_final e info incluye cota_inferior_maquinas,
+        optimo_probado, cumple_reglas, busqueda_completa (False si se cortó
+        por tiempo o por profundidad, motivo_corte), maquinas_greedy,
+        nodos_explorados y tiempo_solver_seg.
+    """
+    inicio = time.perf_counter()
+    if not partes:
+        return {}, {
+            "modo_solver": "exacto",
+            "cota_inferior_maquinas": 0,
+            "optimo_probado": True,
+            "cumple_reglas": True,
+            "busqueda_completa": True,
+            "motivo_corte": None,
+            "maquinas_greedy": 0,
+            "nodos_explorados": 0,
+            "tiempo_solver_seg": 0.0
+        }
+
+    mascaras = construir_mascaras_herramientas(internar_herramientas(partes))
+    cota = cota_inferior_maquinas(partes, horas_objetivo, limite_estaciones, mascaras)["cota"]
+
+    # 1. Incumbente: solución greedy (si cumple las reglas duras)
+    try:
+        greedy = asignar_optimizado_final(partes, horas_objetivo, umbral_compatibilidad)
+    except Exception:
+        greedy = None
+
+    mejor = None
+    mejor_num = MAX_MAQUINAS + 1
+    if greedy is not None and _cumple_reglas(greedy, horas_objetivo, limite_estaciones):
+        mejor = greedy
+        mejor_num = len(greedy)
+        if al_mejorar:
+            al_mejorar(mejor_num)
+
+    # 2. Branch-and-bound (si el greedy no es ya óptimo y todos los parts
+    #    caben en una máquina por estaciones)
+    horas = [calcular_horas_parte(p) for p in partes]
+    factible_estaciones = all(m.bit_count() <= limite_estaciones for m in mascaras)
+    nodos = 0
+    mejor_bnb = None
+    # Completa = no hizo falta buscar, se agotó el árbol o se llegó a la cota
+    busqueda_completa = mejor_num <= cota
+    motivo_corte = None
+
+    if mejor_num > cota and factible_estaciones:
+        busqueda_completa = True
+        # Orden: más horas primero, luego más herramientas
+        orden = sorted(range(len(partes)), key=lambda i: (-horas[i], -mascaras[i].bit_count(), i))
+        horas_sufijo = [0.0] * (len(orden) + 1)
+        for k in range(len(orden) - 1, -1, -1):
+            horas_sufijo[k] = horas_sufijo[k + 1] + horas[orden[k]]
+
+        maq_horas: List[float] = []
+        maq_mascara: List[int] = []
+        maq_partes: List[List[Tuple[int, int]]] = []
+        deadline = inicio + tiempo_limite_seg
+        H = horas_objetivo
+        profundidad_maxima = _profundidad_disponible()
+
+        def colocar(k: int, restante: int, piezas: int, profundidad: int = 0):
+            nonlocal nodos, mejor_num, mejor_bnb
+            nodos += 1
+            if nodos % 256 == 0 and time.perf_counter() > deadline:
+                raise _TiempoAgotado()
+            if profundidad >= profundidad_maxima:
+                raise _ProfundidadAgotada()
+
+            if k == len(orden):
+                if len(maq_horas) < mejor_num:
+                    mejor_num = len(maq_horas)
+                    mejor_bnb = [list(m) for m in maq_partes]
+                    if al_mejorar:
+                        al_mejorar(mejor_num)
+                    if mejor_num <= cota:
+                        raise _CotaAlcanzada()  # Nada puede usar menos máquinas
+                return
+
+            idx = orden[k]
+            parte = partes[idx]
+            uph = parte.get('uph', 1)
+            horas_restante = restante / uph if uph > 0 else 0.0
+
+            # Poda: máquinas abiertas + las que faltan por horas
+            libre = sum(H - h for h in maq_horas)
+            faltan = horas_restante + horas_sufijo[k + 1] - libre
+            extra = math.ceil(faltan / H - EPS) if faltan > EPS else 0
+            if len(maq_horas) + extra >= mejor_num:
+                return
+
+            mascara = mascaras[idx]
+
+            # A. Colocar el resto completo en una máquina abierta (best-fit)
+            vistos = set()
+            candidatas = sorted(range(len(maq_horas)), key=lambda m: (-maq_horas[m], m))
+            for m in candidatas:
+                if maq_horas[m] + horas_restante > H + EPS:
+                    continue
+                nueva_mascara = maq_mascara[m] | mascara
+                if nueva_mascara.bit_count() > limite_estaciones:
+                    continue
+                estado = (round(maq_horas[m], 9), maq_mascara[m])
+                if estado in vistos:
+                    continue  # Máquina equivalente ya probada
+                vistos.add(estado)
+
+                anterior = (maq_horas[m], maq_mascara[m])
+                maq_horas[m] += horas_restante
+                maq_mascara[m] = nueva_mascara
+                maq_partes[m].append((idx, restante))
+                colocar(k + 1, _cantidad(k + 1), 0, profundidad + 1)
+                maq_partes[m].pop()
+                maq_horas[m], maq_mascara[m] = anterior
+
+            # B. Colocar el resto completo en una máquina nueva
+            if len(maq_horas) + 1 < mejor_num and horas_restante <= H + EPS:
+                maq_horas.append(horas_restante)
+                maq_mascara.append(mascara)
+                maq_partes.append([(idx, restante)])
+                colocar(k + 1, _cantidad(k + 1), 0, profundidad + 1)
+                maq_horas.pop()
+                maq_mascara.pop()
+                maq_partes.pop()
+
+            # C. Dividir: llenar el tiempo libre de una máquina y seguir con el resto
+            if uph <= 0 or piezas + 1 >= max_piezas_parte(horas[idx], H):
+                return
+            piezas_disponibles = max_piezas_parte(horas[idx], H) - (piezas + 1)
+
+            vistos = set()
+            for m in candidatas:
+                if any(i == idx for i, _ in maq_partes[m]):
+                    continue
+                cantidad = int((H - maq_horas[m]) * uph)
+                if cantidad <= 0 or cantidad >= restante:
+                    continue
+                if (restante - cantidad) / uph > piezas_disponibles * H + EPS:
+                    continue
+                nueva_mascara = maq_mascara[m] | mascara
+                if nueva_mascara.bit_count() > limite_estaciones:
+                    continue
+                estado = (round(maq_horas[m], 9), maq_mascara[m])
+                if estado in vistos:
+                    continue
+                vistos.add(estado)
+
+                anterior = (maq_horas[m], maq_mascara[m])
+                maq_horas[m] += cantidad / uph
+                maq_mascara[m] = nueva_mascara
+                maq_partes[m].append((idx, cantidad))
+                colocar(k, restante - cantidad, piezas + 1, profundidad + 1)
+                maq_partes[m].pop()
+                maq_horas[m], maq_mascara[m] = anterior
+
+            # Máquina nueva llena con una parte del part (si no cabe completo)
+            if horas_restante > H + EPS and len(maq_horas) + 1 < mejor_num:
+                cantidad = int(H * uph)
+                if 0 < cantidad < restante and (restante - cantidad) / uph <= piezas_disponibles * H + EPS:
+                    maq_horas.append(cantidad / uph)
+                    maq_mascara.append(mascara)
+                    maq_partes.append([(idx, cantidad)])
+                    colocar(k, restante - cantidad, piezas + 1, profundidad + 1)
+                    maq_horas.pop()
+                    maq_mascara.pop()
+                    maq_partes.pop()
+
+        def _cantidad(k: int) -> int:
+            return partes[orden[k]].get('quantity', 0) if k < len(orden) else 0
+
+        try:
+            colocar(0, _cantidad(0), 0)
+        except _CotaAlcanzada:
+            pass
+        except (_TiempoAgotado, _ProfundidadAgotada) as corte:
+            # Anytime: se conserva la mejor solución encontrada hasta aquí
+            busqueda_completa = False
+            motivo_corte = "tiempo" if isinstance(corte, _TiempoAgotado) else "profundidad"
+
+    if mejor_bnb is not None:
+        mejor = asignaciones_desde_piezas(partes, mejor_bnb)
+    elif mejor is None:
+        if greedy is None:
+            raise Exception(f"Se excedió el límite de {MAX_MAQUINAS} máquinas. Revisa configuración.")
+        # El greedy no cumple estaciones y no se encontró nada mejor
+        mejor = greedy
+
+    # Óptimo probado solo si el plan cumple las reglas duras (no el greedy de
+    # respaldo que se pasa de estaciones) y la búsqueda no se cortó
+    cumple_reglas = mejor_bnb is not None or _cumple_reglas(mejor, horas_objetivo, limite_estaciones)
+    info = {
+        "modo_solver": "exacto",
+        "cota_inferior_maquinas": cota,
+        "optimo_probado": cumple_reglas and busqueda_completa and len(mejor) == cota,
+        "cumple_reglas": cumple_reglas,
+        "busqueda_completa": busqueda_completa,
+        "motivo_corte": motivo_corte,
+        "maquinas_greedy": len(greedy) if greedy is not None else None,
+        "nodos_explorados": nodos,
+        "tiempo_solver_seg": round(time.perf_counter() - inicio, 3)
+    }
+    return mejor, info
+
+
+def _resolver_exacto_con_cola(cola, *args) -> Tuple[Dict[int, List[dict]], Dict]:
+    """Corre en un worker del pool: cada incumbente nuevo se manda por la cola"""
+    return resolver_exacto(*args, al_mejorar=cola.put)
+
+
+def resolver_exacto_en_pool(
+    partes: List[dict],
+    horas_objetivo: float = 96.0,
+    umbral_compatibilidad: int = 70,
+    tiempo_limite_seg: float = 10.0,
+    limite_estaciones: int = LIMITE_ESTACIONES,
+    al_mejorar: Optional[Callable[[int], None]] = None
+) -> Tuple[Dict[int, List[dict]], Dict]:
+    """
+    resolver_exacto en el pool de procesos compartido, para no retener el GIL
+    del servidor durante la búsqueda. Mismo resultado; al_mejorar se llama
+    desde el hilo que espera, con los incumbentes que reporta el worker.
+    """
+    args = (partes, horas_objetivo, umbral_compatibilidad, tiempo_limite_seg, limite_estaciones)
+    if al_mejorar is None:
+        return obtener_pool().submit(resolver_exacto, *args).result()
+
+    with multiprocessing.Manager() as manager:
+        cola = manager.Queue()
+        futuro = obtener_pool().submit(_resolver_exacto_con_cola, cola, *args)
+        # Cuando el futuro termina, todo lo que el worker puso ya está en la cola
+        while not futuro.done() or not cola.empty():
+            try:
+                al_mejorar(cola.get(timeout=INTERVALO_PROGRESO_SEG))
+            except queue.Empty:
+                pass
+        return futuro.result()
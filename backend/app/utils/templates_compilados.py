@@ -0,0 +1,142 @@
+"""
+Caché en proceso de templates de máquina "compilados".
+
+aplicar_reglas_duras, procesar_herramientas_part, generar_estilo y
+capacidad_maquina leían machine.template.estaciones_config (a veces con
+json.loads) y rearmaban la lista de estaciones dañadas en cada llamada: por
+máquina y, en procesar_herramientas_part, por cada part.
+
+Aquí cada template se compila una vez:
+- estación → (tipo, guía, autoindex) con los defaults de procesar_herramientas_part
+- estaciones por (tipo, tiene_guia) en el orden del template (las listas de
+  libres de generar_estilo)
+y cada máquina guarda solo su máscara de estaciones dañadas (bits sobre la
+posición de la estación en el template) y lo que de ella se deriva.
+
+Llaves: template por (id, hash de la config), así un template editado (aun
+en sitio, sobre el mismo dict) se vuelve a compilar solo; el compilado
+guarda su propia copia de la config. Máquina por id, validando que sus
+estaciones dañadas sean las mismas. PUT /machine/{id} invalida la máquina
+(machine_service).
+"""
+import copy
+import hashlib
+import json
+import threading
+from typing import Dict, List, Optional, Tuple
+
+_lock = threading.Lock()
+_templates: Dict[Tuple, "TemplateCompilado"] = {}
+_maquinas: Dict[int, "MaquinaCompilada"] = {}
+
+
+class TemplateCompilado:
+    """Índices de un template que no dependen de la máquina"""
+
+    def __init__(self, config: Dict, hash_config: str):
+        self.config = config
+        self.hash = hash_config
+        self.orden = {est: i for i, est in enumerate(config)}
+        # Defaults de procesar_herramientas_part (estación sin config = tipo A, sin guía)
+        self.estaciones: Dict[str, Tuple] = {
+            est: (c.get("tipo", "A"), c.get("tiene_guia", False), c.get("es_autoindex", False))
+            for est, c in config.items()
+        }
+        # Libres por (tipo, tiene_guia) tal como los compara generar_estilo
+        self.por_tipo: Dict[Tuple, List[str]] = {}
+        for est, c in config.items():
+            self.por_tipo.setdefault((c.get("tipo"), c.get("tiene_guia")), []).append(est)
+
+    def info_estacion(self, estacion: str) -> Tuple:
+        """(tipo, requiere_guia, es_autoindex) de la estación original de una herramienta"""
+        return self.estaciones.get(estacion, ("A", False, False))
+
+
+class MaquinaCompilada:
+    """Template compilado + estaciones dañadas de una máquina"""
+
+    def __init__(self, template: TemplateCompilado, estaciones_dañadas):
+        self.template = template
+        self.dañadas_origen = tuple(estaciones_dañadas or ())
+        self.dañadas = {str(e) for e in self.dañadas_origen}
+        self.mascara_dañadas = 0
+        for est in self.dañadas:
+            if est in template.orden:
+                self.mascara_dañadas |= 1 << template.orden[est]
+        self.disponibles = {
+            est: c for est, c in template.config.items()
+            if not (self.mascara_dañadas >> template.orden[est]) & 1
+        }
+        self.por_tipo = {
+            llave: [est for est in estaciones if not (self.mascara_dañadas >> template.orden[est]) & 1]
+            for llave, estaciones in template.por_tipo.items()
+        }
+
+    @property
+    def total_estaciones(self) -> int:
+        return len(self.disponibles)
+
+
+def _leer_config(template) -> Dict:
+    config = getattr(template, "estaciones_config", None) if template is not None else None
+    if isinstance(config, str):
+        config = json.loads(config)
+    return config or {}
+
+
+def hash_config(config: Dict) -> str:
+    """Hash estable de estaciones_config (mismo contenido = mismo hash)"""
+    return hashlib.sha256(json.dumps(config, sort_keys=True, default=str).encode()).hexdigest()
+
+
+def compilar_template(template) -> TemplateCompilado:
+    """Template compilado (del caché si la config no cambió)"""
+    config = _leer_config(template)
+    template_id = getattr(template, "id", None)
+
+    llave = (template_id, hash_config(config))
+    with _lock:
+        compilado = _templates.get(llave)
+    if compilado is None:
+        # Copia propia: el dict de la sesión puede editarse en sitio
+        compilado = TemplateCompilado(copy.deepcopy(config), llave[1])
+    with _lock:
+        # Sin versiones viejas del mismo template (se editó la config)
+        for vieja in [k for k in _templates if k[0] == template_id and k != llave]:
+            del _templates[vieja]
+        _templates.setdefault(llave, compilado)
+        return _templates[llave]
+
+
+def compilar_maquina(machine) -> MaquinaCompilada:
+    """Máquina compilada (del caché si ni el template ni sus dañadas cambiaron)"""
+    template = compilar_template(machine.template)
+    dañadas = tuple(machine.estaciones_dañadas or ())
+    machine_id = getattr(machine, "id", None)
+
+    with _lock:
+        compilada = _maquinas.get(machine_id) if machine_id is not None else None
+    if compilada is not None and compilada.template is template and compilada.dañadas_origen == dañadas:
+        return compilada
+
+    compilada = MaquinaCompilada(template, dañadas)
+    if machine_id is not None:
+        with _lock:
+            _maquinas[machine_id] = compilada
+    return compilada
+
+
+def invalidar_maquina(machine_id: Optional[int] = None):
+    """Quita una máquina del caché (None = todas)"""
+    with _lock:
+        if machine_id is None:
+            _maquinas.clear()
+        else:
+            _maquinas.pop(machine_id, None)
+
+
+def limpiar_cache():
+    """Vacía templates y máquinas compilados"""
+    with _lock:
+        _templates.clear()
+        _maquinas.clear()
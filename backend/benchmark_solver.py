@@ -0,0 +1,368 @@
+"""
+Benchmark del solver con paquetes sintéticos (BD SQLite en memoria).
+
+Mide tiempo, memoria pico (tracemalloc) y calidad (máquinas usadas,
+herramientas fuera del estilo) de:
+- asignar_optimizado_final
+- generar_estilo (sobre los grupos del greedy)
+- crear_distribucion_optimizada (uno por modo de solver)
+
+Los paquetes salen de un generador con semilla: misma semilla = mismo
+paquete, así dos versiones del código se comparan con las mismas entradas.
+
+No lee ni escribe clasificador.db: importar app.database.db no crea ni
+migra tablas (eso es inicializar_bd) y cada escenario usa su propio engine.
+
+    python benchmark_solver.py --salida bench.json
+    python benchmark_solver.py --escenarios grande --modos greedy maquinas
+    python benchmark_solver.py --comparar bench.json   # exit 1 si hay regresiones
+"""
+import argparse
+import json
+import platform
+import random
+import statistics
+import subprocess
+import sys
+import time
+import tracemalloc
+from datetime import datetime
+from typing import Dict, List, Optional, Tuple
+
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import StaticPool
+
+from app.database.db import Base
+from app.database.templates_data import TEMPLATE_4I
+from app.models.machine_model import Machine
+from app.models.machine_template_model import MachineTemplate
+from app.models.package_model import Package
+from app.models.package_part_model import PackagePart
+from app.services.distribucion_service import (
+    calcular_requerimientos,
+    crear_distribucion_optimizada,
+    generar_estilo,
+    preparar_partes,
+    procesar_herramientas_part,
+)
+from app.services.machine_service import crear_machine
+from app.services.machine_template_service import inicializar_templates
+from app.utils.algoritmo_asignacion import asignar_optimizado_final
+
+# Escenarios predefinidos: parámetros del generador + demanda y horas
+ESCENARIOS = {
+    "chico": {"num_parts": 15, "vocabulario": 60, "demanda": 50, "horas_objetivo": 24},
+    "mediano": {"num_parts": 60, "vocabulario": 150, "demanda": 100, "horas_objetivo": 96},
+    "grande": {"num_parts": 150, "vocabulario": 60, "demanda": 100, "horas_objetivo": 96},
+}
+
+# Flota de la BD en memoria: (tipo de máquina, estaciones dañadas)
+FLOTA = [("4I", []), ("2I", []), ("45STA", []), ("4I", [103]), ("2I", [102, 203]), ("45STA", [107])] * 3
+
+# Umbrales de comparar_resultados
+TOLERANCIA_TIEMPO = 1.5  # x veces el tiempo anterior
+TOLERANCIA_MEMORIA = 1.5  # x veces la memoria pico anterior
+TIEMPO_MINIMO_SEG = 0.05  # diferencias menores se consideran ruido
+
+
+def generar_paquete_sintetico(
+    num_parts: int = 40,
+    vocabulario: int = 150,
+    herramientas_por_part: Tuple[int, int] = (4, 14),
+    grosores: Tuple[float, ...] = (0.06, 0.08, 0.104, 0.12),
+    laminas: Tuple[Tuple[int, int], ...] = ((96, 48), (120, 60), (84, 48)),
+    uph: Tuple[float, float] = (5.0, 80.0),
+    cantidad: Tuple[int, int] = (1, 4),
+    semilla: int = 0
+) -> List[Dict]:
+    """
+    Parts sintéticos con el formato de parsed_data del parser.
+
+    Cada herramienta del vocabulario tiene una estación "de casa" del template
+    4I (como en los setups reales, donde un TN suele ir en la misma estación)
+    y cerca de la mitad son redondos (TN que inicia con "1").
+
+    Returns:
+        [{"part_filename", "cantidad", "parsed_data"}]
+    """
+    r = random.Random(semilla)
+    estaciones = sorted(TEMPLATE_4I["estaciones_config"])
+    herramientas = {}
+    while len(herramientas) < vocabulario:
+        if r.random() < 0.5:
+            tool_number = str(10000 + r.randint(0, 999))
+        else:
+            tool_number = f"{r.randint(2, 9)}{r.randint(0, 9999):04d}.{r.randint(1, 500)}"
+        herramientas.setdefault(tool_number, r.choice(estaciones))
+    catalogo = list(herramientas.items())
+
+    parts = []
+    for i in range(num_parts):
+        # Un TN por estación dentro del part
+        objetivo = r.randint(*herramientas_por_part)
+        tools_data, usadas = [], set()
+        for tool_number, estacion in r.sample(catalogo, len(catalogo)):
+            if estacion in usadas:
+                continue
+            usadas.add(estacion)
+            tools_data.append({"station": estacion, "tool_number": tool_number, "angle": r.choice([0, 0, 0, 90])})
+            if len(tools_data) == objetivo:
+                break
+
+        part_full = f"TYEH-{2000000 + i}_00-SW"
+        parts.append({
+            "part_filename": part_full,
+            "cantidad": r.randint(*cantidad),
+            "parsed_data": {
+                "part_number": {"full": part_full, "prefix": "TYEH", "number": str(2000000 + i), "version": "00", "nivel": "SW"},
+                "thickness": r.choice(grosores),
+                "sheet_size": list(r.choice(laminas)),
+                "stations": [t["station"] for t in tools_data],
+                "tool_numbers": [t["tool_number"] for t in tools_data],
+                "angles": [t["angle"] for t in tools_data],
+                "tools_data": tools_data,
+                "sym": len(tools_data),
+                "uph": round(r.uniform(*uph), 2),
+            }
+        })
+    return parts
+
+
+def crear_bd_memoria(parts: List[Dict], flota: List[Tuple[str, List[int]]] = FLOTA):
+    """
+    BD SQLite en memoria con los templates, la flota y un package con los parts.
+
+    Returns:
+        Tupla (sesion, package_id, machine_ids)
+    """
+    engine = create_engine("sqlite://", connect_args={"check_same_thread": False}, poolclass=StaticPool)
+    Base.metadata.create_all(bind=engine)
+    db = sessionmaker(autocommit=False, autoflush=False, bind=engine)()
+
+    inicializar_templates(db)
+    templates = {t.tipo_maquina: t.id for t in db.query(MachineTemplate).all()}
+
+    machine_ids = []
+    for i, (tipo, dañadas) in enumerate(flota, start=1):
+        machine = crear_machine(
+            db, templates[tipo], modelo="EMK3510", nombre=f"B-{i:03d}",
+            mesa_x=120, mesa_y=60, thickness_min=0.03, thickness_max=0.13,
+            estaciones_dañadas=dañadas
+        )
+        machine_ids.append(machine.id)
+
+    package = Package(nombre="benchmark", descripcion="Paquete sintético del benchmark")
+    package.parts = [PackagePart(**part) for part in parts]
+    db.add(package)
+    db.commit()
+    return db, package.id, machine_ids
+
+
+def medir(funcion, repeticiones: int = 3, memoria: bool = True):
+    """
+    Corre funcion() `repeticiones` veces (tiempo mínimo y mediana) y una vez
+    más con tracemalloc para la memoria pico (tracemalloc hace lento el
+    código, por eso no se mezcla con el tiempo).
+
+    Returns:
+        Tupla (resultado de la última corrida, métricas)
+    """
+    tiempos = []
+    for _ in range(repeticiones):
+        inicio = time.perf_counter()
+        resultado = funcion()
+        tiempos.append(time.perf_counter() - inicio)
+
+    metricas = {
+        "tiempo_seg": round(min(tiempos), 6),
+        "tiempo_mediana_seg": round(statistics.median(tiempos), 6),
+    }
+    if memoria:
+        tracemalloc.start()
+        try:
+            funcion()
+            metricas["memoria_pico_kb"] = round(tracemalloc.get_traced_memory()[1] / 1024, 1)
+        finally:
+            tracemalloc.stop()
+    return resultado, metricas
+
+
+def _etapa(funcion, resumir, repeticiones: int, memoria: bool) -> Dict:
+    """Mide una etapa; un error se reporta en vez de cortar el benchmark"""
+    try:
+        resultado, metricas = medir(funcion, repeticiones, memoria)
+    except Exception as e:
+        return {"error": str(e)}
+    return {**metricas, **resumir(resultado)}
+
+
+def correr_escenario(
+    nombre: str,
+    parametros: Dict,
+    modos: List[str],
+    repeticiones: int = 3,
+    memoria: bool = True,
+    semilla: int = 0
+) -> Dict:
+    """Mide las tres etapas en un escenario"""
+    generador = {k: v for k, v in parametros.items() if k not in ("demanda", "horas_objetivo")}
+    demanda, horas_objetivo = parametros["demanda"], parametros["horas_objetivo"]
+    db, package_id, machine_ids = crear_bd_memoria(generar_paquete_sintetico(semilla=semilla, **generador))
+    try:
+        package = db.query(Package).filter(Package.id == package_id).first()
+        requerimientos = calcular_requerimientos(package, demanda)
+        partes = preparar_partes(requerimientos)
+        etapas = {}
+
+        # 1. Núcleo de asignación (máquinas virtuales)
+        etapas["asignar_optimizado_final"] = _etapa(
+            lambda: asignar_optimizado_final(partes, horas_objetivo, 70),
+            lambda asignaciones: {"maquinas": len(asignaciones)},
+            repeticiones, memoria
+        )
+
+        # 2. Estilos: cada grupo del greedy en una máquina de la flota
+        try:
+            grupos = list(asignar_optimizado_final(partes, horas_objetivo, 70).values())
+        except Exception:
+            grupos = []
+        machines = db.query(Machine).filter(Machine.id.in_(machine_ids)).order_by(Machine.id).all()
+        unificadas = []
+        for i, grupo in enumerate(grupos):
+            machine = machines[i % len(machines)]
+            machine_data = {"herramientas_unificadas": {}}
+            for parte in grupo:
+                procesar_herramientas_part(requerimientos[parte['part_id']], machine_data, machine, parte['part_number'])
+            unificadas.append((machine_data["herramientas_unificadas"], machine))
+
+        def generar_estilos():
+            # generar_estilo anota station_final en las herramientas: copia por corrida
+            return [
+                generar_estilo({tn: dict(h) for tn, h in herramientas.items()}, machine)
+                for herramientas, machine in unificadas
+            ]
+
+        etapas["generar_estilo"] = _etapa(
+            generar_estilos,
+            lambda estilos: {
+                "maquinas": len(estilos),
+                "herramientas_fuera_estilo": sum(len(overflow) for _, overflow in estilos)
+            },
+            repeticiones, memoria
+        )
+
+        # 3. Distribución completa por modo de solver (incluye BD y estilos)
+        for modo in modos:
+            etapas[f"crear_distribucion_optimizada[{modo}]"] = _etapa(
+                lambda: crear_distribucion_optimizada(
+                    db, package_id, demanda, horas_objetivo, machine_ids,
+                    modo_solver=modo, semilla=semilla, usar_cache=False
+                ),
+                lambda d: {
+                    "maquinas": d.resumen.get("total_maquinas_usadas", len(d.asignaciones)),
+                    "es_factible": d.es_factible,
+                    "herramientas_fuera_estilo": sum(len(a.estaciones_fuera_estilo) for a in d.asignaciones),
+                    "eficiencia_promedio": d.resumen.get("eficiencia_promedio"),
+                },
+                repeticiones, memoria
+            )
+    finally:
+        db.close()
+
+    return {
+        "nombre": nombre,
+        "parametros": {**parametros, "semilla": semilla},
+        "parts": len(partes),
+        "horas_totales": round(sum(p['quantity'] / p['uph'] for p in partes if p['uph'] > 0), 2),
+        "etapas": etapas,
+    }
+
+
+def comparar_resultados(actual: Dict, anterior: Dict) -> List[str]:
+    """
+    Regresiones de `actual` contra un JSON anterior del benchmark:
+    más máquinas o herramientas fuera del estilo, una etapa que antes
+    corría y ahora falla, o tiempo/memoria por encima de la tolerancia.
+    """
+    regresiones = []
+    previos = {e["nombre"]: e for e in anterior.get("escenarios", [])}
+    for escenario in actual["escenarios"]:
+        previo = previos.get(escenario["nombre"])
+        if previo is None or previo["parametros"] != escenario["parametros"]:
+            continue
+        for etapa, nuevo in escenario["etapas"].items():
+            viejo = previo["etapas"].get(etapa)
+            if viejo is None or "error" in viejo:
+                continue
+            clave = f"{escenario['nombre']}/{etapa}"
+            if "error" in nuevo:
+                regresiones.append(f"{clave}: antes corría, ahora falla ({nuevo['error']})")
+                continue
+            for metrica in ("maquinas", "herramientas_fuera_estilo"):
+                if metrica in viejo and nuevo.get(metrica, 0) > viejo[metrica]:
+                    regresiones.append(f"{clave}: {metrica} {viejo[metrica]} -> {nuevo[metrica]}")
+            if (nuevo["tiempo_seg"] > viejo["tiempo_seg"] * TOLERANCIA_TIEMPO
+                    and nuevo["tiempo_seg"] - viejo["tiempo_seg"] > TIEMPO_MINIMO_SEG):
+                regresiones.append(f"{clave}: tiempo {viejo['tiempo_seg']:.3f}s -> {nuevo['tiempo_seg']:.3f}s")
+            if ("memoria_pico_kb" in viejo and "memoria_pico_kb" in nuevo
+                    and nuevo["memoria_pico_kb"] > viejo["memoria_pico_kb"] * TOLERANCIA_MEMORIA):
+                regresiones.append(
+                    f"{clave}: memoria pico {viejo['memoria_pico_kb']:.0f}KB -> {nuevo['memoria_pico_kb']:.0f}KB"
+                )
+    return regresiones
+
+
+def _version_codigo() -> Optional[str]:
+    """Commit actual (si se corre dentro del repo git)"""
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except Exception:
+        return None
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Benchmark del solver con paquetes sintéticos")
+    parser.add_argument("--escenarios", nargs="+", choices=list(ESCENARIOS), default=list(ESCENARIOS))
+    parser.add_argument("--modos", nargs="+", choices=["greedy", "exacto", "portafolio", "maquinas"],
+                        default=["greedy", "maquinas"])
+    parser.add_argument("--repeticiones", type=int, default=3)
+    parser.add_argument("--semilla", type=int, default=0)
+    parser.add_argument("--sin-memoria", action="store_true", help="No medir memoria pico (más rápido)")
+    parser.add_argument("--salida", help="Archivo JSON de resultados (default: stdout)")
+    parser.add_argument("--comparar", help="JSON de una corrida anterior: reporta regresiones")
+    args = parser.parse_args(argv)
+
+    resultado = {
+        "fecha": datetime.now().isoformat(timespec="seconds"),
+        "version": _version_codigo(),
+        "python": platform.python_version(),
+        "escenarios": [
+            correr_escenario(
+                nombre, ESCENARIOS[nombre], args.modos,
+                repeticiones=args.repeticiones, memoria=not args.sin_memoria, semilla=args.semilla
+            )
+            for nombre in args.escenarios
+        ],
+    }
+
+    if args.comparar:
+        with open(args.comparar, encoding="utf-8") as f:
+            resultado["regresiones"] = comparar_resultados(resultado, json.load(f))
+
+    texto = json.dumps(resultado, indent=2, ensure_ascii=False)
+    if args.salida:
+        with open(args.salida, "w", encoding="utf-8") as f:
+            f.write(texto)
+    else:
+        print(texto)
+
+    for regresion in resultado.get("regresiones", []):
+        print(f"REGRESIÓN: {regresion}", file=sys.stderr)
+    return 1 if resultado.get("regresiones") else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -3,13 +3,13 @@ Script de prueba para el algoritmo de asignación optimizada.
 """
 import sys
 from sqlalchemy.orm import Session
-from app.database.db import SessionLocal, engine, Base
+from app.database.db import SessionLocal, inicializar_bd
 from app.models.package_model import Package
 from app.models.package_part_model import PackagePart
 from app.utils.algoritmo_asignacion import asignar_optimizado_final
 
-# Crear todas las tablas
-Base.metadata.create_all(bind=engine)
+# Crear todas las tablas (y columnas nuevas): esta prueba usa clasificador.db
+inicializar_bd()
 
 def test_algoritmo():
     db = SessionLocal()
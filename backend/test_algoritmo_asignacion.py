@@ -0,0 +1,511 @@
+"""
+Pruebas del algoritmo de asignación con partes sintéticas (sin BD).
+
+    python -m pytest test_algoritmo_asignacion.py
+"""
+import copy
+import random
+from concurrent.futures import ThreadPoolExecutor
+
+from app.utils.algoritmo_asignacion import (
+    GrupoIncremental,
+    asignar_optimizado_final,
+    calcular_horas_grupo,
+    calcular_score_compatibilidad,
+    construir_mascaras_herramientas,
+    construir_matriz_compatibilidad,
+    contar_herramientas_unicas,
+    encontrar_compatibilidad_promedio_grupo,
+    identificar_parte_menos_compatible,
+    internar_herramientas,
+)
+from app.utils.busqueda_local import mejorar_asignacion
+from app.utils.portafolio import resolver_portafolio
+from app.utils.solver_exacto import cota_inferior_maquinas, resolver_exacto, resolver_exacto_en_pool
+
+
+def generar_partes(n: int, semilla: int = 0, tools_como_dict: bool = False):
+    r = random.Random(semilla)
+    catalogo_tools = [str(r.randint(10000, 99999)) for _ in range(60)]
+    partes = []
+    for i in range(n):
+        tools = r.sample(catalogo_tools, r.randint(3, 8))
+        partes.append({
+            'part_id': i,
+            'part_number': f'TYEH-{1000000 + i}_00-SW',
+            'quantity': r.randint(5, 60),
+            'uph': round(r.uniform(5, 80), 2),
+            'thickness': r.choice([0.06, 0.08, 0.1, None]),
+            'sheet_size': r.choice([[48, 96], [60, 120], [48, 120]]),
+            'tools': [{'tool_number': t} for t in tools] if tools_como_dict else tools,
+        })
+    return partes
+
+
+def test_matriz_igual_a_score_por_pares():
+    for tools_como_dict in (False, True):
+        partes = generar_partes(40, semilla=1, tools_como_dict=tools_como_dict)
+        partes.append({'part_id': 99, 'thickness': 0.1, 'sheet_size': [48, 96], 'tools': []})
+        matriz = construir_matriz_compatibilidad(partes)
+        for i, p1 in enumerate(partes):
+            for j, p2 in enumerate(partes):
+                assert matriz[i, j] == calcular_score_compatibilidad(p1, p2)
+
+
+def test_mascaras_cuentan_herramientas_unicas():
+    partes = generar_partes(30, semilla=3, tools_como_dict=True)
+    partes = [{**p, '_idx': i} for i, p in enumerate(partes)]
+    mascaras = construir_mascaras_herramientas(internar_herramientas(partes))
+    for inicio in range(0, 30, 5):
+        grupo = partes[inicio:inicio + 7]
+        assert contar_herramientas_unicas(grupo, mascaras) == contar_herramientas_unicas(grupo)
+
+
+def test_grupo_incremental_igual_a_recalcular():
+    partes = generar_partes(60, semilla=4)
+    partes = [{**p, '_idx': i} for i, p in enumerate(partes)]
+    ids_por_parte = internar_herramientas(partes)
+    matriz = construir_matriz_compatibilidad(partes, ids_por_parte)
+    mascaras = construir_mascaras_herramientas(ids_por_parte)
+
+    for matriz_grupo, mascaras_grupo in ((matriz, mascaras), (None, None)):
+        grupo = GrupoIncremental(partes[:30], matriz_grupo, mascaras_grupo)
+        for parte in partes[30:40]:
+            grupo.agregar(parte)
+        while len(grupo) > 1:
+            referencia = list(grupo.partes)
+            assert abs(grupo.horas - calcular_horas_grupo(referencia)) < 1e-9
+            assert grupo.herramientas_unicas == contar_herramientas_unicas(referencia)
+            assert grupo.compatibilidad_promedio() == encontrar_compatibilidad_promedio_grupo(referencia)
+            menos_compatible = grupo.menos_compatible()
+            assert menos_compatible is identificar_parte_menos_compatible(referencia, matriz_grupo)
+            grupo.remover(menos_compatible)
+        if mascaras_grupo is not None:
+            assert grupo.mascara == mascaras[grupo.partes[0]['_idx']]
+
+
+def test_asignacion_respeta_horas_y_cantidades():
+    partes = generar_partes(120, semilla=2)
+    asignaciones = asignar_optimizado_final(partes, horas_objetivo=96, umbral_compatibilidad=70)
+
+    for partes_maquina in asignaciones.values():
+        assert calcular_horas_grupo(partes_maquina) <= 96 + 1e-9
+        assert all('_idx' not in p for p in partes_maquina)
+
+    asignadas = {}
+    for partes_maquina in asignaciones.values():
+        for p in partes_maquina:
+            asignadas[p['part_id']] = asignadas.get(p['part_id'], 0) + p['quantity']
+    assert asignadas == {p['part_id']: p['quantity'] for p in partes}
+
+
+def test_asignaciones_en_paralelo_iguales_a_serie():
+    """Sin estado global: correr en hilos da lo mismo que correr en serie"""
+    casos = [(generar_partes(80, semilla=s), h) for s in range(6) for h in (24, 96)]
+
+    def resumen(caso):
+        partes, horas = caso
+        asignaciones = asignar_optimizado_final(partes, horas_objetivo=horas)
+        return {m: [(p['part_id'], p['quantity']) for p in ps] for m, ps in asignaciones.items()}
+
+    en_serie = [resumen(caso) for caso in casos]
+    with ThreadPoolExecutor(max_workers=8) as pool:
+        for _ in range(3):
+            assert list(pool.map(resumen, casos)) == en_serie
+
+
+def verificar_reglas_duras(partes, asignaciones, horas_objetivo):
+    """Tiempo, estaciones y cantidades completas; máximo 2 máquinas por part"""
+    cantidades, maquinas_por_part = {}, {}
+    for partes_maquina in asignaciones.values():
+        assert calcular_horas_grupo(partes_maquina) <= horas_objetivo + 1e-6
+        assert contar_herramientas_unicas(partes_maquina) <= 52
+        for p in partes_maquina:
+            cantidades[p['part_id']] = cantidades.get(p['part_id'], 0) + p['quantity']
+            maquinas_por_part[p['part_id']] = maquinas_por_part.get(p['part_id'], 0) + 1
+    assert cantidades == {p['part_id']: p['quantity'] for p in partes}
+    for p in partes:
+        horas = p['quantity'] / p['uph']
+        assert maquinas_por_part[p['part_id']] <= max(2, -(-horas // horas_objetivo))
+
+
+def test_solver_exacto_no_empeora_greedy_y_respeta_cota():
+    for semilla, horas in ((4, 48), (5, 96), (6, 8)):
+        partes = generar_partes(60, semilla=semilla)
+        greedy = asignar_optimizado_final(partes, horas_objetivo=horas)
+        asignaciones, info = resolver_exacto(partes, horas_objetivo=horas, tiempo_limite_seg=1)
+
+        verificar_reglas_duras(partes, asignaciones, horas)
+        assert info['cota_inferior_maquinas'] <= len(asignaciones) <= len(greedy)
+        assert info['optimo_probado'] == (
+            len(asignaciones) == info['cota_inferior_maquinas'] and info['busqueda_completa']
+        )
+
+
+def test_cota_inferior_por_conflictos_de_estaciones():
+    # Tres parts con 30 herramientas distintas cada uno: ningún par cabe en 52
+    partes = [
+        {'part_id': i, 'quantity': 1, 'uph': 10, 'thickness': 0.1, 'sheet_size': [48, 96],
+         'tools': [str(10000 + 100 * i + t) for t in range(30)]}
+        for i in range(3)
+    ]
+    assert cota_inferior_maquinas(partes, horas_objetivo=24)['cota'] == 3
+    asignaciones, info = resolver_exacto(partes, horas_objetivo=24, tiempo_limite_seg=1)
+    assert len(asignaciones) == 3 and info['optimo_probado']
+
+
+def test_solver_exacto_no_declara_optimo_sin_cumplir_reglas_o_cortado(monkeypatch):
+    import app.utils.solver_exacto as solver_exacto
+
+    # Un part con más herramientas que estaciones: solo queda el greedy de
+    # respaldo, que usa las máquinas de la cota pero no cumple las reglas
+    partes = [
+        {'part_id': 0, 'quantity': 1, 'uph': 10, 'thickness': 0.1, 'sheet_size': [48, 96],
+         'tools': [str(10000 + t) for t in range(60)]},
+        {'part_id': 1, 'quantity': 1, 'uph': 10, 'thickness': 0.1, 'sheet_size': [48, 96],
+         'tools': [str(20000 + t) for t in range(5)]},
+    ]
+    asignaciones, info = resolver_exacto(partes, horas_objetivo=24, tiempo_limite_seg=1)
+    assert len(asignaciones) == info['cota_inferior_maquinas']
+    assert not info['cumple_reglas'] and not info['optimo_probado']
+
+    # Sin profundidad disponible la búsqueda se corta (sin RecursionError)
+    # y se queda con el greedy
+    monkeypatch.setattr(solver_exacto, "_profundidad_disponible", lambda: 3)
+    partes = generar_partes(60, semilla=4)
+    asignaciones, info = resolver_exacto(partes, horas_objetivo=48, tiempo_limite_seg=5)
+    verificar_reglas_duras(partes, asignaciones, 48)
+    assert info['maquinas_greedy'] > info['cota_inferior_maquinas']
+    assert info['motivo_corte'] == "profundidad" and not info['optimo_probado']
+    assert len(asignaciones) == info['maquinas_greedy']
+
+
+def test_solver_exacto_en_pool_igual_que_en_proceso():
+    partes = generar_partes(12, semilla=3)
+    resumen = lambda a: {m: [(p['part_id'], p['quantity']) for p in ps] for m, ps in a.items()}
+
+    incumbentes, incumbentes_pool = [], []
+    local, info = resolver_exacto(partes, horas_objetivo=24, tiempo_limite_seg=5, al_mejorar=incumbentes.append)
+    en_pool, info_pool = resolver_exacto_en_pool(
+        partes, horas_objetivo=24, tiempo_limite_seg=5, al_mejorar=incumbentes_pool.append
+    )
+    assert info['busqueda_completa'] and info_pool['busqueda_completa']
+    assert resumen(en_pool) == resumen(local)
+    assert incumbentes_pool == incumbentes and incumbentes[-1] == len(local)
+    assert {k: v for k, v in info_pool.items() if k != 'tiempo_solver_seg'} == \
+        {k: v for k, v in info.items() if k != 'tiempo_solver_seg'}
+
+
+def test_busqueda_local_mejora_y_es_reproducible():
+    partes = generar_partes(80, semilla=4)
+    greedy = asignar_optimizado_final(partes, horas_objetivo=48)
+
+    resultados = []
+    for _ in range(2):
+        asignaciones, info = mejorar_asignacion(
+            partes, greedy, horas_objetivo=48, tiempo_limite_seg=60, max_iteraciones=5000, semilla=7
+        )
+        verificar_reglas_duras(partes, asignaciones, 48)
+        resultados.append({m: [(p['part_id'], p['quantity']) for p in ps] for m, ps in asignaciones.items()})
+
+    assert resultados[0] == resultados[1]
+    assert info['maquinas_despues'] == len(resultados[0]) <= len(greedy)
+    assert (info['maquinas_despues'], info['herramientas_despues']) <= (info['maquinas_antes'], info['herramientas_antes'])
+
+
+def test_portafolio_determinista_y_no_peor_que_greedy():
+    partes = generar_partes(60, semilla=8)
+    greedy = asignar_optimizado_final(partes, horas_objetivo=48)
+
+    en_serie, info = resolver_portafolio(partes, horas_objetivo=48, semilla=5, paralelo=False)
+    en_paralelo, info_paralelo = resolver_portafolio(partes, horas_objetivo=48, semilla=5, paralelo=True)
+
+    resumen = lambda a: {m: [(p['part_id'], p['quantity']) for p in ps] for m, ps in a.items()}
+    assert resumen(en_serie) == resumen(en_paralelo)
+    assert info['estrategia_ganadora'] == info_paralelo['estrategia_ganadora']
+    assert len(en_serie) <= len(greedy)
+
+
+def generar_maquinas_y_partes_reales(n: int = 40, semilla: int = 7):
+    """Máquinas con los templates reales (algunas con estaciones dañadas) y partes con estaciones 4I"""
+    from types import SimpleNamespace
+
+    from app.database.templates_data import TEMPLATE_2I, TEMPLATE_4I, TEMPLATE_45STA
+
+    machines = [
+        SimpleNamespace(id=i, template=SimpleNamespace(**template), estaciones_dañadas=dañadas,
+                        thickness_min=0.03, thickness_max=0.13, mesa_x=120, mesa_y=60)
+        for i, (template, dañadas) in enumerate([
+            (TEMPLATE_45STA, []), (TEMPLATE_2I, [102, 203]), (TEMPLATE_4I, [103]),
+            (TEMPLATE_4I, []), (TEMPLATE_45STA, [107]), (TEMPLATE_2I, [])
+        ] * 3, start=1)
+    ]
+    machines[0].mesa_x = 100  # una parte de 120 de largo no cabe aquí
+
+    r = random.Random(semilla)
+    estaciones = [e for e, c in TEMPLATE_4I["estaciones_config"].items() if c["tipo"] in ("A", "B")]
+    partes = []
+    for i in range(n):
+        pares = {str(r.choice([1, 2, 3, 5, 7]) * 10000 + r.randint(0, 600)): r.choice(estaciones)
+                 for _ in range(r.randint(4, 12))}
+        partes.append({
+            'part_id': i,
+            'part_number': f'TYEH-{1000000 + i}_00-SW',
+            'filename': f'TYEH-{1000000 + i}_00-SW.stp',
+            'quantity': r.randint(5, 60),
+            'uph': round(r.uniform(2, 40), 2),
+            'thickness': r.choice([0.06, 0.08, 0.1]),
+            'sheet_size': r.choice([[96, 48], [120, 60]]),
+            'tools': list(pares),
+            'stations': list(pares.values()),
+            'parsed_data': {'tools_data': [{'station': s, 'tool_number': t} for t, s in pares.items()]},
+        })
+    return machines, partes
+
+
+def test_asignacion_en_maquinas_reales_sin_overflow():
+    """Con la capacidad real de cada máquina el estilo no deja herramientas fuera"""
+    import app.database.db  # noqa: F401  (registra los modelos antes de importar el servicio)
+    from app.services.distribucion_service import generar_estilo, procesar_herramientas_part
+    from app.utils.asignacion_maquinas import asignar_en_maquinas, capacidad_maquina, herramientas_fuera
+
+    machines, partes = generar_maquinas_y_partes_reales()
+    capacidades = [capacidad_maquina(m) for m in machines]
+    plan, alertas = asignar_en_maquinas(partes, capacidades, horas_objetivo=24)
+    assert not alertas
+    verificar_reglas_duras(partes, {i: p for i, p in enumerate(plan.values())}, 24)
+
+    por_id = {m.id: m for m in machines}
+    for machine_id, partes_maquina in plan.items():
+        machine = por_id[machine_id]
+        if machine_id == 1:
+            assert all(p['sheet_size'][0] <= 100 for p in partes_maquina)
+
+        machine_data = {"herramientas_unificadas": {}}
+        for parte in partes_maquina:
+            procesar_herramientas_part(parte, machine_data, machine, parte['part_number'])
+        estilo, overflow = generar_estilo(machine_data["herramientas_unificadas"], machine)
+        assert overflow == []
+        assert len(estilo) == len(machine_data["herramientas_unificadas"])
+
+    # Todas las herramientas juntas no caben en una 45STA
+    grande = {t: s for p in partes for t, s in zip(p['tools'], p['stations'])}
+    assert herramientas_fuera(grande, capacidades[0]) > 0
+
+
+def test_cache_de_templates_sigue_cambios_de_la_maquina():
+    from app.utils.templates_compilados import compilar_maquina, compilar_template, invalidar_maquina
+
+    machines, _ = generar_maquinas_y_partes_reales()
+    machine = machines[1]
+    compilada = compilar_maquina(machine)
+    assert compilar_maquina(machine) is compilada
+    assert '102' not in compilada.disponibles and '203' not in compilada.disponibles
+
+    # Mismas dañadas pero invalidada (PUT /machine/{id}): se vuelve a compilar igual
+    invalidar_maquina(machine.id)
+    assert compilar_maquina(machine) is not compilada
+    assert compilar_maquina(machine).disponibles == compilada.disponibles
+
+    # Otras dañadas: nueva máscara, mismo template compilado
+    machine.estaciones_dañadas = [102]
+    nueva = compilar_maquina(machine)
+    assert '203' in nueva.disponibles and '102' not in nueva.disponibles
+    assert nueva.template is compilar_template(machine.template)
+    assert nueva.total_estaciones == compilada.total_estaciones + 1
+
+
+def test_cache_de_templates_recompila_config_editada_en_sitio():
+    from types import SimpleNamespace
+
+    from app.database.templates_data import TEMPLATE_4I
+    from app.utils.templates_compilados import compilar_maquina, compilar_template
+
+    config = copy.deepcopy(TEMPLATE_4I['estaciones_config'])
+    template = SimpleNamespace(**{**TEMPLATE_4I, 'id': 999, 'estaciones_config': config})
+    machine = SimpleNamespace(id=999, template=template, estaciones_dañadas=[])
+    compilado = compilar_template(template)
+    assert compilado.config is not config and compilar_template(template) is compilado
+
+    # JSON editado en sitio (mismo dict): se compila de nuevo y el anterior no cambia
+    estacion = next(iter(config))
+    tipo_original = compilado.info_estacion(estacion)[0]
+    config[estacion] = {**config[estacion], 'tipo': 'Z'}
+    nuevo = compilar_template(template)
+    assert nuevo is not compilado and nuevo.info_estacion(estacion)[0] == 'Z'
+    assert compilado.info_estacion(estacion)[0] == tipo_original == compilado.config[estacion]['tipo']
+    assert compilar_maquina(machine).disponibles[estacion]['tipo'] == 'Z'
+
+
+def test_emparejar_respeta_grosor_con_caminos_aumentantes():
+    """El greedy tomaría A para la máquina virtual 1 y dejaría a la 2 sin máquina de su grosor"""
+    from types import SimpleNamespace
+
+    from app.database.templates_data import TEMPLATE_4I
+    from app.utils.asignacion_maquinas import capacidad_maquina, emparejar_con_maquinas
+
+    def maquina(machine_id, thickness_max):
+        return capacidad_maquina(SimpleNamespace(
+            id=machine_id, template=SimpleNamespace(**TEMPLATE_4I), estaciones_dañadas=[],
+            thickness_min=0.5, thickness_max=thickness_max, mesa_x=120, mesa_y=60
+        ))
+
+    def parte(numero, thickness, herramientas):
+        pares = {str(10000 + i): '101' for i in range(herramientas)}
+        return {
+            'part_number': numero, 'quantity': 10, 'uph': 10, 'thickness': thickness,
+            'sheet_size': [96, 48], 'tools': list(pares), 'stations': list(pares.values()),
+        }
+
+    plan_virtual = {1: [parte('DELGADA', 1.0, 10)], 2: [parte('GRUESA', 3.0, 2)]}
+    plan, errores = emparejar_con_maquinas(plan_virtual, [maquina(1, 5.0), maquina(2, 2.0)])
+    assert errores == []
+    assert plan == {2: plan_virtual[1], 1: plan_virtual[2]}
+
+    # Sin ninguna máquina para la gruesa: no se relaja la regla, se reporta
+    plan, errores = emparejar_con_maquinas(plan_virtual, [maquina(2, 2.0), maquina(3, 2.0)])
+    assert list(plan.values()) == [plan_virtual[1]]
+    assert len(errores) == 1 and "GRUESA" in errores[0]
+
+
+def test_reparar_plan_solo_toca_maquinas_afectadas():
+    from app.utils.asignacion_maquinas import asignar_en_maquinas, capacidad_maquina, reparar_plan
+
+    machines, partes = generar_maquinas_y_partes_reales()
+    capacidades = [capacidad_maquina(m) for m in machines]
+    plan, _ = asignar_en_maquinas(partes, capacidades, horas_objetivo=24)
+
+    indice = {p['part_id']: i for i, p in enumerate(partes)}
+    plan_indices = {
+        machine_id: {indice[p['part_id']]: p['quantity'] for p in partes_maquina}
+        for machine_id, partes_maquina in plan.items()
+    }
+
+    # Sin cambios de cantidades el plan queda igual
+    assert reparar_plan(partes, plan_indices, capacidades, 24) == (plan_indices, [])
+
+    # Se sube una parte y se quita otra: solo cambian sus máquinas
+    sube, baja = 3, 8
+    nuevas = [dict(p) for p in partes]
+    nuevas[sube]['quantity'] += 40
+    nuevas[baja]['quantity'] = 0
+    reparado, alertas = reparar_plan(nuevas, plan_indices, capacidades, 24)
+    assert not alertas
+
+    for machine_id, piezas in plan_indices.items():
+        if sube not in piezas and baja not in piezas:
+            assert reparado.get(machine_id) == piezas
+    verificar_reglas_duras(
+        [p for p in nuevas if p['quantity'] > 0],
+        {m: [{**nuevas[i], 'quantity': q} for i, q in piezas.items()] for m, piezas in reparado.items()},
+        24
+    )
+
+
+def test_reparar_plan_respeta_piezas_de_la_parte():
+    """Parte de 18h con H=10 ya dividida en 2 máquinas llenas: no se abre una 3a"""
+    from app.utils.asignacion_maquinas import capacidad_maquina, reparar_plan
+
+    machines, partes = generar_maquinas_y_partes_reales()
+    capacidades = [capacidad_maquina(m) for m in machines]
+    partes = [{**p, 'uph': 1} for p in partes[:3]]
+    partes[0]['quantity'], partes[1]['quantity'], partes[2]['quantity'] = 18, 2, 3
+    plan = {4: {0: 8, 1: 2}, 10: {0: 7, 2: 3}}
+
+    reparado, alertas = reparar_plan(partes, plan, capacidades, 10)
+    assert reparado == plan
+    assert len(alertas) == 1 and "3 piezas" in alertas[0]
+
+
+def test_barrido_igual_a_llamadas_individuales():
+    from app.utils.barrido import barrido_asignacion, matriz_horas
+
+    partes = generar_partes(30, semilla=4)
+    for p in partes:
+        p['quantity'] = max(1, p['quantity'] // 10)
+    demandas, horas = [1, 3, 8], [12, 24, 96]
+
+    horas_dp = matriz_horas(partes, demandas)
+    for i, demanda in enumerate(demandas):
+        escaladas = [{**p, 'quantity': p['quantity'] * demanda} for p in partes]
+        assert abs(horas_dp[i].sum() - calcular_horas_grupo(escaladas)) < 1e-6
+
+    tabla = barrido_asignacion(partes, demandas, horas, maquinas_disponibles=20)
+    for i, demanda in enumerate(demandas):
+        escaladas = [{**p, 'quantity': p['quantity'] * demanda} for p in partes]
+        for j, h in enumerate(horas):
+            try:
+                esperadas = len(asignar_optimizado_final(escaladas, h, 70))
+            except Exception:
+                esperadas = -1
+            assert tabla["maquinas"][i][j] == esperadas
+            assert tabla["cota_inferior_por_horas"][i][j] <= max(esperadas, 1) or esperadas == -1
+
+
+def test_barrido_coincide_con_crear_con_part_sin_maquina():
+    from benchmark_solver import FLOTA, crear_bd_memoria, generar_paquete_sintetico
+    from app.services.distribucion_service import barrido_distribucion, crear_distribucion_optimizada
+
+    # Un part más grueso de lo que acepta cualquier máquina de la flota (0.13)
+    parts = generar_paquete_sintetico(8, semilla=2)
+    parts[3]["parsed_data"] = {**parts[3]["parsed_data"], "thickness": 0.25}
+    sin_maquina = parts[3]["parsed_data"]["part_number"]["full"]
+
+    db, package_id, machine_ids = crear_bd_memoria(parts, FLOTA)
+    try:
+        for modo in ("greedy", "maquinas"):
+            crear = crear_distribucion_optimizada(
+                db, package_id, demanda=1, horas_objetivo=96, machine_ids=machine_ids,
+                modo_solver=modo, usar_cache=False
+            )
+            tabla = barrido_distribucion(db, package_id, [1, 5], [24, 96], machine_ids, modo_solver=modo)
+            assert not crear.es_factible and sin_maquina in " ".join(crear.errores_generales)
+            assert tabla["parts_sin_maquina"] == [sin_maquina]
+            assert tabla["es_factible"] == [[False, False], [False, False]]
+            assert all(m > 0 for fila in tabla["maquinas"] for m in fila)
+    finally:
+        db.close()
+
+
+def test_barrido_exige_emparejar_maquinas_virtuales():
+    from types import SimpleNamespace
+
+    from app.database.templates_data import TEMPLATE_4I
+    from app.utils.asignacion_maquinas import capacidad_maquina
+    from app.utils.barrido import barrido_asignacion
+
+    def maquina(machine_id, thickness_max):
+        return capacidad_maquina(SimpleNamespace(
+            id=machine_id, template=SimpleNamespace(**TEMPLATE_4I), estaciones_dañadas=[],
+            thickness_min=0.5, thickness_max=thickness_max, mesa_x=120, mesa_y=60
+        ))
+
+    # Dos parts gruesos que no caben juntos por tiempo y una sola máquina para ese grosor
+    partes = [
+        {'part_id': i, 'part_number': f'GRUESA-{i}', 'quantity': 60, 'uph': 1, 'thickness': 3.0,
+         'sheet_size': [96, 48], 'tools': ['10001'], 'stations': ['101']}
+        for i in range(2)
+    ]
+    capacidades = [maquina(1, 5.0), maquina(2, 2.0)]
+    sin_emparejar = barrido_asignacion(partes, [1], [96], maquinas_disponibles=2)
+    emparejada = barrido_asignacion(partes, [1], [96], maquinas_disponibles=2, emparejar_con=capacidades)
+    assert sin_emparejar["maquinas"] == emparejada["maquinas"] == [[2]]
+    assert sin_emparejar["es_factible"] == [[True]] and emparejada["es_factible"] == [[False]]
+
+
+def test_prechequeo_es_cota_valida():
+    from app.utils.asignacion_maquinas import asignar_en_maquinas, capacidad_maquina
+    from app.utils.prechequeo import prechequeo_factibilidad
+
+    machines, partes = generar_maquinas_y_partes_reales()
+    capacidades = [capacidad_maquina(m) for m in machines]
+    for horas in (8, 24, 96):
+        plan, alertas = asignar_en_maquinas(partes, capacidades, horas)
+        chequeo = prechequeo_factibilidad(partes, capacidades, horas)
+        if not alertas:
+            assert chequeo["factible_posible"]
+            assert chequeo["cota_inferior_maquinas"] <= len(plan)
+
+    chequeo = prechequeo_factibilidad(partes, capacidades[:2], 8)
+    assert not chequeo["factible_posible"]
+    assert chequeo["cota_inferior_maquinas"] > 2 and chequeo["motivos"]
@@ -0,0 +1,56 @@
+"""
+Inicialización de clasificador.db: importar los módulos no toca el archivo,
+inicializar_bd crea las tablas y agrega las columnas nuevas.
+
+Cada caso corre en un proceso aparte con el directorio de trabajo en una
+carpeta temporal (la URL de la BD es relativa: ./clasificador.db).
+
+    python -m pytest test_base_datos.py
+"""
+import os
+import sqlite3
+import subprocess
+import sys
+
+BACKEND_DIR = os.path.dirname(os.path.abspath(__file__))
+
+
+def correr(codigo: str, cwd: str):
+    entorno = {**os.environ, "PYTHONPATH": BACKEND_DIR}
+    subprocess.run([sys.executable, "-c", codigo], cwd=cwd, env=entorno, check=True, timeout=120)
+
+
+def test_importar_no_crea_ni_migra_la_bd(tmp_path):
+    correr("import app.main", str(tmp_path))
+    assert not (tmp_path / "clasificador.db").exists()
+
+
+def test_benchmark_no_toca_la_bd(tmp_path):
+    correr(
+        "import benchmark_solver as b; "
+        "b.crear_bd_memoria(b.generar_paquete_sintetico(3, semilla=1), b.FLOTA[:2])",
+        str(tmp_path)
+    )
+    assert not (tmp_path / "clasificador.db").exists()
+
+
+def test_inicializar_bd_agrega_columnas_faltantes(tmp_path):
+    # BD de una versión anterior: distribuciones sin la columna huella
+    conn = sqlite3.connect(tmp_path / "clasificador.db")
+    conn.execute(
+        "CREATE TABLE distribuciones (id INTEGER PRIMARY KEY, package_id INTEGER NOT NULL, "
+        "package_nombre VARCHAR NOT NULL, demanda INTEGER NOT NULL, horas_objetivo INTEGER NOT NULL, "
+        "machine_ids JSON NOT NULL, resultado_json JSON NOT NULL, es_factible BOOLEAN, "
+        "created_at DATETIME, expires_at DATETIME, activa BOOLEAN)"
+    )
+    conn.commit()
+    conn.close()
+
+    correr("from app.database.db import inicializar_bd; inicializar_bd()", str(tmp_path))
+
+    conn = sqlite3.connect(tmp_path / "clasificador.db")
+    columnas = {fila[1] for fila in conn.execute("PRAGMA table_info(distribuciones)")}
+    tablas = {fila[0] for fila in conn.execute("SELECT name FROM sqlite_master WHERE type='table'")}
+    conn.close()
+    assert "huella" in columnas
+    assert {"setups", "trabajos_distribucion"} <= tablas
@@ -0,0 +1,131 @@
+"""
+Número de queries del camino de distribución y caché de resultados (BD
+SQLite en memoria).
+
+Package, parts, setups del catálogo y máquinas con su template se cargan con
+un plan fijo (selectinload/joinedload): la cantidad de sentencias no debe
+crecer con el número de parts ni de máquinas.
+
+    python -m pytest test_distribucion_queries.py
+"""
+from sqlalchemy import event
+
+from benchmark_solver import FLOTA, crear_bd_memoria, generar_paquete_sintetico
+from app.models.distribucion_storage_model import DistribucionStorage
+from app.models.machine_model import Machine
+from app.models.package_part_model import PackagePart
+from app.models.setup_model import Setup
+from app.services.distribucion_service import (
+    crear_distribucion_optimizada,
+    prechequear_distribucion,
+    replanificar_distribucion,
+)
+
+
+def crear_bd(num_parts: int, num_maquinas: int):
+    """BD en memoria; la mitad de los parts vinculados a un setup del catálogo"""
+    db, package_id, machine_ids = crear_bd_memoria(
+        generar_paquete_sintetico(num_parts, vocabulario=40, semilla=1), FLOTA[:num_maquinas]
+    )
+    for i, part in enumerate(db.query(PackagePart).order_by(PackagePart.id).all()):
+        if i % 2:
+            setup = Setup(part_full=part.part_filename, parsed_data=part.parsed_data_json)
+            db.add(setup)
+            db.flush()
+            part.setup_id = setup.id
+    db.commit()
+    db.expunge_all()  # Nada precargado en la sesión
+    return db, package_id, machine_ids
+
+
+def contar_sentencias(db, funcion) -> int:
+    sentencias = []
+
+    def registrar(conn, cursor, statement, parameters, context, executemany):
+        sentencias.append(statement)
+
+    engine = db.get_bind()
+    event.listen(engine, "before_cursor_execute", registrar)
+    try:
+        funcion()
+    finally:
+        event.remove(engine, "before_cursor_execute", registrar)
+    db.expunge_all()
+    return len(sentencias)
+
+
+def test_queries_constantes_con_mas_parts_y_maquinas():
+    conteos = []
+    for num_parts, num_maquinas in ((4, 3), (30, 12)):
+        db, package_id, machine_ids = crear_bd(num_parts, num_maquinas)
+        try:
+            conteo = {
+                modo: contar_sentencias(db, lambda: crear_distribucion_optimizada(
+                    db, package_id, 5, 96, machine_ids, modo_solver=modo
+                ))
+                for modo in ("greedy", "maquinas")
+            }
+            distribucion_id = db.query(DistribucionStorage.id).order_by(DistribucionStorage.id.desc()).first()[0]
+            db.expunge_all()
+            conteo["replanificar"] = contar_sentencias(db, lambda: replanificar_distribucion(db, distribucion_id, 7))
+            conteo["prechequeo"] = contar_sentencias(db, lambda: prechequear_distribucion(
+                db, package_id, 5, 96, machine_ids
+            ))
+        finally:
+            db.close()
+        conteos.append(conteo)
+
+    assert conteos[0] == conteos[1]
+    # package + parts + setups + máquinas (con template) + caché + guardar
+    assert conteos[0]["greedy"] <= 7
+
+
+def test_cache_de_resultados_por_huella():
+    db, package_id, machine_ids = crear_bd(6, 4)
+    try:
+        def crear(**kwargs):
+            return crear_distribucion_optimizada(db, package_id, 5, 96, machine_ids, **kwargs)
+
+        primera = crear()
+        assert "desde_cache" not in primera.resumen
+
+        repetida = crear()
+        assert repetida.resumen["desde_cache"] is True
+        assert repetida.asignaciones == primera.asignaciones
+        # Un solo solver al resolver; la repetición sale de la misma fila
+        assert db.query(DistribucionStorage).count() == 1
+
+        assert "desde_cache" not in crear(usar_cache=False).resumen
+
+        # Cambia el package o una máquina → otra huella, se vuelve a resolver
+        part = db.query(PackagePart).order_by(PackagePart.id).first()
+        part.cantidad += 1
+        db.commit()
+        assert "desde_cache" not in crear().resumen
+
+        machine = db.query(Machine).filter(Machine.id == machine_ids[0]).first()
+        machine.estaciones_dañadas = ["1"]
+        db.commit()
+        assert "desde_cache" not in crear().resumen
+        assert crear().resumen["desde_cache"] is True
+    finally:
+        db.close()
+
+
+def test_replanificar_no_conserva_estilo_con_estaciones_dañadas():
+    db, package_id, machine_ids = crear_bd(6, 4)
+    try:
+        distribucion = crear_distribucion_optimizada(db, package_id, 5, 96, machine_ids)
+        asignacion = next(a for a in distribucion.asignaciones if a.estilo)
+        estacion = asignacion.estilo[0].estacion
+
+        machine = db.query(Machine).filter(Machine.id == asignacion.machine_id).first()
+        machine.estaciones_dañadas = [estacion]
+        db.commit()
+
+        replan = replanificar_distribucion(db, distribucion.resumen["distribucion_id"])
+        assert asignacion.machine_id in replan.resumen["maquinas_reparadas"]
+        nueva = next(a for a in replan.asignaciones if a.machine_id == asignacion.machine_id)
+        assert estacion not in {item.estacion for item in nueva.estilo}
+    finally:
+        db.close()
@@ -0,0 +1,155 @@
+"""
+Caché de setups parseados (parser_cache), POST /package/preview con el pool
+de procesos y memoria acotada del parser en streaming.
+
+El caché se redirige a un SQLite en una carpeta temporal; no toca el
+parse_cache.db del backend.
+
+    python -m pytest test_parser_cache.py
+"""
+import io
+import json
+import os
+import tracemalloc
+
+import pytest
+from fastapi.testclient import TestClient
+
+from app.main import app
+from app.utils import parser_cache, pool_procesos
+from app.utils.parser_setups import parse_setup
+
+CARPETA_MUESTRA = os.path.join(os.path.dirname(os.path.abspath(__file__)), "setups_muestra")
+ARCHIVOS = ["TYEH-1153513_00-SW.stp", "TYEH-1153514_00-SW.stp", "TYEH-1153531_00-SW.stp"]
+
+
+def leer(archivo: str) -> bytes:
+    with open(os.path.join(CARPETA_MUESTRA, archivo), "rb") as f:
+        return f.read()
+
+
+@pytest.fixture
+def cache_temporal(tmp_path, monkeypatch):
+    """Caché en tmp_path; los workers del pool se crean de nuevo para heredarlo (fork)"""
+    monkeypatch.setattr(parser_cache, "ruta_cache", lambda: str(tmp_path / "parse_cache.db"))
+    monkeypatch.setattr(parser_cache, "_esquema_listo", False)
+    pool_procesos.cerrar_pool()
+    yield tmp_path
+    pool_procesos.cerrar_pool()
+
+
+@pytest.fixture
+def contar_parseos(monkeypatch):
+    llamadas = []
+
+    def parse_contado(fuente, nombre_archivo=None):
+        llamadas.append(nombre_archivo)
+        return parse_setup(fuente, nombre_archivo)
+
+    monkeypatch.setattr(parser_cache, "parse_setup", parse_contado)
+    return llamadas
+
+
+def test_cache_hit_y_miss(cache_temporal, contar_parseos):
+    contenido = leer(ARCHIVOS[0])
+    esperado = parse_setup(contenido, ARCHIVOS[0])
+
+    assert parser_cache.parse_setup_cacheado(contenido, ARCHIVOS[0]) == esperado
+    assert len(contar_parseos) == 1
+
+    # Mismo contenido (bytes, stream o ruta): no se vuelve a parsear
+    assert parser_cache.parse_setup_cacheado(io.BytesIO(contenido), ARCHIVOS[0]) == esperado
+    assert parser_cache.parse_setup_cacheado(os.path.join(CARPETA_MUESTRA, ARCHIVOS[0])) == esperado
+    assert len(contar_parseos) == 1
+
+    # Mismo contenido con otro nombre: part number del nombre nuevo
+    renombrado = parser_cache.parse_setup_cacheado(contenido, "TYEH-9999999_01-SW.stp")
+    assert len(contar_parseos) == 1
+    assert renombrado["part_number"]["full"] == "TYEH-9999999_01-SW"
+    assert {k: v for k, v in renombrado.items() if k != "part_number"} == \
+        {k: v for k, v in esperado.items() if k != "part_number"}
+
+    # Contenido distinto: miss
+    parser_cache.parse_setup_cacheado(leer(ARCHIVOS[1]), ARCHIVOS[1])
+    assert len(contar_parseos) == 2
+
+
+def test_cache_se_invalida_al_cambiar_parser_version(cache_temporal, contar_parseos, monkeypatch):
+    contenido = leer(ARCHIVOS[0])
+    parser_cache.parse_setup_cacheado(contenido, ARCHIVOS[0])
+    assert len(contar_parseos) == 1
+
+    monkeypatch.setattr(parser_cache, "PARSER_VERSION", parser_cache.PARSER_VERSION + 1)
+    parser_cache.parse_setup_cacheado(contenido, ARCHIVOS[0])
+    assert len(contar_parseos) == 2
+
+    # Al reabrir el caché con la versión nueva se borran las entradas viejas
+    monkeypatch.setattr(parser_cache, "_esquema_listo", False)
+    conn = parser_cache._conectar()
+    try:
+        versiones = {fila[0] for fila in conn.execute("SELECT version FROM parse_cache")}
+    finally:
+        conn.close()
+    assert versiones == {parser_cache.PARSER_VERSION}
+
+
+def test_cache_lru_respeta_limite_de_bytes(cache_temporal, monkeypatch):
+    datos = {"relleno": "x" * 1000}
+    tamano = len(json.dumps(datos))
+    monkeypatch.setattr(parser_cache, "PARSE_CACHE_MAX_BYTES", tamano * 2)
+
+    parser_cache.guardar("a", datos)
+    parser_cache.guardar("b", datos)
+    assert parser_cache.obtener("a") == datos  # "a" pasa a ser la más reciente
+    parser_cache.guardar("c", datos)
+
+    assert parser_cache.obtener("b") is None
+    assert parser_cache.obtener("a") == datos
+    assert parser_cache.obtener("c") == datos
+
+
+def test_preview_en_pool_reporta_errores_por_archivo(cache_temporal):
+    cliente = TestClient(app)
+    archivos = [
+        ("files", (ARCHIVOS[0], leer(ARCHIVOS[0]), "application/octet-stream")),
+        ("files", ("notas.txt", b"hola", "text/plain")),
+        ("files", ("TYEH-1153513_00-FG.stp", leer(ARCHIVOS[0]), "application/octet-stream")),
+        ("files", (ARCHIVOS[1], leer(ARCHIVOS[1]), "application/octet-stream")),
+    ]
+    respuesta = cliente.post("/package/preview", files=archivos)
+    assert respuesta.status_code == 200, respuesta.text
+    cuerpo = respuesta.json()
+
+    assert cuerpo["total_archivos"] == 4
+    assert [p["index"] for p in cuerpo["preview"]] == [0, 3]
+    assert cuerpo["preview"][0]["parsed_data_complete"] == parse_setup(leer(ARCHIVOS[0]), ARCHIVOS[0])
+    assert [e["archivo"] for e in cuerpo["errores"]] == ["notas.txt", "TYEH-1153513_00-FG.stp"]
+    assert "SW" in cuerpo["errores"][1]["error"]
+
+
+def test_parser_en_streaming_usa_memoria_acotada(tmp_path):
+    # ~16 MB de relleno entre la tabla de herramientas y los encabezados del
+    # final (sym, mins); las líneas largas mantienen rápido a tracemalloc
+    original = leer(ARCHIVOS[0]).decode()
+    corte = original.index("NESTING")
+    ruta = tmp_path / ARCHIVOS[0]
+    with open(ruta, "w") as f:
+        f.write(original[:corte])
+        relleno = ("-" * 8191 + "\n") * 64
+        for _ in range(32):
+            f.write(relleno)
+        f.write(original[corte:])
+    assert os.path.getsize(ruta) > 15 * 1024 * 1024
+
+    esperado = parse_setup(leer(ARCHIVOS[0]), ARCHIVOS[0])
+    for fuente in (str(ruta), open(ruta, "rb")):
+        tracemalloc.start()
+        try:
+            resultado = parse_setup(fuente, ARCHIVOS[0])
+            _, pico = tracemalloc.get_traced_memory()
+        finally:
+            tracemalloc.stop()
+            if not isinstance(fuente, str):
+                fuente.close()
+        assert resultado == esperado
+        assert pico < 2 * 1024 * 1024, f"pico de {pico} bytes"
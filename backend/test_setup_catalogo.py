@@ -0,0 +1,128 @@
+"""
+Catálogo de setups (setup_catalogo_service, POST /package/desde_catalogo)
+sobre una BD SQLite en memoria.
+
+    python -m pytest test_setup_catalogo.py
+"""
+import copy
+import json
+import os
+
+from fastapi.testclient import TestClient
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import StaticPool
+
+from app.database.db import Base, get_db
+from app.main import app
+from app.models.package_part_model import PackagePart
+from app.models.setup_model import Setup
+from app.services import package_service, setup_catalogo_service
+from app.utils.parser_setups import parse_setup
+
+CARPETA_MUESTRA = os.path.join(os.path.dirname(os.path.abspath(__file__)), "setups_muestra")
+
+
+def crear_sesion():
+    engine = create_engine("sqlite://", connect_args={"check_same_thread": False}, poolclass=StaticPool)
+    Base.metadata.create_all(bind=engine)
+    return sessionmaker(autocommit=False, autoflush=False, bind=engine)()
+
+
+def parsed_muestra(archivo: str = "TYEH-1153513_00-SW.stp") -> dict:
+    return parse_setup(os.path.join(CARPETA_MUESTRA, archivo))
+
+
+def con_uph(parsed: dict, uph: float) -> dict:
+    otro = copy.deepcopy(parsed)
+    otro["uph"] = uph
+    return otro
+
+
+def test_crear_package_no_modifica_setups_de_otros_packages():
+    db = crear_sesion()
+    try:
+        original = parsed_muestra()
+        part_full = original["part_number"]["full"]
+        primero = package_service.crear_package(db, "P1", "", [
+            {"filename": part_full, "cantidad": 1, "parsed_data": original}
+        ])
+        # Mismo contenido: se reutiliza el registro
+        igual = package_service.crear_package(db, "P2", "", [
+            {"filename": part_full, "cantidad": 1, "parsed_data": copy.deepcopy(original)}
+        ])
+        assert igual.parts[0].setup_id == primero.parts[0].setup_id
+        assert db.query(Setup).count() == 1
+
+        # Otro contenido para el mismo part_full: revisión nueva
+        cambiado = con_uph(original, 999)
+        segundo = package_service.crear_package(db, "P3", "", [
+            {"filename": part_full, "cantidad": 1, "parsed_data": cambiado}
+        ])
+        assert segundo.parts[0].setup_id != primero.parts[0].setup_id
+        db.expire_all()
+        assert primero.parts[0].parsed_data == original
+        assert segundo.parts[0].parsed_data == cambiado
+
+        # El catálogo muestra solo la revisión vigente
+        catalogo = setup_catalogo_service.listar_catalogo(db)
+        assert [s.id for s in catalogo] == [segundo.parts[0].setup_id]
+        assert setup_catalogo_service.obtener_setup(db, part_full).parsed_data == cambiado
+    finally:
+        db.close()
+
+
+def test_vincular_parts_existentes_solo_con_datos_iguales():
+    db = crear_sesion()
+    try:
+        original = parsed_muestra()
+        otro_archivo = parsed_muestra("TYEH-1153514_00-SW.stp")
+        legado = [
+            PackagePart(package_id=1, part_filename="a", cantidad=1, parsed_data_json=original),
+            PackagePart(package_id=2, part_filename="a", cantidad=1, parsed_data_json=con_uph(original, 999)),
+            PackagePart(package_id=3, part_filename="a", cantidad=1, parsed_data_json=copy.deepcopy(original)),
+            PackagePart(package_id=4, part_filename="b", cantidad=1, parsed_data_json=otro_archivo),
+        ]
+        db.add_all(legado)
+        db.commit()
+
+        assert setup_catalogo_service.vincular_parts_existentes(db) == 3
+        db.expire_all()
+        vinculado, distinto, igual, otro = legado
+        assert vinculado.setup_id is not None and igual.setup_id == vinculado.setup_id
+        assert otro.setup_id is not None and otro.setup_id != vinculado.setup_id
+        # El de datos distintos conserva su snapshot
+        assert distinto.setup_id is None
+        assert distinto.parsed_data["uph"] == 999
+        assert [p.parsed_data for p in legado] == [original, con_uph(original, 999), original, otro_archivo]
+    finally:
+        db.close()
+
+
+def test_package_desde_catalogo():
+    db = crear_sesion()
+    app.dependency_overrides[get_db] = lambda: db
+    try:
+        parsed = parsed_muestra()
+        part_full = parsed["part_number"]["full"]
+        setup_catalogo_service.registrar_setup(db, parsed)
+        db.commit()
+
+        cliente = TestClient(app)
+        respuesta = cliente.post("/package/desde_catalogo", data={
+            "nombre": "Desde catálogo",
+            "items": json.dumps([{"part_full": part_full, "cantidad": 7}])
+        })
+        assert respuesta.status_code == 200, respuesta.text
+        package_id = respuesta.json()["data"]["id"]
+        part = db.query(PackagePart).filter(PackagePart.package_id == package_id).one()
+        assert part.cantidad == 7 and part.parsed_data == parsed and part.parsed_data_json is None
+
+        faltante = cliente.post("/package/desde_catalogo", data={
+            "nombre": "X", "items": json.dumps([{"part_full": "NO-EXISTE", "cantidad": 1}])
+        })
+        assert faltante.status_code == 404
+        assert cliente.post("/package/desde_catalogo", data={"nombre": "X", "items": "[]"}).status_code == 400
+    finally:
+        app.dependency_overrides.pop(get_db, None)
+        db.close()
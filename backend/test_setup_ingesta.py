@@ -0,0 +1,178 @@
+"""
+Ingesta incremental de carpetas (setup_ingesta_service) sobre una BD SQLite
+en memoria y una carpeta temporal con copias de setups_muestra.
+
+    python -m pytest test_setup_ingesta.py
+"""
+from concurrent.futures import ThreadPoolExecutor
+import os
+import shutil
+
+from sqlalchemy import create_engine, event
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import StaticPool
+
+from app.database.db import Base
+from app.models.setup_manifest_model import SetupManifest
+from app.models.setup_model import Setup
+from app.services import setup_ingesta_service
+
+CARPETA_MUESTRA = os.path.join(os.path.dirname(os.path.abspath(__file__)), "setups_muestra")
+ARCHIVOS = ["TYEH-1153513_00-SW.stp", "TYEH-1153514_00-SW.stp", "TYEH-1153531_00-SW.stp"]
+
+
+def crear_sesion():
+    engine = create_engine("sqlite://", connect_args={"check_same_thread": False}, poolclass=StaticPool)
+    Base.metadata.create_all(bind=engine)
+    return sessionmaker(autocommit=False, autoflush=False, bind=engine)()
+
+
+def copiar(carpeta, archivo, destino=None):
+    ruta = os.path.join(carpeta, destino or archivo)
+    shutil.copyfile(os.path.join(CARPETA_MUESTRA, archivo), ruta)
+    return ruta
+
+
+def conteos(resumen):
+    return {k: resumen[k] for k in ("nuevos", "modificados", "sin_cambios", "solo_metadatos", "eliminados")}
+
+
+def registrar_sql(db):
+    """Lista que acumula cada sentencia SQL ejecutada sobre la BD de la sesión"""
+    sentencias = []
+    event.listen(db.get_bind(), "before_cursor_execute", lambda c, cur, sql, *a: sentencias.append(sql))
+    return sentencias
+
+
+def parseos_en_hilo(monkeypatch, fallar=None):
+    """
+    Pool de hilos para que el parse_setup parchado llegue al worker. Retorna
+    la lista de rutas parseadas; fallar(ruta) puede lanzar una excepción.
+    """
+    monkeypatch.setattr(setup_ingesta_service, "obtener_pool", lambda: ThreadPoolExecutor(max_workers=1))
+    parse_original = setup_ingesta_service.parse_setup
+    parseadas = []
+
+    def parse_contado(ruta):
+        parseadas.append(ruta)
+        if fallar:
+            fallar(ruta)
+        return parse_original(ruta)
+
+    monkeypatch.setattr(setup_ingesta_service, "parse_setup", parse_contado)
+    return parseadas
+
+
+def test_ingesta_incremental(tmp_path):
+    db = crear_sesion()
+    try:
+        rutas = [copiar(tmp_path, a) for a in ARCHIVOS]
+
+        # Primera corrida: todo es nuevo
+        resumen = setup_ingesta_service.ingestar_carpeta(db, str(tmp_path))
+        assert conteos(resumen) == {"nuevos": 3, "modificados": 0, "sin_cambios": 0, "solo_metadatos": 0, "eliminados": 0}
+        assert resumen["errores"] == []
+        assert db.query(Setup).count() == 3 and db.query(SetupManifest).count() == 3
+
+        # Sin cambios en disco: no se lee nada ni se consulta el catálogo
+        sentencias = registrar_sql(db)
+        resumen = setup_ingesta_service.ingestar_carpeta(db, str(tmp_path))
+        assert conteos(resumen)["sin_cambios"] == 3
+        assert not [sql for sql in sentencias if "FROM setups" in sql]
+
+        # touch: cambia el mtime pero no el contenido
+        stat = os.stat(rutas[0])
+        os.utime(rutas[0], ns=(stat.st_atime_ns, stat.st_mtime_ns + 10**9))
+        resumen = setup_ingesta_service.ingestar_carpeta(db, str(tmp_path))
+        assert conteos(resumen) == {"nuevos": 0, "modificados": 0, "sin_cambios": 2, "solo_metadatos": 1, "eliminados": 0}
+        assert db.query(Setup).count() == 3
+
+        # Contenido distinto con el mismo nombre: revisión nueva del part
+        copiar(tmp_path, ARCHIVOS[2], destino=ARCHIVOS[1])
+        stat = os.stat(rutas[1])
+        os.utime(rutas[1], ns=(stat.st_atime_ns, stat.st_mtime_ns + 2 * 10**9))
+        sentencias.clear()
+        resumen = setup_ingesta_service.ingestar_carpeta(db, str(tmp_path))
+        # Solo las revisiones del part parseado y sin su parsed_data
+        consulta = next(sql for sql in sentencias if "FROM setups" in sql)
+        assert " IN " in consulta and "parsed_data" not in consulta.split("FROM")[0]
+        assert conteos(resumen) == {"nuevos": 0, "modificados": 1, "sin_cambios": 2, "solo_metadatos": 0, "eliminados": 0}
+        assert db.query(Setup).count() == 4
+        manifiesto = db.query(SetupManifest).filter(SetupManifest.ruta == rutas[1]).one()
+        assert manifiesto.setup.part_full == "TYEH-1153514_00-SW"
+        assert manifiesto.setup.id == max(s.id for s in db.query(Setup).filter(Setup.part_full == "TYEH-1153514_00-SW"))
+
+        # Archivo borrado: sale del manifiesto, el setup queda en el catálogo
+        os.remove(rutas[2])
+        resumen = setup_ingesta_service.ingestar_carpeta(db, str(tmp_path))
+        assert conteos(resumen) == {"nuevos": 0, "modificados": 0, "sin_cambios": 2, "solo_metadatos": 0, "eliminados": 1}
+        assert db.query(SetupManifest).count() == 2 and db.query(Setup).count() == 4
+    finally:
+        db.close()
+
+
+def test_ingesta_reintenta_errores_de_lectura(tmp_path, monkeypatch):
+    intentos = {"fallas": 1}
+
+    def bloqueado(ruta):
+        if intentos["fallas"]:
+            intentos["fallas"] -= 1
+            raise OSError("archivo bloqueado")
+
+    parseadas = parseos_en_hilo(monkeypatch, bloqueado)
+
+    db = crear_sesion()
+    try:
+        ruta = copiar(tmp_path, ARCHIVOS[0])
+        resumen = setup_ingesta_service.ingestar_carpeta(db, str(tmp_path))
+        assert len(resumen["errores"]) == 1 and "archivo bloqueado" in resumen["errores"][0]
+        manifiesto = db.query(SetupManifest).one()
+        assert manifiesto.error == "archivo bloqueado" and manifiesto.sha256 == ""
+
+        # Mismo mtime y tamaño: igual se reintenta (error de lectura)
+        resumen = setup_ingesta_service.ingestar_carpeta(db, str(tmp_path))
+        assert resumen["errores"] == [] and resumen["sin_cambios"] == 0 and len(parseadas) == 2
+        manifiesto = db.query(SetupManifest).one()
+        assert manifiesto.ruta == ruta and manifiesto.error is None
+        assert manifiesto.setup.part_full == "TYEH-1153513_00-SW"
+
+        # Ya sin error vuelve a tomar el camino rápido
+        assert setup_ingesta_service.ingestar_carpeta(db, str(tmp_path))["sin_cambios"] == 1
+        assert len(parseadas) == 2
+    finally:
+        db.close()
+
+
+def test_ingesta_no_reparsea_errores_permanentes(tmp_path, monkeypatch):
+    parseadas = parseos_en_hilo(monkeypatch)
+
+    db = crear_sesion()
+    try:
+        # Nivel FG: parse_setup lo rechaza siempre
+        ruta = copiar(tmp_path, ARCHIVOS[0], destino="TYEH-1153513_00-FG.stp")
+        resumen = setup_ingesta_service.ingestar_carpeta(db, str(tmp_path))
+        assert len(resumen["errores"]) == 1 and "SW" in resumen["errores"][0]
+        manifiesto = db.query(SetupManifest).one()
+        assert manifiesto.sha256 == setup_ingesta_service.sha256_archivo(ruta)
+        assert len(parseadas) == 1
+
+        # Sin cambios: se sigue reportando, pero no se vuelve a parsear
+        resumen = setup_ingesta_service.ingestar_carpeta(db, str(tmp_path))
+        assert resumen["sin_cambios"] == 1 and len(resumen["errores"]) == 1
+        assert len(parseadas) == 1
+
+        # touch: mismo hash, tampoco se parsea
+        stat = os.stat(ruta)
+        os.utime(ruta, ns=(stat.st_atime_ns, stat.st_mtime_ns + 10**9))
+        resumen = setup_ingesta_service.ingestar_carpeta(db, str(tmp_path))
+        assert resumen["solo_metadatos"] == 1 and len(resumen["errores"]) == 1
+        assert len(parseadas) == 1
+
+        # Contenido nuevo: se vuelve a intentar
+        copiar(tmp_path, ARCHIVOS[1], destino="TYEH-1153513_00-FG.stp")
+        os.utime(ruta, ns=(stat.st_atime_ns, stat.st_mtime_ns + 2 * 10**9))
+        resumen = setup_ingesta_service.ingestar_carpeta(db, str(tmp_path))
+        assert len(resumen["errores"]) == 1 and len(parseadas) == 2
+        assert db.query(Setup).count() == 0
+    finally:
+        db.close()
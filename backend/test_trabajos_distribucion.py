@@ -0,0 +1,44 @@
+"""
+Distribuciones en segundo plano (trabajos_service) sobre una BD SQLite en
+memoria.
+
+    python -m pytest test_trabajos_distribucion.py
+"""
+from benchmark_solver import FLOTA, crear_bd_memoria, generar_paquete_sintetico
+from app.models.distribucion_model import DistribucionRequest
+from app.models.distribucion_storage_model import DistribucionStorage
+from app.models.trabajo_distribucion_model import TrabajoDistribucion
+from app.services import trabajos_service
+
+
+def test_trabajo_en_segundo_plano_guarda_la_distribucion():
+    db, package_id, machine_ids = crear_bd_memoria(generar_paquete_sintetico(12, vocabulario=40, semilla=3), FLOTA)
+    try:
+        request = DistribucionRequest(
+            package_id=package_id, demanda=20, horas_objetivo=96, machine_ids=machine_ids,
+            modo_solver="exacto", tiempo_limite_seg=1
+        )
+        trabajo = trabajos_service.crear_trabajo(db, request)
+        trabajos_service.esperar_trabajo(trabajo.id, timeout=60)
+        db.expire_all()
+
+        estado = trabajos_service.estado_trabajo(trabajos_service.obtener_trabajo(db, trabajo.id))
+        assert estado.estado == "completado", estado.error
+        guardada = db.query(DistribucionStorage).filter(DistribucionStorage.id == estado.distribucion_id).first()
+        assert guardada is not None
+        assert estado.mejor_maquinas == len(guardada.resultado_json["asignaciones"])
+        assert estado.cota_inferior is not None and estado.cota_inferior <= estado.mejor_maquinas
+
+        # Errores de validación quedan en el trabajo, no en una excepción
+        fallido = trabajos_service.crear_trabajo(db, request.model_copy(update={"package_id": 999}))
+        trabajos_service.esperar_trabajo(fallido.id, timeout=60)
+        db.expire_all()
+        fallido = trabajos_service.obtener_trabajo(db, fallido.id)
+        assert fallido.estado == "error" and "999" in fallido.error
+
+        # Al reiniciar, lo que quedó en cola ya no va a correr
+        db.add(TrabajoDistribucion(parametros=request.model_dump(), estado="ejecutando"))
+        db.commit()
+        assert trabajos_service.marcar_interrumpidos(db) == 1
+    finally:
+        db.close()
@@ -1,8 +1,8 @@
-from app.database.db import Base, engine
+from app.database.db import inicializar_bd
 import sqlite3
 
-# Crear tablas
-Base.metadata.create_all(bind=engine)
+# Crear tablas (y columnas nuevas)
+inicializar_bd()
 print("✅ Tablas creadas/actualizadas")
 
 # Listar tablas
@@ -1,146 +1,159 @@
+"""
+Pre-carga offline de carpetas de setups (.stp).
+
+Usa el MISMO parser del backend (app.utils.parser_setups), así cada registro
+tiene exactamente el formato de PackagePart.parsed_data y se puede cargar
+directo en un package sin volver a parsear.
+
+Uso:
+    python scripts/parse_folder.py CARPETA
+    python scripts/parse_folder.py CARPETA --package "Nombre" --cantidad 1
+    python scripts/parse_folder.py CARPETA --ingestar
+
+Con --package el script escribe en backend/clasificador.db (la misma BD
+que usa la API). Con --ingestar hace la ingesta incremental hacia la tabla
+`setups`: solo parsea archivos nuevos o modificados desde la última corrida
+(pensado para el refresh nocturno de la carpeta compartida).
+"""
+import argparse
 import os
-import re
+import sys
+from concurrent.futures import ProcessPoolExecutor
+from typing import List, Optional, Tuple
+
+BACKEND_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "backend")
+sys.path.insert(0, os.path.abspath(BACKEND_DIR))
+
+from app.utils.parser_setups import parse_setup  # noqa: E402
+
+EXTENSIONES = (".txt", ".stp")
+
+# Campos obligatorios de un setup (parse_setup los deja en None o vacíos)
+CAMPOS_OBLIGATORIOS = (
+    ("thickness", "THICKNESS"),
+    ("sheet_size", "SHEET SIZE"),
+    ("stations", "estaciones"),
+    ("sym", "SYM"),
+    ("run_time_mins", "RUN TIME mins"),
+)
 
 
 def parse_stp(file_path):
-    with open(file_path, "r", encoding="utf-8", errors="ignore") as f:
-        lines = f.readlines()
-
-    text = "".join(lines).lower()
-
-    # -----------------------------
-    # 1) DRAWING NAME -> PART NUMBER
-    # -----------------------------
-    pn_match = re.search(r"drawing name\s*:\s*(.+)", text)
-    if not pn_match:
-        raise ValueError(f"[ERROR] No DRAWING NAME en {file_path}")
-
-    full_name = pn_match.group(1).strip()
-
-    if "sw" not in full_name:
-        raise ValueError(f"[ERROR] No 'SW' en DRAWING NAME de {file_path}")
-
-    part_number = full_name.split("sw")[0].strip()
-    part_number = part_number.replace("-", "").replace("_", "")
-
-    # -----------------------------
-    # 2) THICKNESS
-    # -----------------------------
-    thick_match = re.search(r"thickness\s*:\s*([0-9.]+)", text)
-    if not thick_match:
-        raise ValueError(f"[ERROR] No THICKNESS en {file_path}")
-    thickness = float(thick_match.group(1))
-
-    # -----------------------------
-    # 3) SHEET SIZE
-    # -----------------------------
-    size_match = re.search(r"sheet size\s*:\s*([0-9.]+)\s*x\s*([0-9.]+)", text)
-    if not size_match:
-        raise ValueError(f"[ERROR] No SHEET SIZE en {file_path}")
-    x = float(size_match.group(1))
-    y = float(size_match.group(2))
-    sheet_x, sheet_y = max(x, y), min(x, y)
-
-    # -----------------------------
-    # 4) ESTACIONES + TN (sin duplicados)
-    # -----------------------------
-    estaciones = []
-    tool_numbers = set()
-
-    for line in lines:
-        parts = line.strip().split()
-        if len(parts) < 2:
-            continue
-
-        est_raw = parts[0]
-
-        # siempre 3 dígitos, ignorar 'S'
-        if est_raw[:3].isdigit():
-            estacion = int(est_raw[:3])
-            estaciones.append(estacion)
-
-            # tool number al final
-            nums = re.findall(r"[0-9.]+", line)
-            if nums:
-                tn = nums[-1]
-                tool_numbers.add(tn)
-
-    if not estaciones:
-        raise ValueError(f"[ERROR] No estaciones detectadas en {file_path}")
-
-    # eliminar duplicados manteniendo orden
-    estaciones_unicas = list(dict.fromkeys(estaciones))
-    tool_numbers_unicos = list(tool_numbers)
-
-    # -----------------------------
-    # 5) SYM
-    # -----------------------------
-    sym_match = re.search(r"sym\s*=\s*([0-9]+)", text)
-    if not sym_match:
-        raise ValueError(f"[ERROR] No SYM en {file_path}")
-    sym = int(sym_match.group(1))
-
-    # -----------------------------
-    # 6) RUN TIME (mins)
-    # -----------------------------
-    rt_match = re.search(r"([0-9.]+)\s*mins", text)
-    if not rt_match:
-        raise ValueError(f"[ERROR] No RUN TIME mins en {file_path}")
-    runtime = float(rt_match.group(1)) + 6  # +6 colchón
-
-    # -----------------------------
-    # 7) UPH
-    # -----------------------------
-    uph = round((sym * 60) / runtime, 2)
+    """
+    Parsea un archivo con el parser del backend (formato parse_setup).
+    Lanza ValueError si falta algún campo obligatorio: un setup incompleto no
+    se puede asignar y debe quedar en la lista de errores.
+    """
+    parsed_data = parse_setup(file_path)
+
+    faltantes = [nombre for campo, nombre in CAMPOS_OBLIGATORIOS if parsed_data.get(campo) in (None, [])]
+    if faltantes:
+        raise ValueError(f"[ERROR] No {', '.join(faltantes)} en {file_path}")
+
+    return parsed_data
+
 
+def _parsear_registro(full_path: str) -> dict:
+    parsed_data = parse_stp(full_path)
+    nombre = os.path.basename(full_path)
     return {
-        "archivo": os.path.basename(file_path),
-        "part_number": part_number,
-        "thickness": thickness,
-        "sheet_x": sheet_x,
-        "sheet_y": sheet_y,
-
-        # ESTACIONES
-        "estaciones": estaciones_unicas,
-        "total_estaciones": len(estaciones_unicas),
-
-        # TOOL NUMBERS
-        "tool_numbers": tool_numbers_unicos,
-        "total_tool_numbers": len(tool_numbers_unicos),
-
-        # PRODUCCIÓN
-        "sym": sym,
-        "runtime": runtime,
-        "uph": uph
+        "archivo": nombre,
+        "filename": os.path.splitext(nombre)[0],
+        "parsed_data": parsed_data
     }
 
 
 # =====================================
-# PROCESAR CARPETA COMPLETA
+# PROCESAR CARPETA COMPLETA (en paralelo)
 # =====================================
-def parse_folder(folder_path):
+def parse_folder(folder_path, workers: Optional[int] = None) -> Tuple[List[dict], List[str]]:
+    """
+    Parsea todos los .stp/.txt de la carpeta en paralelo.
+    Retorna (registros, errores); cada registro es
+    {"archivo", "filename", "parsed_data"} con parsed_data igual a parse_setup.
+    """
+    archivos = sorted(
+        f for f in os.listdir(folder_path)
+        if f.lower().endswith(EXTENSIONES)
+    )
+    rutas = [os.path.join(folder_path, f) for f in archivos]
+
     resultados = []
     errores = []
 
-    for file in os.listdir(folder_path):
-        if file.lower().endswith((".txt", ".stp")):
-            full_path = os.path.join(folder_path, file)
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        futuros = [pool.submit(_parsear_registro, ruta) for ruta in rutas]
+        for archivo, futuro in zip(archivos, futuros):
             try:
-                data = parse_stp(full_path)
-                resultados.append(data)
+                resultados.append(futuro.result())
             except Exception as err:
-                errores.append(f"{file}: {err}")
+                errores.append(f"{archivo}: {err}")
 
     return resultados, errores
 
 
+def cargar_en_package(registros: List[dict], nombre: str, descripcion: str = "", cantidad: int = 1):
+    """Crea un package con todos los registros parseados (una sola transacción)"""
+    from app.database.db import SessionLocal, inicializar_bd
+    from app.services import package_service
+
+    parts_data = [
+        {
+            "filename": r["filename"],
+            "cantidad": cantidad,
+            "parsed_data": r["parsed_data"]
+        }
+        for r in registros
+    ]
+
+    inicializar_bd()
+    db = SessionLocal()
+    try:
+        return package_service.crear_package(db, nombre, descripcion, parts_data)
+    finally:
+        db.close()
+
+
 # =====================================
 # EJECUCIÓN PRINCIPAL
 # =====================================
 if __name__ == "__main__":
-    folder = input("Pon la ruta de la carpeta con tus .stp: ")
-
-    resultados, errores = parse_folder(folder)
+    parser = argparse.ArgumentParser(description="Parsea una carpeta de setups .stp")
+    parser.add_argument("carpeta", nargs="?", help="Carpeta con los .stp")
+    parser.add_argument("--package", dest="package_nombre", help="Crear un package con los setups parseados")
+    parser.add_argument("--descripcion", default="", help="Descripción del package")
+    parser.add_argument("--cantidad", type=int, default=1, help="Cantidad por producto de cada setup")
+    parser.add_argument("--workers", type=int, default=None, help="Procesos en paralelo (default: CPUs)")
+    parser.add_argument("--ingestar", action="store_true", help="Ingesta incremental hacia la tabla setups")
+    args = parser.parse_args()
+
+    folder = args.carpeta or input("Pon la ruta de la carpeta con tus .stp: ")
+    folder = os.path.abspath(folder)
+
+    if args.ingestar:
+        # La BD de la API es relativa a backend/
+        os.chdir(BACKEND_DIR)
+        from app.database.db import SessionLocal, inicializar_bd
+        from app.services.setup_ingesta_service import ingestar_carpeta
+        from app.utils.pool_procesos import cerrar_pool
+
+        inicializar_bd()
+        db = SessionLocal()
+        try:
+            resumen = ingestar_carpeta(db, folder)
+        finally:
+            db.close()
+            cerrar_pool()
+
+        print("\n===== INGESTA INCREMENTAL =====")
+        for k, v in resumen.items():
+            if k != "errores":
+                print(f"{k}: {v}")
+        for e in resumen["errores"]:
+            print(f"❌ {e}")
+        sys.exit(0)
+
+    resultados, errores = parse_folder(folder, args.workers)
 
     print("\n===== ARCHIVOS PROCESADOS =====\n")
     for r in resultados:
@@ -151,3 +164,9 @@ if __name__ == "__main__":
         print("\n===== ERRORES DETECTADOS =====")
         for e in errores:
             print(e)
+
+    if args.package_nombre and resultados:
+        # La BD de la API es relativa a backend/
+        os.chdir(BACKEND_DIR)
+        package = cargar_en_package(resultados, args.package_nombre, args.descripcion, args.cantidad)
+        print(f"\n✅ Package '{package.nombre}' creado (ID={package.id}) con {len(resultados)} setups")